@@ -0,0 +1,131 @@
+"""
+Throughput of ``biodumpy.utils.dump`` with the JSON serializers, on payloads shaped like the GBIF and OBIS occurrences.
+
+Usage: python benchmarks/dump.py [number of records]
+
+The orjson rows require the orjson package.
+"""
+
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from biodumpy.utils import JsonSerializer, dump
+
+
+def gbif_occurrence(i):
+	return {
+		"key": 4000000000 + i,
+		"datasetKey": "50c9509d-22c7-4a22-a47d-8c48425ef4a7",
+		"publishingOrgKey": "28eb1a3f-1c15-4a95-931a-4af90ecb574d",
+		"basisOfRecord": "HUMAN_OBSERVATION",
+		"occurrenceStatus": "PRESENT",
+		"taxonKey": 2426609,
+		"scientificName": "Alytes muletensis (Sanchíz & Adrover, 1979)",
+		"acceptedScientificName": "Alytes muletensis (Sanchíz & Adrover, 1979)",
+		"kingdom": "Animalia",
+		"phylum": "Chordata",
+		"class": "Amphibia",
+		"order": "Anura",
+		"family": "Alytidae",
+		"genus": "Alytes",
+		"species": "Alytes muletensis",
+		"taxonRank": "SPECIES",
+		"iucnRedListCategory": "VU",
+		"decimalLatitude": round(39.6 + random.random(), 6),
+		"decimalLongitude": round(2.6 + random.random(), 6),
+		"coordinateUncertaintyInMeters": random.choice([None, 10.0, 100.0, 1000.0]),
+		"country": "Spain",
+		"countryCode": "ES",
+		"stateProvince": "Illes Balears",
+		"eventDate": f"2023-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}T10:00:00",
+		"year": 2023,
+		"issues": random.sample(["COORDINATE_ROUNDED", "GEODETIC_DATUM_ASSUMED_WGS84", "CONTINENT_DERIVED_FROM_COORDINATES", "TAXON_MATCH_FUZZY"], 2),
+		"media": [
+			{"type": "StillImage", "format": "image/jpeg", "identifier": f"https://inaturalist-open-data.s3.amazonaws.com/photos/{i}/original.jpg", "license": "CC_BY_NC_4_0"}
+		],
+		"gadm": {"level0": {"gid": "ESP", "name": "Spain"}, "level1": {"gid": "ESP.7_1", "name": "Islas Baleares"}},
+	}
+
+
+def obis_occurrence(i):
+	return {
+		"id": f"00000a7c-{i:04x}-4b2e-9d5b-3c1e8f7a{i % 10000:04d}",
+		"dataset_id": "2a1a3c8e-6f0d-4b6e-8a7f-3c5d9e1b2f4a",
+		"scientificName": "Pinna nobilis",
+		"aphiaID": 140780,
+		"decimalLatitude": round(39.0 + random.random(), 5),
+		"decimalLongitude": round(2.5 + random.random(), 5),
+		"minimumDepthInMeters": random.randint(1, 40),
+		"maximumDepthInMeters": random.randint(40, 60),
+		"eventDate": "2019-06-12",
+		"date_year": 2019,
+		"basisOfRecord": "HumanObservation",
+		"occurrenceStatus": "present",
+		"flags": ["NO_DEPTH", "ON_LAND"][: random.randint(0, 2)],
+		"sst": round(20 + random.random() * 5, 2),
+		"sss": round(37 + random.random(), 2),
+		"shoredistance": random.randint(10, 5000),
+		"bathymetry": random.randint(1, 300),
+		"kingdom": "Animalia",
+		"phylum": "Mollusca",
+		"class": "Bivalvia",
+		"order": "Ostreida",
+		"family": "Pinnidae",
+		"genus": "Pinna",
+		"species": "Pinna nobilis",
+	}
+
+
+# Parameters of the serializers, None for the json.dump call used before JsonSerializer
+SERIALIZERS = {
+	"json.dump indent=4 (previous)": None,
+	"json indent=4": {"indent": 4, "backend": "json"},
+	"json compact": {"indent": None, "backend": "json"},
+	"orjson indent=2": {"indent": 2, "backend": "orjson"},
+	"orjson compact": {"indent": None, "backend": "orjson"},
+}
+
+
+def bench(records, serializer, temp_dir, repeat=3):
+	"""
+	Best time of a few dumps, and the size of the file.
+	"""
+	file_name = f"{temp_dir}/payload"
+	best = None
+	for _ in range(repeat):
+		start = time.perf_counter()
+		if serializer is None:
+			with open(f"{file_name}.json", "w+") as f:
+				json.dump(records, f, indent=4)
+		else:
+			dump(file_name, records, serializer=serializer)
+		elapsed = time.perf_counter() - start
+		best = elapsed if best is None else min(best, elapsed)
+
+	return best, os.path.getsize(f"{file_name}.json")
+
+
+def main(n=50000):
+	random.seed(0)
+	for name, factory in (("GBIF", gbif_occurrence), ("OBIS", obis_occurrence)):
+		records = [factory(i) for i in range(n)]
+		# The throughput is measured on the size of the indented output, so that the modes are comparable
+		with tempfile.TemporaryDirectory() as temp_dir:
+			_, reference = bench(records, JsonSerializer(), temp_dir, repeat=1)
+			print(f"\n{name}: {n} occurrences, {reference / 2**20:.1f} MB indented")
+			print(f"{'Serializer':<32}{'Seconds':>10}{'MB':>10}{'MB/s':>10}")
+			for label, options in SERIALIZERS.items():
+				try:
+					elapsed, size = bench(records, None if options is None else JsonSerializer(**options), temp_dir)
+				except ValueError as e:
+					print(f"{label:<32}{e!s}")
+					continue
+				print(f"{label:<32}{elapsed:>10.3f}{size / 2**20:>10.1f}{reference / 2**20 / elapsed:>10.1f}")
+
+
+if __name__ == "__main__":
+	main(*(int(arg) for arg in sys.argv[1:]))
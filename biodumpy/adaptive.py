@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import statistics
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+# HTTP status codes meaning that the service asks to slow down.
+THROTTLE_STATUS = {429, 503}
+
+# Number of latencies, measured at the lowest concurrency, whose median is the baseline latency of a host.
+BASELINE_SAMPLES = 16
+
+
+def parse_retry_after(value) -> float:
+	"""
+	Parse the value of a Retry-After header, given either in seconds or as an HTTP date.
+
+	Returns
+	-------
+	float
+		Seconds to wait, or None if the value is missing or invalid.
+	"""
+	if not value:
+		return None
+
+	try:
+		return max(0.0, float(value))
+	except ValueError:
+		pass
+
+	try:
+		return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+	except (TypeError, ValueError):
+		return None
+
+
+class _HostState:
+	def __init__(self, limit):
+		self.limit = limit
+		self.in_flight = 0
+		self.pause_until = 0.0
+		self.successes = 0
+		self.throttles = 0
+		# Latencies of the current window of successful requests
+		self.window = []
+		# Latencies measured at the lowest limit reached so far, their median and that limit
+		self.floor = deque(maxlen=BASELINE_SAMPLES)
+		self.baseline = None
+		self.baseline_limit = limit
+		# Consecutive windows much slower than the baseline
+		self.slow_windows = 0
+
+
+class AdaptiveController:
+	"""
+	AIMD (additive increase, multiplicative decrease) concurrency controller keyed by remote host.
+
+	The number of requests in flight to a host grows by one after every window of successful requests (as many as
+	the limit) whose median latency stays close to a baseline: the median of the last latencies measured at the
+	lowest limit reached so far, i.e. the latency of the host when it is not loaded by this run. The baseline is only
+	measured again when the limit comes back to that level, so that it follows a host that gets slower for everyone
+	but never the latency added by the load. When two consecutive windows are much slower than the baseline, the
+	last increase made the host slower and the limit shrinks by one. Latencies that do not change with the load,
+	even noisy ones, let the limit grow up to ``max_limit``, while latencies that grow with the load keep it around
+	the concurrency the host can serve.
+
+	When the host answers with HTTP 429/503, the limit is multiplied by ``decrease`` and every request to the host
+	pauses for the ``Retry-After`` time, or for an exponential backoff if the header is missing.
+
+	Parameters
+	----------
+	initial : int, optional
+		Initial number of requests in flight per host.
+		Default is 1.
+	max_limit : int, optional
+		Maximum number of requests in flight per host.
+		Default is 16.
+	decrease : float, optional
+		Multiplicative decrease factor applied when the host throttles the requests.
+		Default is 0.5.
+	latency_tolerance : float, optional
+		The limit grows while the median latency of a window is lower than ``latency_tolerance`` times the baseline,
+		and shrinks by one after two slower windows.
+		Default is 2.
+	backoff : float, optional
+		Base pause, in seconds, after a throttled request without a Retry-After header. It doubles with every
+		consecutive throttled request.
+		Default is 1.
+	max_backoff : float, optional
+		Maximum pause, in seconds.
+		Default is 60.
+	latency_slack : float, optional
+		Latency difference, in seconds, too small to be told from the jitter of the network (e.g. between the
+		sub-millisecond latencies of a local server). It is added to the tolerated latency.
+		Default is 0.01.
+	"""
+
+	def __init__(
+		self, initial: int = 1, max_limit: int = 16, decrease: float = 0.5, latency_tolerance: float = 2, backoff: float = 1, max_backoff: float = 60, latency_slack: float = 0.01
+	):
+		if not 1 <= initial <= max_limit:
+			raise ValueError("Invalid limits. Expected 1 <= initial <= max_limit.")
+
+		if not 0 < decrease < 1:
+			raise ValueError("Invalid decrease. Expected a value between 0 and 1.")
+
+		self.initial = initial
+		self.max_limit = max_limit
+		self.decrease = decrease
+		self.latency_tolerance = latency_tolerance
+		self.backoff = backoff
+		self.max_backoff = max_backoff
+		self.latency_slack = latency_slack
+		self._hosts = {}
+		self._condition = threading.Condition()
+
+	def __reduce__(self):
+		# Locks cannot be pickled: worker processes get a fresh controller with the same settings
+		return AdaptiveController, (self.initial, self.max_limit, self.decrease, self.latency_tolerance, self.backoff, self.max_backoff, self.latency_slack)
+
+	def _state(self, url) -> _HostState:
+		host = urlparse(url).hostname or url
+		if host not in self._hosts:
+			self._hosts[host] = _HostState(self.initial)
+
+		return self._hosts[host]
+
+	def limit(self, url: str) -> int:
+		"""
+		Current number of requests allowed in flight to the host of the url.
+		"""
+		with self._condition:
+			return int(self._state(url).limit)
+
+	def acquire(self, url: str) -> float:
+		"""
+		Block until a request to the host of the url can be sent. Returns the time spent waiting, in seconds.
+		"""
+		start = time.monotonic()
+		with self._condition:
+			state = self._state(url)
+			while True:
+				pause = state.pause_until - time.monotonic()
+				if pause > 0:
+					self._condition.wait(pause)
+				elif state.in_flight >= int(state.limit):
+					self._condition.wait()
+				else:
+					break
+
+			state.in_flight += 1
+
+		return time.monotonic() - start
+
+	def try_acquire(self, url: str) -> bool:
+		"""
+		Take a slot for a request to the host of the url only if one is free right away. Returns True if it was taken.
+		"""
+		with self._condition:
+			state = self._state(url)
+			if state.pause_until > time.monotonic() or state.in_flight >= int(state.limit):
+				return False
+
+			state.in_flight += 1
+			return True
+
+	def release(self, url: str, latency: float | None = None, throttled: bool = False, retry_after: float | None = None):
+		"""
+		Report the outcome of a request sent after ``acquire``.
+
+		Parameters
+		----------
+		url : str
+			Url of the request.
+		latency : float, optional
+			Latency of the request, in seconds. None if the request failed without an answer.
+		throttled : bool, optional
+			True if the host answered with HTTP 429/503.
+		retry_after : float, optional
+			Seconds to wait requested by the host.
+		"""
+		with self._condition:
+			state = self._state(url)
+			state.in_flight -= 1
+
+			if throttled:
+				state.limit = max(1, int(state.limit * self.decrease))
+				state.successes = 0
+				state.window = []
+				state.slow_windows = 0
+				pause = retry_after if retry_after is not None else min(self.max_backoff, self.backoff * 2**state.throttles)
+				state.throttles += 1
+				state.pause_until = max(state.pause_until, time.monotonic() + pause)
+			elif latency is not None:
+				state.throttles = 0
+				state.window.append(latency)
+
+				state.successes += 1
+				if state.successes >= state.limit:
+					median = statistics.median(state.window)
+					limit = int(state.limit)
+					if limit < state.baseline_limit:
+						# The floor was measured with more requests in flight
+						state.floor.clear()
+						state.baseline_limit = limit
+					if limit == state.baseline_limit:
+						state.floor.extend(state.window)
+						state.baseline = statistics.median(state.floor)
+
+					if limit == state.baseline_limit or median <= state.baseline * self.latency_tolerance + self.latency_slack:
+						state.limit = min(self.max_limit, limit + 1)
+						state.slow_windows = 0
+					else:
+						state.slow_windows += 1
+						# A single slow window can be jitter, two mean that the last increase made the host slower
+						if state.slow_windows >= 2:
+							state.limit = max(1, limit - 1)
+							state.slow_windows = 0
+					state.successes = 0
+					state.window = []
+
+			self._condition.notify_all()
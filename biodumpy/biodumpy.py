@@ -1,16 +1,47 @@
+from __future__ import annotations
+
+import contextvars
+import copy
+import logging
 import sys
 import time
+from collections import deque
+from collections.abc import Iterable, Sized
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from datetime import datetime
+from itertools import islice
 from logging.handlers import MemoryHandler
+from queue import Queue
 
-from .input import Input
-from .utils import dump, create_directory
 from tqdm import tqdm
-import logging
+
+from .breaker import CircuitBreaker, CircuitOpenError
+from .cache import ResponseCache
+from .checkpoint import Checkpoint
+from .client import HttpClient
+from .hooks import Hooks
+from .input import Input
+from .ledger import FailureLedger
+from .metrics import Metrics, current_query
+from .parquet import ParquetWriter
+from .ratelimit import RateLimiter
+from .registry import registry
+from .tracing import Tracer
+from .utils import JsonSerializer, create_directory, dump
+from .writers import BackgroundWriter, BulkWriter
+
+# asyncio and multiprocessing are imported by the methods using them, to keep ``import biodumpy`` fast
 
 
 class BiodumpyException(Exception):
-	pass
+	"""
+	Error raised by the input modules. ``status`` is the HTTP status code of the failed request, if any.
+	"""
+
+	def __init__(self, message: str | None = None, status: int | None = None):
+		super().__init__(message)
+		self.status = status
 
 
 class Biodumpy:
@@ -20,86 +51,919 @@ class Biodumpy:
 	Parameters
 	----------
 	inputs : list
-		A list of input modules that handle specific biodiversity data downloads.
+		A list of input modules that handle specific biodiversity data downloads. Modules can also be given by the
+		name they are registered with (see ``biodumpy.registry``), e.g. 'GBIF', in which case they are created
+		with their default parameters.
 	loading_bar : bool
 		 If True, shows a progress bar when downloading data. If False, disable the progress bar.
 		 Default is False
 	debug : bool
 		If True, enables printing of detailed information during execution.
 		Default is True
+	parallel : bool
+		If True, each input module gets its own worker lane (thread) and the modules are queried in parallel.
+		Every lane keeps the ``sleep`` policy of its module.
+		Default is False.
+	rate_limits : dict
+		Dictionary mapping a remote host to a (rate, burst) tuple, with the rate in requests per second. Every HTTP
+		request of every input module waits for a token of its host. The values override the limits declared by
+		the input modules in their ``rate_limits`` class attribute.
+		Default is None.
+	processes : int
+		Number of worker processes. If greater than 1, the elements are split into shards of ``SHARD_SIZE``
+		elements processed in parallel. Bulk outputs are merged in the order of the elements and the errors of all
+		the workers are written to a single dump file. The workers cannot prompt the user, so the "prompt" step of the
+		``disambiguation`` policy of the modules becomes "defer". The rate limits are divided among the workers and the ``sleep``
+		of each module is multiplied by the number of workers, so the total request rate is unchanged.
+		Default is 1.
+	checkpoint : bool
+		If True, each completed (query, module) pair is recorded in a manifest stored in the root of the output
+		path, and the payloads of bulk modules are spooled next to it. An interrupted run can then be resumed with
+		``start(..., resume=True)``.
+		Default is False.
+	bulk_max_size : int
+		Maximum size, in bytes, of each bulk file. Bulk payloads are streamed to disk as they arrive; when a file
+		exceeds this size, the output rolls over to a new numbered file (e.g. bulk_1.json, bulk_2.json). If None,
+		a single bulk file is written per module.
+		Default is None.
+	cache : ResponseCache
+		Persistent cache of the HTTP responses shared by all the input modules (see ``biodumpy.cache.ResponseCache``).
+		If None, responses are not cached.
+		Default is None.
+	client : HttpClient
+		HTTP client shared by all the input modules, to tune its connection pools, timeouts and retry policy (see
+		``biodumpy.client.HttpClient``). If None, a client is created with ``rate_limits`` and ``cache``, which
+		cannot be used together with this parameter.
+		Default is None.
+	metrics : bool
+		If True, the run collects metrics (requests, bytes, latency and retries per module and endpoint, cache hits,
+		time spent sleeping, downloading and dumping) available in ``metrics`` and written next to the dump log as a
+		JSON report (metrics_{date}.json) and in the Prometheus text format (metrics_{date}.prom).
+		Default is False.
+	hooks : Hooks
+		Callbacks fired at each stage of the download of an element (see ``biodumpy.hooks.Hooks``), e.g. to profile
+		the downloads and the dumps. If None, no callback is fired.
+		Default is None.
+	trace : bool
+		If True, the run records nested spans (module, element, request and dump) with their durations, written next
+		to the dump log as an OpenTelemetry (OTLP) JSON file (trace_{date}.json) and available in ``tracer``.
+		Default is False.
+	circuit_breaker : int
+		Number of consecutive outages of an input module (connection errors, timeouts, HTTP 429 and 5xx responses)
+		after which its circuit opens (see ``biodumpy.breaker.CircuitBreaker``). While the circuit is open, the
+		elements of the module are recorded in the failure ledger without being downloaded, and every
+		``BREAKER_COOLDOWN`` seconds a single element probes the service. The other modules are not affected. With
+		worker processes, each process has its own circuits, kept from one shard to the next. If None, modules are
+		always queried.
+		Default is None.
+	serializer : JsonSerializer
+		Serializer of the JSON outputs (see ``biodumpy.utils.JsonSerializer``), e.g. ``JsonSerializer(indent=None)``
+		for compact files written with orjson when it is installed. If None, the outputs are indented with 4 spaces.
+		Default is None.
+	background_writer : bool
+		If True, the payloads are written to disk by a dedicated thread (see ``biodumpy.writers.BackgroundWriter``),
+		so that the next downloads do not wait for the dump of the previous ones. Up to ``WRITE_QUEUE_SIZE`` payloads
+		wait to be written; when the queue is full, the downloads wait for the writer. All the queued payloads are
+		written before the run returns, also when it fails.
+		Default is False.
 	"""
 
-	def __init__(self, inputs: list[Input], loading_bar: bool = True, debug: bool = False) -> None:
+	# Maximum number of elements waiting in each worker lane when parallel is True.
+	LANE_QUEUE_SIZE = 64
+
+	# Number of elements sent to a worker process at once when processes is greater than 1.
+	SHARD_SIZE = 100
+
+	# Seconds before an open circuit lets an element probe the service when circuit_breaker is set.
+	BREAKER_COOLDOWN = 60
+
+	# Maximum number of payloads waiting to be written when background_writer is True.
+	WRITE_QUEUE_SIZE = 64
+
+	def __init__(
+		self,
+		inputs: list,
+		loading_bar: bool = True,
+		debug: bool = False,
+		parallel: bool = False,
+		rate_limits: dict | None = None,
+		processes: int = 1,
+		checkpoint: bool = False,
+		bulk_max_size: int | None = None,
+		cache: ResponseCache = None,
+		client: HttpClient = None,
+		metrics: bool = False,
+		hooks: Hooks = None,
+		trace: bool = False,
+		circuit_breaker: int | None = None,
+		serializer: JsonSerializer = None,
+		background_writer: bool = False,
+	) -> None:
 		super().__init__()
-		self.inputs = inputs
+		self.inputs = [registry.create(inp) if isinstance(inp, str) else inp for inp in inputs]
 		self.debug = debug
 		self.loading_bar = loading_bar
+		self.parallel = parallel
+		self.processes = processes
+		self.checkpoint = checkpoint
+		self.bulk_max_size = bulk_max_size
+		self.hooks = hooks
+		self.circuit_breaker = circuit_breaker
+		self.serializer = serializer
+		self.background_writer = background_writer
+		self._checkpoint = None
+		self._writer = None
+		self._breakers = {}
+		self._ledger = None
+		# Previous attempts of the (module, query) pairs retried by retry_failed
+		self._attempts = {}
 		# self.loading_bar = not debug and loading_bar
 
-	# elements must be a flat list of strings
-	def start(self, elements, output_path="downloads/{date}/{module}/{name}"):
-		if not isinstance(elements, list):
-			raise ValueError("Invalid query. Expected a list of taxa to query.")
+		if self.processes < 1:
+			raise ValueError("Invalid processes. Expected a positive integer.")
+
+		if circuit_breaker is not None and circuit_breaker < 1:
+			raise ValueError("Invalid circuit_breaker. Expected a positive integer.")
+
+		if client is not None and (rate_limits is not None or cache is not None):
+			raise ValueError("Invalid parameters: 'client' is set, so 'rate_limits' and 'cache' must be set in the client.")
+
+		# A single client, so that all the modules share the same per-host rate limits and connection pools
+		if client is None:
+			# The limits declared by the modules, overridden by the ones given by the user
+			limits = {}
+			for inp in self.inputs:
+				limits.update(inp.rate_limits)
+			client = HttpClient(RateLimiter({**limits, **(rate_limits or {})}), cache=cache)
+		self.client = client
+		if metrics and self.client.metrics is None:
+			self.client.metrics = Metrics()
+		self.metrics = self.client.metrics
+		if trace and self.client.tracer is None:
+			self.client.tracer = Tracer()
+		self.tracer = self.client.tracer
+		for inp in self.inputs:
+			inp.client = self.client.for_module(type(inp).__name__)
+
+	# elements must be an iterable of strings or dictionaries with a 'query' key
+	def start(self, elements, output_path="downloads/{date}/{module}/{name}", resume: bool = False):
+		"""
+		Download the elements with all the input modules.
+
+		Parameters
+		----------
+		elements : iterable
+			The taxa to query: a list, a generator or any other iterable of strings or of dictionaries with a 'query'
+			key. Iterables are consumed lazily, so the readers in ``biodumpy.utils`` (``read_taxa_text``,
+			``read_taxa_csv`` and ``read_taxa_dwca``) can stream the taxa from a file.
+		output_path : str
+			The output path template.
+		resume : bool
+			If True, the (query, module) pairs completed by a previous run with the same output path root are
+			skipped, and the bulk outputs are rebuilt including their payloads. Implies ``checkpoint``.
+			Default is False.
+		"""
+		self._check_elements(elements)
+
+		current_date, log_handler = self._setup(output_path, resume)
+
+		# JSON Lines bulk files are appended to, unless they are rebuilt from the checkpoint
+		bulk_writers = self._bulk_writers(output_path, current_date, append=not resume)
+		try:
+			self._resume_bulk(bulk_writers)
+			if self.processes > 1:
+				self._start_shards(elements, output_path, current_date, bulk_writers)
+			else:
+				self._run(elements, output_path, current_date, bulk_writers)
+		finally:
+			self._teardown(output_path, current_date, bulk_writers, log_handler)
+
+	async def astart(self, elements, output_path="downloads/{date}/{module}/{name}", concurrency: int = 1, resume: bool = False):
+		"""
+		Asynchronous version of ``start``. All the input modules share one event loop.
+
+		Modules implementing the ``_adownload`` coroutine are awaited directly, the others run their ``_download``
+		in a pool of ``concurrency`` threads per module, so the default executor of the event loop (at most 32
+		threads) does not cap their concurrency. The HTTP client shared by the modules (rate limits, cache, retries
+		and metrics) is synchronous: a native ``_adownload`` sending its own requests does not go through it.
+
+		Parameters
+		----------
+		elements : iterable
+			The taxa to query. See ``start``.
+		output_path : str
+			The output path template.
+		concurrency : int
+			Maximum number of elements downloaded at the same time by each input module. The ``sleep`` of the module
+			is still applied between the start of consecutive downloads.
+			Default is 1.
+		resume : bool
+			See ``start``.
+			Default is False.
+		"""
+		import asyncio
+
+		self._check_elements(elements)
+
+		if concurrency < 1:
+			raise ValueError("Invalid concurrency. Expected a positive integer.")
+
+		current_date, log_handler = self._setup(output_path, resume)
+
+		# JSON Lines bulk files are appended to, unless they are rebuilt from the checkpoint
+		bulk_writers = self._bulk_writers(output_path, current_date, append=not resume)
+		# Threads of the synchronous downloads and of the dumps: one per worker, as each runs one of them at a time
+		executor = ThreadPoolExecutor(max_workers=concurrency * len(self.inputs), thread_name_prefix="biodumpy-async")
+		try:
+			self._resume_bulk(bulk_writers)
+			queues = {inp: asyncio.Queue(maxsize=self.LANE_QUEUE_SIZE) for inp in self.inputs}
+			throttles = {inp: [asyncio.Lock(), None] for inp in self.inputs}
+			workers = [
+				asyncio.create_task(self._aworker(inp, queue, throttles[inp], output_path, current_date, bulk_writers, executor))
+				for inp, queue in queues.items()
+				for _ in range(concurrency)
+			]
+
+			try:
+				for el in self._progress(elements):
+					for queue in queues.values():
+						await queue.put(el)
+			finally:
+				# Signal the end of the elements to every worker
+				for queue in queues.values():
+					for _ in range(concurrency):
+						await queue.put(None)
+
+			await asyncio.gather(*workers)
+		finally:
+			executor.shutdown()
+			self._teardown(output_path, current_date, bulk_writers, log_handler)
+
+	def retry_failed(self, ledger: str, output_path="downloads/{date}/{module}/{name}", attempts: int = 3, backoff: float = 1):
+		"""
+		Download again the (query, module) pairs recorded in a failure ledger, e.g. after a transient outage.
+
+		Pairs still failing are retried up to ``attempts`` times, waiting ``backoff`` seconds before the second
+		round and doubling the wait before each following round. The pairs that keep failing, and the ones of modules
+		that are not in ``inputs``, are written to the ledger of this run with their total number of attempts.
+
+		The payloads of the bulk modules are written to a separate 'bulk_retry' file, unless ``checkpoint`` is True,
+		in which case the bulk files are rebuilt with the payloads of the previous run.
+
+		Parameters
+		----------
+		ledger : str
+			Path of the failure ledger, e.g. 'downloads/failures_2024-10-10.jsonl'.
+		output_path : str
+			The output path template.
+		attempts : int
+			Maximum number of rounds.
+			Default is 3.
+		backoff : float
+			Wait, in seconds, before the second round.
+			Default is 1.
 
+		Returns
+		-------
+		list
+			The records of the pairs that still fail.
+		"""
+		records = FailureLedger.read(ledger)
+		modules = {type(inp).__name__: inp for inp in self.inputs}
+		unknown = [record for record in records if record["module"] not in modules]
+		pending = [record for record in records if record["module"] in modules]
+
+		current_date, log_handler = self._setup(output_path, resume=self.checkpoint)
+
+		bulk_writers = self._bulk_writers(output_path, current_date, name="bulk" if self._checkpoint is not None else "bulk_retry", append=self._checkpoint is None)
+		try:
+			self._resume_bulk(bulk_writers)
+			for attempt in range(attempts):
+				if not pending:
+					break
+
+				if attempt:
+					time.sleep(backoff * 2 ** (attempt - 1))
+
+				self._attempts = {(record["module"], record["query"]): record["attempts"] for record in pending}
+				self._ledger.reset()
+
+				last_tick = {}
+				for record in pending:
+					self._process(modules[record["module"]], record["element"], output_path, current_date, bulk_writers, last_tick)
+
+				pending = list(self._ledger.records)
+		finally:
+			self._attempts = {}
+			self._ledger.reset([*unknown, *pending])
+			self._teardown(output_path, current_date, bulk_writers, log_handler)
+
+		return pending
+
+	@staticmethod
+	def _check_elements(elements):
+		if isinstance(elements, (str, dict)) or not isinstance(elements, Iterable):
+			raise ValueError("Invalid query. Expected a list or an iterable of taxa to query.")
+
+	def _setup(self, output_path, resume):
 		current_date = datetime.now().strftime("%Y-%m-%d")
 
+		self._checkpoint = Checkpoint(self._root(output_path), resume=resume) if self.checkpoint or resume else None
+
+		self._ledger = FailureLedger(f"{self._root(output_path)}failures_{current_date}.jsonl")
+		# A resumed run keeps the failures of the interrupted one, so that retry_failed can still download them
+		if resume:
+			self._ledger.resume()
+		else:
+			self._ledger.reset()
+
+		self._breakers = self._create_breakers()
+		self._writer = self._create_writer()
+
+		if self.metrics is not None:
+			self.metrics.reset()
+
+		if self.tracer is not None:
+			self.tracer.reset()
+			# Opened here so that the elements processed by worker processes share the spans of the modules
+			for inp in self.inputs:
+				self.tracer.module_span(type(inp).__name__)
+
 		log_handler = MemoryHandler(capacity=1024)
 
 		logging.basicConfig(level=logging.ERROR, format="%(asctime)s - %(levelname)s - %(message)s", datefmt="%Y-%m-%d %H:%M:%S", handlers=[log_handler])
 
-		bulk_input = {}
-		last_tick = {}
+		# basicConfig does nothing if the root logger is already configured (e.g. by a previous run)
+		if log_handler not in logging.getLogger().handlers:
+			logging.getLogger().addHandler(log_handler)
+
+		return current_date, log_handler
+
+	def _create_breakers(self):
+		if self.circuit_breaker is None:
+			return {}
+
+		return {type(inp).__name__: CircuitBreaker(self.circuit_breaker, self.BREAKER_COOLDOWN) for inp in self.inputs}
+
+	def _create_writer(self):
+		return BackgroundWriter(self.WRITE_QUEUE_SIZE) if self.background_writer else None
+
+	def _close_writer(self):
+		"""
+		Wait for the payloads queued in the background writer, returning the error of a failed write, if any.
+		"""
+		writer, self._writer = self._writer, None
+		if writer is None:
+			return None
+
 		try:
-			for el in tqdm(elements, desc="Biodumpy list", unit=" elements", disable=not self.loading_bar, smoothing=0, file=sys.stdout, colour="#FECC45"):
-				if isinstance(el, str):
-					el = {"query": el}
+			writer.close()
+		except Exception as e:
+			return e
+
+		return None
+
+	def _teardown(self, output_path, current_date, bulk_writers, log_handler):
+		# The queued payloads are written before the bulk files and the checkpoint are closed
+		error = self._close_writer()
+
+		logging.getLogger().removeHandler(log_handler)
+
+		for writer in bulk_writers.values():
+			writer.close()
+
+		if self._checkpoint is not None:
+			self._checkpoint.close()
+
+		if self.metrics is not None:
+			down_path = self._root(output_path)
+			create_directory(down_path)
+			self.metrics.to_json(f"{down_path}/metrics_{current_date}.json")
+			self.metrics.to_prometheus_file(f"{down_path}/metrics_{current_date}.prom")
+
+		if self.tracer is not None:
+			self.tracer.finish_modules()
+			down_path = self._root(output_path)
+			create_directory(down_path)
+			self.tracer.to_json(f"{down_path}/trace_{current_date}.json")
 
-				if "query" not in el:
-					logging.error(f"Missing 'query' key for {el}")
-					raise ValueError(f"Missing 'name' key for {el}")
+		if log_handler.buffer:
+			print("---- Please review the dump file; errors have been detected ----")
+			down_path = self._root(output_path)
+			create_directory(down_path)
+			with open(f"{down_path}/dump_{current_date}.log", "w") as f:
+				for record in log_handler.buffer:
+					log_entry = f"{record.levelname}: {record.getMessage()}\n"
+					f.write(log_entry)
 
-				name = el["query"]
-				clean_name = name.replace("/", "_")
-				tqdm.write(f"Downloading {name}...")
+		if error is not None:
+			raise error
 
+	@staticmethod
+	def _root(output_path):
+		"""
+		Root folder of the output path: the folders preceding the first placeholder.
+		"""
+		down_path = str()
+		for folder in output_path.split("/"):
+			if "{" in folder:
+				break
+			down_path = f"{down_path}{folder}/"
+
+		return down_path
+
+	def _bulk_writers(self, output_path, current_date, name="bulk", append=False):
+		"""
+		Create the writers streaming the payloads of the bulk modules to disk. If ``append``, JSON Lines records are
+		appended to the existing files.
+		"""
+		return {
+			inp: ParquetWriter(output_path.format(date=current_date, module=type(inp).__name__, name=name))
+			if inp.output_format == "parquet"
+			else BulkWriter(
+				output_path.format(date=current_date, module=type(inp).__name__, name=name),
+				output_format=inp.output_format,
+				max_size=self.bulk_max_size,
+				serializer=self.serializer,
+				append=append,
+				compression=inp.compression,
+			)
+			for inp in self.inputs
+			if inp.bulk
+		}
+
+	def _resume_bulk(self, bulk_writers):
+		"""
+		Write the spooled payloads of the bulk modules completed by a previous run.
+		"""
+		if self._checkpoint is None:
+			return
+
+		for inp, writer in bulk_writers.items():
+			for payload in self._checkpoint.spooled(type(inp).__name__):
+				writer.write(payload)
+
+	def _run(self, elements, output_path, current_date, bulk_writers, last_tick=None):
+		"""
+		Process the elements. ``last_tick`` holds the time of the last download of each module, kept by the worker
+		processes from one shard to the next.
+		"""
+		last_tick = {} if last_tick is None else last_tick
+		if self.parallel:
+			self._start_lanes(elements, output_path, current_date, bulk_writers, last_tick)
+		else:
+			for el in self._progress(elements):
 				for inp in self.inputs:
-					module_name = type(inp).__name__
-					logging.info(f"biodumpy initialized with {module_name} inputs. Taxon: {name}")
-
-					try:
-						if module_name in last_tick:
-							delta_last_call = time.time() - last_tick[module_name]
-							if delta_last_call < inp.sleep:
-								if self.debug:
-									tqdm.write(f"[{module_name}] Blocking for {inp.sleep - delta_last_call} seconds...")
-								time.sleep(inp.sleep - delta_last_call)
-						tqdm.write(f"[{module_name}] Downloading...")
-						payload = inp._download(**el)
-						last_tick[module_name] = time.time()
-					except Exception as e:
-						logging.error(f'[{module_name}] Failed to download data for "{name}": {str(e)} \n')
-						continue
-
-					if inp.bulk:
-						if inp not in bulk_input:
-							bulk_input[inp] = []
-						bulk_input[inp].extend(payload)
-					else:
-						dump(file_name=f"{output_path.format(date=current_date, module=module_name, name=clean_name)}", obj_list=payload, output_format=inp.output_format)
+					self._process(inp, el, output_path, current_date, bulk_writers, last_tick)
+
+	def _elements(self, elements):
+		"""
+		Yield each element as a dictionary with a 'query' key.
+		"""
+		for el in elements:
+			if isinstance(el, str):
+				el = {"query": el}
+
+			if "query" not in el:
+				logging.error(f"Missing 'query' key for {el}")
+				raise ValueError(f"Missing 'name' key for {el}")
+
+			yield el
+
+	def _progress(self, elements):
+		"""
+		Iterate over the elements showing the progress bar.
+		"""
+		for el in self._elements(tqdm(elements, desc="Biodumpy list", unit=" elements", disable=not self.loading_bar, smoothing=0, file=sys.stdout, colour="#FECC45")):
+			tqdm.write(f"Downloading {el['query']}...")
+			yield el
+
+	def _process(self, inp, el, output_path, current_date, bulk_writers, last_tick):
+		"""
+		Download a single element with a single input module and dump (or stream to the bulk file) its payload.
+		"""
+		module_name = type(inp).__name__
+		name = el["query"]
+		logging.info(f"biodumpy initialized with {module_name} inputs. Taxon: {name}")
+
+		if self._checkpoint is not None and self._checkpoint.done(module_name, name):
+			self._count(inp, "skipped")
+			return
+
+		if self._rejected(inp, el):
+			return
+
+		if module_name in last_tick:
+			delta_last_call = time.time() - last_tick[module_name]
+			if delta_last_call < inp.sleep:
+				if self.debug:
+					tqdm.write(f"[{module_name}] Blocking for {inp.sleep - delta_last_call} seconds...")
+				time.sleep(inp.sleep - delta_last_call)
+				if self.metrics is not None:
+					self.metrics.inc("biodumpy_sleep_seconds_total", inp.sleep - delta_last_call, module=module_name)
+
+		with self._span(inp, el) as span:
+			try:
+				tqdm.write(f"[{module_name}] Downloading...")
+				payload = self._download(inp, el)
+				last_tick[module_name] = time.time()
+				self._succeed(inp)
+			except Exception as e:
+				self._fail(inp, el, e)
+				if span is not None:
+					span.fail(str(e))
+				return
+
+			self._save(inp, el, payload, output_path, current_date, bulk_writers)
+
+	def _download(self, inp, el):
+		"""
+		Download a single element with a single input module, recording the duration of the download and the part
+		of it not spent in HTTP requests (parsing and processing).
+		"""
+		hooks = self.hooks
+		if hooks is not None:
+			hooks.fire("on_request", inp=inp, element=el)
+
+		token = current_query.set(el["query"])
+		start, request_time = time.monotonic(), self.client.request_time()
+		try:
+			payload = inp._download(**el)
+		except Exception as e:
+			if hooks is not None:
+				hooks.fire("on_error", inp=inp, element=el, error=e, elapsed=time.monotonic() - start)
+			raise
+		finally:
+			current_query.reset(token)
+			elapsed = time.monotonic() - start
+			if self.metrics is not None:
+				module_name = type(inp).__name__
+				self.metrics.observe("biodumpy_download_seconds", elapsed, module=module_name)
+				self.metrics.observe("biodumpy_processing_seconds", max(0.0, elapsed - (self.client.request_time() - request_time)), module=module_name)
+
+		if hooks is not None:
+			hooks.fire("on_response", inp=inp, element=el, elapsed=elapsed)
+			hooks.fire("on_payload", inp=inp, element=el, payload=payload)
+
+		return payload
+
+	def _span(self, inp, el):
+		"""
+		Span of the element, child of the span of the module, enclosing its requests and its dump.
+		"""
+		if self.tracer is None:
+			return nullcontext()
+
+		module_name = type(inp).__name__
+		return self.tracer.span(el["query"], {"biodumpy.module": module_name, "biodumpy.query": el["query"]}, parent=self.tracer.module_span(module_name))
+
+	def _fail(self, inp, el, error):
+		"""
+		Log a failed download and record it in the failure ledger.
+		"""
+		module_name = type(inp).__name__
+		logging.error(f'[{module_name}] Failed to download data for "{el["query"]}": {error!s} \n')
+		self._count(inp, "failed")
+
+		if self._ledger is not None:
+			self._ledger.record(module_name, el, error, attempts=self._attempts.get((module_name, el["query"]), 0) + 1)
+
+		breaker = self._breakers.get(module_name)
+		if breaker is not None and breaker.failure(error):
+			logging.error(f"[{module_name}] Circuit open after {breaker.threshold} consecutive failures. Skipping its elements, probing every {breaker.cooldown} seconds.")
+
+	def _succeed(self, inp):
+		breaker = self._breakers.get(type(inp).__name__)
+		if breaker is not None:
+			breaker.success()
+
+	def _rejected(self, inp, el):
+		"""
+		Record in the failure ledger, without downloading it, an element of a module whose circuit is open.
+		"""
+		module_name = type(inp).__name__
+		breaker = self._breakers.get(module_name)
+		if breaker is None or breaker.allow():
+			return False
+
+		self._count(inp, "rejected")
+		if self._ledger is not None:
+			# Not downloaded, so the number of attempts is unchanged
+			error = CircuitOpenError(f"Circuit of {module_name} open.")
+			self._ledger.record(module_name, el, error, attempts=self._attempts.get((module_name, el["query"]), 0))
+
+		return True
+
+	def _count(self, inp, outcome):
+		if self.metrics is not None:
+			self.metrics.inc("biodumpy_elements_total", module=type(inp).__name__, outcome=outcome)
+
+	def _save(self, inp, el, payload, output_path, current_date, bulk_writers):
+		"""
+		Store the payload of an element, or queue it in the background writer.
+		"""
+		if self._writer is None:
+			self._store(inp, el, payload, output_path, current_date, bulk_writers)
+			return
+
+		start = time.monotonic()
+		self._writer.submit(self._store, inp, el, payload, output_path, current_date, bulk_writers)
+		if self.metrics is not None:
+			self.metrics.inc("biodumpy_write_wait_seconds_total", time.monotonic() - start, module=type(inp).__name__)
+
+	def _store(self, inp, el, payload, output_path, current_date, bulk_writers):
+		with self.tracer.span("dump") if self.tracer is not None else nullcontext():
+			self._write(inp, el, payload, output_path, current_date, bulk_writers)
+
+	def _write(self, inp, el, payload, output_path, current_date, bulk_writers):
+		module_name = type(inp).__name__
+		start = time.monotonic()
+		if inp.bulk:
+			bulk_writers[inp].write(payload)
+			file_name = getattr(bulk_writers[inp], "file_name", None)
+
+			if self._checkpoint is not None:
+				dump(file_name=self._checkpoint.spool_path(module_name, el["query"]), obj_list=payload, serializer=self.serializer)
+		else:
+			clean_name = el["query"].replace("/", "_")
+			file_name = f"{output_path.format(date=current_date, module=module_name, name=clean_name)}"
+			dump(file_name=file_name, obj_list=payload, output_format=inp.output_format, serializer=self.serializer, compression=inp.compression)
+
+		if self._checkpoint is not None:
+			self._checkpoint.add(module_name, el["query"])
+
+		elapsed = time.monotonic() - start
+		if self.metrics is not None:
+			self.metrics.observe("biodumpy_dump_seconds", elapsed, module=module_name)
+		if self.hooks is not None:
+			self.hooks.fire("on_dump", inp=inp, element=el, file_name=file_name, elapsed=elapsed)
+		self._count(inp, "downloaded")
+
+	def _start_shards(self, elements, output_path, current_date, bulk_writers):
+		"""
+		Split the elements into shards processed by a pool of worker processes, merging the results in order.
+		"""
+		from concurrent.futures import ProcessPoolExecutor
+
+		# Each worker gets an equal share of the rate limits
+		client = copy.copy(self.client)
+		client.limiter = RateLimiter({host: (rate / self.processes, max(1, burst // self.processes)) for host, (rate, burst) in self.client.limiter.limits.items()})
+
+		# Each worker also waits the sleep of the modules times the number of workers
+		inputs = [copy.copy(inp) for inp in self.inputs]
+		for inp in inputs:
+			inp.sleep *= self.processes
+			# The workers cannot read the answers of the user (their stdin is closed): ambiguous names are deferred
+			if getattr(inp, "disambiguation", None) is not None:
+				inp.disambiguation = inp.disambiguation.non_interactive()
+
+		# The total is unknown when the elements come from a generator
+		total = len(elements) if isinstance(elements, Sized) else None
+		pbar = tqdm(total=total, desc="Biodumpy list", unit=" elements", disable=not self.loading_bar, smoothing=0, file=sys.stdout, colour="#FECC45")
+		elements = self._elements(elements)
+		modules = [type(inp).__name__ for inp in self.inputs]
+		pending = deque()
+		with pbar, ProcessPoolExecutor(max_workers=self.processes) as executor:
+			while True:
+				shard = list(islice(elements, self.SHARD_SIZE))
+				if shard:
+					# Each shard only gets the part of the manifest of its elements, whatever the size of the run
+					checkpoint = self._checkpoint.subset(modules, [el["query"] for el in shard]) if self._checkpoint is not None else None
+					future = executor.submit(
+						_run_shard,
+						inputs,
+						shard,
+						output_path,
+						current_date,
+						self.debug,
+						self.parallel,
+						client,
+						checkpoint,
+						self.hooks,
+						self._ledger,
+						self.circuit_breaker,
+						self.serializer,
+						self.background_writer,
+					)
+					pending.append((len(shard), future))
+
+				# Keep a bounded number of shards in flight and merge them in submission order
+				if pending and (not shard or len(pending) >= 2 * self.processes):
+					size, future = pending.popleft()
+					bulks, records, metrics, tracer = future.result()
+
+					for inp, payload in zip(self.inputs, bulks):
+						if payload:
+							bulk_writers[inp].write(payload)
+
+					for levelno, message in records:
+						logging.log(levelno, message)
+
+					if self.metrics is not None:
+						self.metrics.merge(metrics)
+					if self.tracer is not None:
+						self.tracer.merge(tracer)
+
+					pbar.update(size)
+				elif not shard:
+					break
+
+	def _start_lanes(self, elements, output_path, current_date, bulk_writers, last_tick):
+		"""
+		Feed the elements to one worker lane per input module, so that different services are queried in parallel.
+		"""
+		lanes = {inp: Queue(maxsize=self.LANE_QUEUE_SIZE) for inp in self.inputs}
+
+		with ThreadPoolExecutor(max_workers=len(self.inputs), thread_name_prefix="biodumpy-lane") as executor:
+			futures = [executor.submit(self._lane, inp, queue, output_path, current_date, bulk_writers, last_tick) for inp, queue in lanes.items()]
+			try:
+				for el in self._progress(elements):
+					for queue in lanes.values():
+						queue.put(el)
+			finally:
+				# Signal the end of the elements to every lane
+				for queue in lanes.values():
+					queue.put(None)
+
+			for future in futures:
+				future.result()
+
+	def _lane(self, inp, queue, output_path, current_date, bulk_writers, last_tick):
+		# Each lane only updates the last tick of its module, so the sleep policy applies per module.
+		error = None
+		while (el := queue.get()) is not None:
+			# After a failure keep draining the queue, so the producer never blocks on a dead lane.
+			if error is None:
+				try:
+					self._process(inp, el, output_path, current_date, bulk_writers, last_tick)
+				except Exception as e:
+					error = e
+
+		if error is not None:
+			raise error
+
+	async def _aworker(self, inp, queue, throttle, output_path, current_date, bulk_writers, executor):
+		error = None
+		while (el := await queue.get()) is not None:
+			# After a failure keep draining the queue, so the producer never blocks on a dead worker.
+			if error is None:
+				try:
+					await self._aprocess(inp, el, throttle, output_path, current_date, bulk_writers, executor)
+				except Exception as e:
+					error = e
+
+		if error is not None:
+			raise error
+
+	async def _aprocess(self, inp, el, throttle, output_path, current_date, bulk_writers, executor):
+		"""
+		Asynchronous version of ``_process``.
+		"""
+		import asyncio
+
+		module_name = type(inp).__name__
+		name = el["query"]
+
+		if self._checkpoint is not None and self._checkpoint.done(module_name, name):
+			self._count(inp, "skipped")
+			return
+
+		if self._rejected(inp, el):
+			return
+
+		await self._athrottle(inp, throttle)
+
+		with self._span(inp, el) as span:
+			try:
+				tqdm.write(f"[{module_name}] Downloading...")
+				payload = await self._adownload(inp, el, executor)
+				self._succeed(inp)
+			except Exception as e:
+				self._fail(inp, el, e)
+				if span is not None:
+					span.fail(str(e))
+				return
+
+			# Writing to disk (or waiting for room in the queue of the background writer) must not block the event loop
+			await asyncio.get_running_loop().run_in_executor(executor, contextvars.copy_context().run, self._save, inp, el, payload, output_path, current_date, bulk_writers)
+
+	async def _adownload(self, inp, el, executor):
+		"""
+		Asynchronous version of ``_download``. Modules without a native ``_adownload`` run in the executor.
+		"""
+		import asyncio
+
+		hooks = self.hooks
+		if hooks is not None:
+			hooks.fire("on_request", inp=inp, element=el)
+
+		token = current_query.set(el["query"])
+		start = time.monotonic()
+		try:
+			if type(inp)._adownload is Input._adownload:
+				payload = await asyncio.get_running_loop().run_in_executor(executor, contextvars.copy_context().run, lambda: inp._download(**el))
+			else:
+				payload = await inp._adownload(**el)
+		except Exception as e:
+			if hooks is not None:
+				hooks.fire("on_error", inp=inp, element=el, error=e, elapsed=time.monotonic() - start)
+			raise
 		finally:
-			for inp, payload in bulk_input.items():
-				dump(file_name=output_path.format(date=current_date, module=type(inp).__name__, name="bulk"), obj_list=payload, output_format=inp.output_format)
-
-			if log_handler.buffer:
-				print("---- Please review the dump file; errors have been detected ----")
-				down_path = str()
-				for folder in output_path.split("/"):
-					if "{" in folder:
-						break
-					down_path = f"{down_path}{folder}/"
-
-				create_directory(down_path)
-				with open(f"{down_path}/dump_{current_date}.log", "w") as f:
-					for record in log_handler.buffer:
-						log_entry = f"{record.levelname}: {record.getMessage()}\n"
-						f.write(log_entry)
+			current_query.reset(token)
+			elapsed = time.monotonic() - start
+			if self.metrics is not None:
+				self.metrics.observe("biodumpy_download_seconds", elapsed, module=type(inp).__name__)
+
+		if hooks is not None:
+			hooks.fire("on_response", inp=inp, element=el, elapsed=elapsed)
+			hooks.fire("on_payload", inp=inp, element=el, payload=payload)
+
+		return payload
+
+	async def _athrottle(self, inp, throttle):
+		"""
+		Space the start of consecutive downloads of a module by its ``sleep`` time.
+		"""
+		import asyncio
+
+		lock, _ = throttle
+		async with lock:
+			last_start = throttle[1]
+			if last_start is not None:
+				delta_last_call = time.monotonic() - last_start
+				if delta_last_call < inp.sleep:
+					if self.debug:
+						tqdm.write(f"[{type(inp).__name__}] Blocking for {inp.sleep - delta_last_call} seconds...")
+					await asyncio.sleep(inp.sleep - delta_last_call)
+					if self.metrics is not None:
+						self.metrics.inc("biodumpy_sleep_seconds_total", inp.sleep - delta_last_call, module=type(inp).__name__)
+			throttle[1] = time.monotonic()
+
+
+# Time of the last download of each module in a worker process, so that the sleep also applies between shards
+_worker_ticks = {}
+# Circuit breakers of the modules in a worker process, so that an open circuit stays open in the next shards
+_worker_breakers = {}
+
+
+def _run_shard(inputs, elements, output_path, current_date, debug, parallel, client, checkpoint, hooks, ledger, circuit_breaker, serializer, background_writer):
+	"""
+	Process a shard of elements in a worker process.
+
+	Returns
+	-------
+	tuple
+		The bulk payloads of each input (in the order of the inputs), the (level, message) of the logged records, the
+		metrics collected by the worker and its tracer (None if disabled).
+	"""
+	log_handler = MemoryHandler(capacity=1024)
+	root = logging.getLogger()
+	root.handlers = [log_handler]
+	root.setLevel(logging.ERROR)
+
+	# The worker starts from empty metrics, merged into the ones of the main process
+	if client.metrics is not None:
+		client.metrics = Metrics()
+	if client.tracer is not None:
+		client.tracer = client.tracer.fork()
+
+	bdp = Biodumpy(
+		inputs,
+		loading_bar=False,
+		debug=debug,
+		parallel=parallel,
+		client=client,
+		hooks=hooks,
+		circuit_breaker=circuit_breaker,
+		serializer=serializer,
+		background_writer=background_writer,
+	)
+	bdp._checkpoint = checkpoint
+	bdp._ledger = ledger
+	if not _worker_breakers:
+		_worker_breakers.update(bdp._create_breakers())
+	bdp._breakers = _worker_breakers
+	bdp._writer = bdp._create_writer()
+
+	# The bulk payloads go back to the main process, which writes them in order
+	bulk_writers = {inp: _BulkBuffer() for inp in bdp.inputs if inp.bulk}
+	try:
+		bdp._run(elements, output_path, current_date, bulk_writers, _worker_ticks)
+	finally:
+		# The bulk payloads are complete, and the checkpoint up to date, once the queued writes are done
+		error = bdp._close_writer()
+		if checkpoint is not None:
+			checkpoint.close()
+		if error is not None:
+			raise error
+
+	return [bulk_writers.get(inp, []) for inp in bdp.inputs], [(record.levelno, record.getMessage()) for record in log_handler.buffer], client.metrics, client.tracer
+
+
+class _BulkBuffer(list):
+	"""
+	In-memory replacement of BulkWriter used by the worker processes.
+	"""
+
+	def write(self, payload):
+		self.extend(payload)
@@ -0,0 +1,109 @@
+import threading
+import time
+
+from .ledger import error_status
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitOpenError(Exception):
+	"""
+	Raised in place of a download skipped because the circuit of its input module is open.
+	"""
+
+
+class CircuitBreaker:
+	"""
+	Thread-safe circuit breaker of an input module.
+
+	The circuit opens after ``threshold`` consecutive outages of the service: connection errors, timeouts and
+	HTTP 429 or 5xx responses. Other errors (e.g. a taxon not found) show that the service answers and close the
+	circuit. While the circuit is open, downloads are rejected without sending any request. After ``cooldown``
+	seconds the circuit is half-open: a single download probes the service, closing the circuit if it succeeds or
+	opening it again if it fails.
+
+	Parameters
+	----------
+	threshold : int
+		Number of consecutive outages opening the circuit.
+	cooldown : float, optional
+		Time, in seconds, before an open circuit lets a probe through.
+		Default is 60.
+	"""
+
+	def __init__(self, threshold: int, cooldown: float = 60):
+		if threshold < 1:
+			raise ValueError("Invalid threshold. Expected a positive integer.")
+
+		self.threshold = threshold
+		self.cooldown = cooldown
+		self.state = CLOSED
+		self.failures = 0
+		self.opened_at = None
+		self._probing = False
+		self._lock = threading.Lock()
+
+	def __getstate__(self):
+		state = self.__dict__.copy()
+		state["_lock"] = None
+		return state
+
+	def __setstate__(self, state):
+		self.__dict__.update(state)
+		self._lock = threading.Lock()
+
+	@staticmethod
+	def is_outage(error: BaseException) -> bool:
+		"""
+		Whether an error shows that the service is down or overloaded, rather than a problem with the query.
+		"""
+		# Connection errors and timeouts of requests and urllib are OSError
+		if isinstance(error, OSError) and error_status(error) is None:
+			return True
+
+		status = error_status(error)
+		return status is not None and (status == 429 or status >= 500)
+
+	def allow(self) -> bool:
+		"""
+		Whether a download can be sent. When the cooldown is over, the first caller becomes the probe.
+		"""
+		with self._lock:
+			if self.state == CLOSED:
+				return True
+
+			if self.state == OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+				self.state = HALF_OPEN
+
+			if self.state == HALF_OPEN and not self._probing:
+				self._probing = True
+				return True
+
+			return False
+
+	def success(self):
+		with self._lock:
+			self.state = CLOSED
+			self.failures = 0
+			self._probing = False
+
+	def failure(self, error: BaseException) -> bool:
+		"""
+		Report a failed download. Returns True if the failure opened the circuit.
+		"""
+		if not self.is_outage(error):
+			self.success()
+			return False
+
+		with self._lock:
+			self.failures += 1
+			self._probing = False
+			if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.threshold):
+				opened = self.state == CLOSED
+				self.state = OPEN
+				self.opened_at = time.monotonic()
+				return opened
+
+			return False
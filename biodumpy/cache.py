@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from typing import TYPE_CHECKING
+from urllib.parse import urlencode
+
+# requests is imported when a response is rebuilt, to keep ``import biodumpy`` fast
+if TYPE_CHECKING:
+	import requests
+
+
+class CacheEntry:
+	"""
+	A response stored in the cache.
+	"""
+
+	def __init__(self, url, status, headers, content, etag, last_modified, stored_at):
+		self.url = url
+		self.status = status
+		self.headers = headers
+		self.content = content
+		self.etag = etag
+		self.last_modified = last_modified
+		self.stored_at = stored_at
+
+	def age(self) -> float:
+		return time.time() - self.stored_at
+
+	def response(self) -> requests.Response:
+		"""
+		Rebuild the ``requests.Response`` of the entry.
+		"""
+		import requests
+		from requests.structures import CaseInsensitiveDict
+		from requests.utils import get_encoding_from_headers
+
+		response = requests.Response()
+		response.url = self.url
+		response.status_code = self.status
+		response.headers = CaseInsensitiveDict(self.headers)
+		response.encoding = get_encoding_from_headers(response.headers)
+		response._content = self.content
+		return response
+
+
+class ResponseCache:
+	"""
+	Persistent HTTP response cache stored in a SQLite database in WAL mode, which can be shared by several threads
+	and processes.
+
+	Responses are keyed by the normalized url and query parameters. An entry younger than the TTL of the module
+	is returned without sending any request; an older entry with an ETag or Last-Modified header is revalidated
+	with a conditional request. When the cache exceeds its maximum size, the least recently used entries are
+	removed.
+
+	Parameters
+	----------
+	path : str, optional
+		Path of the SQLite database.
+		Default is 'biodumpy_cache.sqlite'.
+	ttl : float, optional
+		Time to live of the entries, in seconds.
+		Default is 86400 (one day).
+	ttls : dict, optional
+		Time to live per module, e.g. {'COL': 604800, 'GBIF': 3600}. Modules not in the dictionary use ``ttl``.
+		Default is None.
+	max_size : int, optional
+		Maximum size of the stored content, in bytes.
+		Default is 1 GB.
+
+	Example
+	-------
+	>>> from biodumpy import Biodumpy
+	>>> from biodumpy.cache import ResponseCache
+	>>> from biodumpy.inputs import COL, WORMS
+	>>> cache = ResponseCache('cache.sqlite', ttl=7 * 86400, ttls={'WORMS': 30 * 86400})
+	>>> bdp = Biodumpy([COL(bulk=True), WORMS(bulk=True)], cache=cache)
+	"""
+
+	# Number of writes between two checks of the size of the cache.
+	EVICTION_INTERVAL = 100
+
+	def __init__(self, path: str = "biodumpy_cache.sqlite", ttl: float = 86400, ttls: dict | None = None, max_size: int = 2**30):
+		self.path = path
+		self.ttl = ttl
+		self.ttls = ttls or {}
+		self.max_size = max_size
+		self._local = threading.local()
+		self._writes = 0
+
+		with self._connection() as connection:
+			connection.execute(
+				"CREATE TABLE IF NOT EXISTS responses ("
+				"key TEXT PRIMARY KEY, url TEXT, status INTEGER, headers TEXT, content BLOB, size INTEGER, "
+				"etag TEXT, last_modified TEXT, stored_at REAL, accessed_at REAL)"
+			)
+			connection.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+
+	def __getstate__(self):
+		# SQLite connections cannot be pickled: worker processes open their own
+		state = self.__dict__.copy()
+		state["_local"] = None
+		return state
+
+	def __setstate__(self, state):
+		self.__dict__.update(state)
+		self._local = threading.local()
+
+	def _connection(self) -> sqlite3.Connection:
+		# One connection per thread
+		connection = getattr(self._local, "connection", None)
+		if connection is None:
+			connection = sqlite3.connect(self.path, timeout=60)
+			connection.execute("PRAGMA journal_mode=WAL")
+			connection.execute("PRAGMA synchronous=NORMAL")
+			self._local.connection = connection
+
+		return connection
+
+	@staticmethod
+	def key(url: str, params: dict | None = None) -> str:
+		"""
+		Normalized key of a request: the url followed by the sorted query parameters, without the None values.
+		"""
+		if not params:
+			return url
+
+		items = sorted((str(k), str(v)) for k, v in params.items() if v is not None)
+		return f"{url}{'&' if '?' in url else '?'}{urlencode(items)}" if items else url
+
+	def ttl_for(self, module: str | None = None) -> float:
+		return self.ttls.get(module, self.ttl)
+
+	def get(self, key: str) -> CacheEntry:
+		with self._connection() as connection:
+			row = connection.execute("SELECT url, status, headers, content, etag, last_modified, stored_at FROM responses WHERE key = ?", (key,)).fetchone()
+			if row is None:
+				return None
+
+			connection.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+
+		url, status, headers, content, etag, last_modified, stored_at = row
+		return CacheEntry(url, status, json.loads(headers), content, etag, last_modified, stored_at)
+
+	def put(self, key: str, url: str, content: bytes, headers: dict | None = None, status: int = 200):
+		headers = dict(headers or {})
+		# Header names are case insensitive
+		validators = {name.lower(): value for name, value in headers.items()}
+		now = time.time()
+		with self._connection() as connection:
+			connection.execute(
+				"INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+				(key, url, status, json.dumps(headers), content, len(content), validators.get("etag"), validators.get("last-modified"), now, now),
+			)
+
+		self._writes += 1
+		if self._writes % ResponseCache.EVICTION_INTERVAL == 0:
+			self.evict()
+
+	def refresh(self, key: str):
+		"""
+		Mark an entry as fresh after a successful revalidation.
+		"""
+		now = time.time()
+		with self._connection() as connection:
+			connection.execute("UPDATE responses SET stored_at = ?, accessed_at = ? WHERE key = ?", (now, now, key))
+
+	def evict(self):
+		"""
+		Remove the least recently used entries until the cache fits in its maximum size.
+		"""
+		with self._connection() as connection:
+			connection.execute(
+				"DELETE FROM responses WHERE key IN (SELECT key FROM (SELECT key, SUM(size) OVER (ORDER BY accessed_at DESC, key) AS total FROM responses) WHERE total > ?)",
+				(self.max_size,),
+			)
+
+	def size(self) -> int:
+		with self._connection() as connection:
+			return connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
@@ -0,0 +1,124 @@
+import copy
+import json
+import os
+import shutil
+import threading
+
+from .utils import create_directory
+
+
+class Checkpoint:
+	"""
+	Append-only manifest of the (module, query) pairs completed by a run, stored in the root of the output path.
+
+	The payloads of bulk modules are also spooled to disk, so that the bulk outputs can be rebuilt when an
+	interrupted run is resumed.
+
+	Parameters
+	----------
+	root : str
+		Root folder of the output path.
+	resume : bool, optional
+		If True, the manifest of the previous run is loaded. If False, the previous manifest and spool are removed.
+		Default is False.
+	"""
+
+	DIRECTORY = ".checkpoint"
+
+	def __init__(self, root: str, resume: bool = False):
+		self.root = os.path.join(root, Checkpoint.DIRECTORY)
+		self.path = os.path.join(self.root, "manifest.jsonl")
+		self.completed = {}
+
+		if resume:
+			self._load()
+		else:
+			shutil.rmtree(self.root, ignore_errors=True)
+
+		self._file = None
+		self._lock = threading.Lock()
+
+	def __getstate__(self):
+		# Worker processes reopen the manifest in append mode
+		state = self.__dict__.copy()
+		state["_file"] = None
+		state["_lock"] = None
+		return state
+
+	def __setstate__(self, state):
+		self.__dict__.update(state)
+		self._lock = threading.Lock()
+
+	def _load(self):
+		if not os.path.exists(self.path):
+			return
+
+		with open(self.path, "r") as f:
+			for line in f:
+				try:
+					record = json.loads(line)
+				except json.JSONDecodeError:
+					# Last line of an interrupted run
+					continue
+				self.completed[(record["module"], record["query"])] = None
+
+	def _open(self):
+		create_directory(self.path)
+
+		# Terminate the last line if the previous run was interrupted while writing it
+		truncated = False
+		if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+			with open(self.path, "rb") as f:
+				f.seek(-1, os.SEEK_END)
+				truncated = f.read(1) != b"\n"
+
+		self._file = open(self.path, "a")
+		if truncated:
+			self._file.write("\n")
+
+	def done(self, module: str, query: str) -> bool:
+		return (module, query) in self.completed
+
+	def subset(self, modules, queries) -> "Checkpoint":
+		"""
+		Copy of the checkpoint that only knows the completed pairs of the given modules and queries, e.g. to send the
+		shard of a worker process the part of the manifest it needs.
+		"""
+		subset = copy.copy(self)
+		subset.completed = {(module, query): None for query in queries for module in modules if (module, query) in self.completed}
+		return subset
+
+	def add(self, module: str, query: str):
+		"""
+		Record a completed (module, query) pair.
+		"""
+		line = json.dumps({"module": module, "query": query}) + "\n"
+		with self._lock:
+			if self._file is None:
+				self._open()
+
+			self._file.write(line)
+			self._file.flush()
+			self.completed[(module, query)] = None
+
+	def spool_path(self, module: str, query: str) -> str:
+		"""
+		Path (without extension) of the spooled payload of a bulk module.
+		"""
+		return os.path.join(self.root, "spool", module, query.replace("/", "_"))
+
+	def spooled(self, module: str):
+		"""
+		Yield the spooled payloads of a bulk module, in the order of completion.
+		"""
+		for completed_module, query in list(self.completed):
+			file_name = f"{self.spool_path(completed_module, query)}.json"
+			if completed_module == module and os.path.exists(file_name):
+				with open(file_name, "r") as f:
+					yield json.load(f)
+
+	def close(self):
+		with self._lock:
+			if self._file is not None:
+				self._file.close()
+				self._file = None
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import inspect
+import os
+import sys
+
+from .biodumpy import Biodumpy
+from .cache import ResponseCache
+from .disambiguation import Disambiguation
+from .registry import registry
+from .utils import COMPRESSIONS, _read_taxa_lines, _read_taxa_rows, compression_of, read_taxa_csv, read_taxa_dwca, read_taxa_text
+
+# Biodumpy parameters that can be set in the configuration file
+CONFIG_OPTIONS = ("rate_limits", "processes", "checkpoint", "bulk_max_size", "parallel", "circuit_breaker", "background_writer")
+
+
+def build_parser() -> argparse.ArgumentParser:
+	parser = argparse.ArgumentParser(
+		prog="biodumpy", description="Download biodiversity data for a list of taxa.", epilog="Example: biodumpy taxa.txt --config inputs.toml --jobs 4"
+	)
+	parser.add_argument("taxa", nargs="?", default="-", help="File with the taxa (text, CSV or Darwin Core Archive), or '-' to read them from stdin (default).")
+	parser.add_argument("-c", "--config", help="TOML or YAML file with the input modules and their parameters.")
+	parser.add_argument("-i", "--input", action="append", default=[], dest="inputs", metavar="NAME", help="Input module to use with its default parameters. Can be repeated.")
+	parser.add_argument("-o", "--output", dest="output_path", help="Output path template (default: downloads/{date}/{module}/{name}).")
+	parser.add_argument("-j", "--jobs", type=int, default=1, help="Number of taxa downloaded at the same time by each input module (default: 1).")
+	parser.add_argument("-p", "--processes", type=int, help="Number of worker processes.")
+	parser.add_argument("--format", choices=["text", "csv", "dwca"], help="Format of the taxa file (default: guessed from its extension).")
+	parser.add_argument("--column", default="scientificName", help="Column (CSV) or term (Darwin Core Archive) with the taxa (default: scientificName).")
+	parser.add_argument("--checkpoint", action="store_true", default=None, help="Record the completed taxa, so that the run can be resumed.")
+	parser.add_argument("--resume", action="store_true", help="Skip the taxa completed by a previous run with the same output path.")
+	parser.add_argument("--retry-failed", metavar="LEDGER", help="Download again the failed taxa recorded in a failure ledger, instead of reading the taxa.")
+	parser.add_argument("--circuit-breaker", type=int, metavar="N", help="Stop querying an input module after N consecutive outages, probing it periodically.")
+	parser.add_argument("--background-writer", action="store_true", default=None, help="Write the downloaded data in a background thread, while the next taxa are downloaded.")
+	parser.add_argument("--cache", help="Path of the SQLite response cache.")
+	parser.add_argument(
+		"--prompt", action="store_true", help="Ask which taxon to use when a name is ambiguous, instead of deferring it to deferred.jsonl (not with taxa read from stdin)."
+	)
+	parser.add_argument("--list-inputs", action="store_true", help="List the available input modules and their capabilities, and exit.")
+	parser.add_argument("--no-progress", action="store_true", help="Hide the progress bar.")
+	parser.add_argument("--debug", action="store_true", help="Print detailed information during the run.")
+	return parser
+
+
+def load_config(file_name: str) -> dict:
+	"""
+	Load a TOML or YAML configuration file, e.g.:
+
+	.. code-block:: toml
+
+		output_path = "downloads/{date}/{module}/{name}"
+		cache = "biodumpy_cache.sqlite"
+
+		[rate_limits]
+		"api.gbif.org" = [10, 5]
+
+		[[inputs]]
+		name = "GBIF"
+		occ = true
+		bulk = true
+
+		[[inputs]]
+		name = "NCBI"
+		mail = "user@mail.com"
+	"""
+	extension = os.path.splitext(file_name)[1].lower()
+	if extension == ".toml":
+		try:
+			import tomllib
+		except ImportError:
+			# Python < 3.11
+			try:
+				import tomli as tomllib
+			except ImportError:
+				raise ValueError("Invalid config. TOML files require tomli on Python < 3.11 (pip install tomli).")
+
+		with open(file_name, "rb") as f:
+			config = tomllib.load(f)
+	elif extension in (".yaml", ".yml"):
+		try:
+			import yaml
+		except ImportError:
+			raise ValueError("Invalid config. YAML files require PyYAML (pip install pyyaml).")
+
+		with open(file_name, "r", encoding="utf-8") as f:
+			config = yaml.safe_load(f) or {}
+	else:
+		raise ValueError('Invalid config. Expected a ".toml", ".yaml" or ".yml" file.')
+
+	if not isinstance(config, dict):
+		raise ValueError("Invalid config. Expected a table of options.")
+
+	return config
+
+
+def create_inputs(specs: list, disambiguation=None) -> list:
+	"""
+	Create the input modules from their specifications: names, or dictionaries with a 'name' key and the
+	parameters of the module. ``disambiguation`` is the policy of the modules resolving ambiguous names (see
+	``biodumpy.disambiguation.Disambiguation``) whose specification does not set one.
+	"""
+	inputs = []
+	for spec in specs:
+		if isinstance(spec, str):
+			spec = {"name": spec}
+
+		if not isinstance(spec, dict) or "name" not in spec:
+			raise ValueError(f"Invalid input {spec!r}. Expected a name or a table with a 'name' key.")
+
+		params = dict(spec)
+		name = params.pop("name")
+		if disambiguation is not None and "disambiguation" not in params and "disambiguation" in inspect.signature(registry.get(name)).parameters:
+			params["disambiguation"] = disambiguation
+		inputs.append(registry.create(name, **params))
+
+	return inputs
+
+
+def read_taxa(source: str, file_format: str | None = None, column: str = "scientificName"):
+	"""
+	Lazily read the taxa from a file or, if source is '-', from stdin.
+	"""
+	# e.g. taxa.csv.gz
+	compression = compression_of(source)
+	name = source[: -len(COMPRESSIONS[compression])] if compression else source
+
+	if file_format is None:
+		extension = os.path.splitext(name)[1].lower()
+		if extension in (".csv", ".tsv"):
+			file_format = "csv"
+		elif extension == ".zip" or os.path.isdir(source):
+			file_format = "dwca"
+		else:
+			file_format = "text"
+
+	delimiter = "\t" if name.endswith(".tsv") else ","
+	if source == "-":
+		if file_format == "dwca":
+			raise ValueError("Invalid taxa. Darwin Core Archives cannot be read from stdin.")
+		return _read_taxa_rows(csv.reader(sys.stdin, delimiter=delimiter), column) if file_format == "csv" else _read_taxa_lines(sys.stdin)
+
+	if file_format == "csv":
+		return read_taxa_csv(source, column=column, delimiter=delimiter)
+	if file_format == "dwca":
+		return read_taxa_dwca(source, term=column)
+	return read_taxa_text(source)
+
+
+def main(argv: list | None = None) -> int:
+	"""
+	Entry point of the ``biodumpy`` command. Returns 0 if every taxon was downloaded, 1 if some downloads failed.
+	"""
+	parser = build_parser()
+	args = parser.parse_args(argv)
+
+	if args.list_inputs:
+		for name in registry.names():
+			capabilities = registry.capabilities(name)
+			limits = ", ".join(f"{host} {rate}/s (burst {burst})" for host, (rate, burst) in capabilities["rate_limits"].items())
+			print(f"{name:<16}{limits}".rstrip())
+		return 0
+
+	try:
+		config = load_config(args.config) if args.config else {}
+		specs = [*config.get("inputs", []), *args.inputs]
+		if not specs:
+			raise ValueError("Invalid inputs. Expected --input or an 'inputs' list in the config file.")
+
+		if args.jobs < 1:
+			raise ValueError("Invalid jobs. Expected a positive integer.")
+
+		if args.resume and args.retry_failed is not None:
+			raise ValueError("Invalid parameters: --resume and --retry-failed cannot be used together.")
+
+		options = {key: config[key] for key in CONFIG_OPTIONS if key in config}
+		if "rate_limits" in options:
+			options["rate_limits"] = {host: tuple(limit) for host, limit in options["rate_limits"].items()}
+		if args.processes is not None:
+			options["processes"] = args.processes
+		if args.checkpoint is not None:
+			options["checkpoint"] = args.checkpoint
+		if args.circuit_breaker is not None:
+			options["circuit_breaker"] = args.circuit_breaker
+		if args.background_writer is not None:
+			options["background_writer"] = args.background_writer
+		if options.get("processes", 1) > 1 and args.jobs > 1:
+			raise ValueError("Invalid parameters: --jobs and --processes cannot be used together.")
+
+		cache = args.cache or config.get("cache")
+		if cache is not None:
+			options["cache"] = ResponseCache(cache) if isinstance(cache, str) else ResponseCache(**cache)
+
+		# Unattended by default: ambiguous names are deferred
+		inputs = create_inputs(specs, disambiguation="prompt" if args.prompt else "defer")
+		if args.taxa == "-" and args.retry_failed is None and any("prompt" in getattr(inp, "disambiguation", Disambiguation("defer")).steps for inp in inputs):
+			raise ValueError("Invalid parameters: the taxa are read from stdin, so the 'prompt' disambiguation cannot read the answers of the user.")
+
+		bdp = Biodumpy(inputs, loading_bar=not args.no_progress, debug=args.debug, metrics=True, **options)
+		taxa = read_taxa(args.taxa, args.format, args.column) if args.retry_failed is None else None
+	except (ValueError, TypeError, OSError) as e:
+		parser.error(str(e))
+
+	output_path = args.output_path or config.get("output_path", "downloads/{date}/{module}/{name}")
+	try:
+		if args.retry_failed is not None:
+			bdp.retry_failed(args.retry_failed, output_path=output_path)
+		elif args.jobs > 1:
+			import asyncio
+
+			asyncio.run(bdp.astart(taxa, output_path=output_path, concurrency=args.jobs, resume=args.resume))
+		else:
+			bdp.start(taxa, output_path=output_path, resume=args.resume)
+	except KeyboardInterrupt:
+		print("Interrupted.", file=sys.stderr)
+		return 130
+	finally:
+		print(bdp.metrics.summary())
+
+	failed = bdp.metrics.value("biodumpy_elements_total", outcome="failed") + bdp.metrics.value("biodumpy_elements_total", outcome="rejected")
+	return 1 if failed else 0
@@ -0,0 +1,367 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import TYPE_CHECKING
+from urllib.error import HTTPError
+
+from .adaptive import THROTTLE_STATUS, AdaptiveController, parse_retry_after
+from .cache import ResponseCache
+from .hedging import Hedger
+from .metrics import Metrics, current_query, endpoint
+from .ratelimit import RateLimiter
+from .tracing import Tracer
+
+# requests is imported when the first session is opened, to keep ``import biodumpy`` fast
+if TYPE_CHECKING:
+	import requests
+
+
+class HttpClient:
+	"""
+	HTTP layer shared by the input modules. Every request waits for a token of its remote host before being sent.
+
+	Each thread keeps a ``requests.Session`` with a pool of keep-alive connections per host, so consecutive
+	requests to the same service reuse their TCP and TLS connections. Requests have default timeouts and are
+	retried with an exponential backoff on connection errors. With a ``Hedger``, slow GET requests are sent a second
+	time and the first response is used.
+
+	Requests throttled by the host (HTTP 429/503) are retried after the pause decided by the adaptive controller,
+	so that a transient throttle slows the run down instead of failing the taxon.
+
+	Parameters
+	----------
+	limiter : RateLimiter, optional
+		Rate limiter shared by all the requests of the client. If None, a limiter with the default limits is used.
+		Default is None.
+	controller : AdaptiveController, optional
+		Adaptive concurrency controller shared by all the requests of the client. If None, a controller with the
+		default settings is used.
+		Default is None.
+	max_retries : int, optional
+		Maximum number of retries of a throttled request.
+		Default is 3.
+	cache : ResponseCache, optional
+		Persistent cache of the GET responses. If None, responses are not cached.
+		Default is None.
+	timeout : float or tuple, optional
+		Default (connect, read) timeout of the requests, in seconds.
+		Default is (10, 60).
+	pool_connections : int, optional
+		Number of hosts whose connections are kept alive.
+		Default is 10.
+	pool_maxsize : int, optional
+		Maximum number of connections kept alive per host.
+		Default is 10.
+	retries : int, optional
+		Maximum number of retries of a request failing with a connection error, a read error or an HTTP 500, 502
+		or 504 status.
+		Default is 3.
+	backoff_factor : float, optional
+		Backoff factor between the retries: the n-th retry waits backoff_factor * 2 ** (n - 1) seconds.
+		Default is 0.5.
+	metrics : Metrics, optional
+		Collection of the request metrics (count, bytes, latency, retries, cache hits and waits) by module and
+		endpoint. If None, no metrics are collected.
+		Default is None.
+	tracer : Tracer, optional
+		Tracer recording a span for each request, child of the span of the element being downloaded. If None, the
+		requests are not traced.
+		Default is None.
+	hedger : Hedger, optional
+		Hedging policy of the GET requests (see ``biodumpy.hedging.Hedger``): a request not answered after the
+		usual latency of its endpoint is duplicated, within the rate limit of its host. If None, requests are not
+		hedged.
+		Default is None.
+
+	Example
+	-------
+	>>> from biodumpy import Biodumpy
+	>>> from biodumpy.client import HttpClient
+	>>> from biodumpy.inputs import GBIF
+	>>> client = HttpClient(timeout=(5, 30), pool_maxsize=20, retries=5, backoff_factor=1)
+	>>> bdp = Biodumpy([GBIF(occ=True)], client=client)
+	"""
+
+	def __init__(
+		self,
+		limiter: RateLimiter = None,
+		controller: AdaptiveController = None,
+		max_retries: int = 3,
+		cache: ResponseCache = None,
+		timeout=(10, 60),
+		pool_connections: int = 10,
+		pool_maxsize: int = 10,
+		retries: int = 3,
+		backoff_factor: float = 0.5,
+		metrics: Metrics = None,
+		tracer: Tracer = None,
+		hedger: Hedger = None,
+	):
+		self.limiter = limiter if limiter is not None else RateLimiter()
+		self.controller = controller if controller is not None else AdaptiveController()
+		self.max_retries = max_retries
+		self.cache = cache
+		self.timeout = timeout
+		self.pool_connections = pool_connections
+		self.pool_maxsize = pool_maxsize
+		self.retries = retries
+		self.backoff_factor = backoff_factor
+		self.metrics = metrics
+		self.tracer = tracer
+		self.hedger = hedger
+		# Name of the input module using the client
+		self.module = None
+		self._local = threading.local()
+
+	def __getstate__(self):
+		# Sessions cannot be pickled: worker processes open their own
+		state = self.__dict__.copy()
+		state["_local"] = None
+		return state
+
+	def __setstate__(self, state):
+		self.__dict__.update(state)
+		self._local = threading.local()
+
+	def session(self) -> requests.Session:
+		"""
+		Return the session of the current thread, keeping a pool of connections per host.
+		"""
+		session = getattr(self._local, "session", None)
+		if session is None:
+			import requests
+			from requests.adapters import HTTPAdapter
+			from urllib3.util.retry import Retry
+
+			retry = Retry(
+				total=self.retries,
+				backoff_factor=self.backoff_factor,
+				# HTTP 429 and 503 are handled by the adaptive controller
+				status_forcelist=(500, 502, 504),
+				allowed_methods=frozenset({"GET"}),
+				raise_on_status=False,
+			)
+			adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize, max_retries=retry)
+
+			session = requests.Session()
+			session.mount("http://", adapter)
+			session.mount("https://", adapter)
+			self._local.session = session
+
+		return session
+
+	def for_module(self, module: str):
+		"""
+		Return a view of the client for an input module, sharing its limiter, controller and cache.
+		"""
+		# Not copy.copy, which would go through __getstate__ and drop the sessions
+		client = object.__new__(HttpClient)
+		client.__dict__.update(self.__dict__)
+		client.module = module
+		return client
+
+	def request_time(self) -> float:
+		"""
+		Total time spent by the current thread in the requests sent by the client, in seconds.
+		"""
+		return getattr(self._local, "request_time", 0.0)
+
+	def _labels(self, url):
+		return {"module": self.module, "endpoint": endpoint(url, current_query.get())}
+
+	def _record(self, url, result, status, latency, waits):
+		"""
+		Record the metrics of a request.
+		"""
+		labels = self._labels(url)
+		self.metrics.inc("biodumpy_requests_total", status=status, **labels)
+		self.metrics.observe("biodumpy_request_seconds", latency, **labels)
+		self.metrics.inc("biodumpy_concurrency_wait_seconds_total", waits[0], **labels)
+		self.metrics.inc("biodumpy_rate_limit_wait_seconds_total", waits[1], **labels)
+
+		# The content of a requests.Response is already loaded, unless the response is streamed
+		content = getattr(result, "_content", None)
+		if isinstance(content, bytes):
+			self.metrics.inc("biodumpy_response_bytes_total", len(content), **labels)
+
+		# Retries made by urllib3 on connection errors and HTTP 500, 502 and 504
+		retries = getattr(getattr(getattr(result, "raw", None), "retries", None), "history", None)
+		if retries:
+			self.metrics.inc("biodumpy_retries_total", len(retries), reason="error", **labels)
+
+	def _start_span(self, url, attempt):
+		if self.tracer is None:
+			return None
+
+		labels = self._labels(url)
+		return self.tracer.start_span(labels["endpoint"], {"url.full": url, "biodumpy.module": labels["module"], "biodumpy.attempt": attempt})
+
+	def _record_hit(self, url, kind):
+		if self.metrics is not None:
+			self.metrics.inc("biodumpy_cache_hits_total", kind=kind, **self._labels(url))
+
+	def get(self, url: str, params: dict | None = None, **kwargs) -> requests.Response:
+		kwargs.setdefault("timeout", self.timeout)
+
+		if self.cache is None:
+			return self._send(url, params, **kwargs)
+
+		key = ResponseCache.key(url, params)
+		entry = self.cache.get(key)
+		if entry is not None and entry.age() < self.cache.ttl_for(self.module):
+			self._record_hit(url, "fresh")
+			return entry.response()
+
+		# Revalidate a stale entry with a conditional request
+		headers = dict(kwargs.pop("headers", None) or {})
+		if entry is not None:
+			if entry.etag:
+				headers["If-None-Match"] = entry.etag
+			if entry.last_modified:
+				headers["If-Modified-Since"] = entry.last_modified
+
+		response = self._send(url, params, headers=headers, **kwargs)
+
+		if response.status_code == 304 and entry is not None:
+			self.cache.refresh(key)
+			self._record_hit(url, "revalidated")
+			return entry.response()
+
+		if response.status_code == 200:
+			self.cache.put(key, response.url, response.content, response.headers)
+
+		return response
+
+	def _send(self, url, params, **kwargs):
+		"""
+		Send a GET request, duplicated if it is not answered after the usual latency of its endpoint.
+		"""
+		if self.hedger is None or kwargs.get("stream"):
+			return self.call(url, self._get, url, params=params, **kwargs)
+
+		from concurrent.futures import FIRST_COMPLETED, wait
+
+		key = (self.module, endpoint(url, current_query.get()))
+		delay = self.hedger.delay(key)
+		if delay is None:
+			# Not enough latencies of the endpoint yet
+			return self._timed(key, url, params, kwargs)
+
+		start = time.monotonic()
+		try:
+			primary = self.hedger.submit(self._timed, key, url, params, kwargs)
+			if wait([primary], timeout=delay).done or not self.controller.try_acquire(url):
+				return primary.result()
+			if not self.limiter.try_acquire(url):
+				self.controller.release(url)
+				return primary.result()
+
+			hedge = self.hedger.submit(self._timed, key, url, params, kwargs, reserved=True)
+			futures = [primary, hedge]
+
+			done, _ = wait(futures, return_when=FIRST_COMPLETED)
+			winner = next((future for future in done if future.exception() is None), None)
+			if winner is None:
+				# The first answer is an error: use the other one, if it succeeds
+				wait(futures)
+				winner = next((future for future in futures if future.exception() is None), primary)
+
+			if self.metrics is not None:
+				self.metrics.inc("biodumpy_hedges_total", winner="hedge" if winner is hedge else "primary", **self._labels(url))
+
+			return winner.result()
+		finally:
+			# The requests are sent by the threads of the hedger
+			self._local.request_time = self.request_time() + time.monotonic() - start
+
+	def _timed(self, key, url, params, kwargs, reserved=False):
+		"""
+		Send a GET request and observe its latency, including the waits for the rate limits.
+		"""
+		start = time.monotonic()
+		response = self._call(url, self._get, (url,), {"params": params, **kwargs}, reserved=reserved)
+		self.hedger.observe(key, time.monotonic() - start)
+		return response
+
+	def _get(self, url, **kwargs):
+		# The session of the thread sending the request
+		return self.session().get(url, **kwargs)
+
+	def cached(self, url: str, params: dict, func, *args, **kwargs) -> bytes:
+		"""
+		Return the content loaded by ``func`` from the cache, calling it only if the entry is missing or expired.
+		For requests that are not sent with ``get`` (e.g. Bio.Entrez). ``func`` must return bytes.
+		"""
+		if self.cache is None:
+			return func(*args, **kwargs)
+
+		key = ResponseCache.key(url, params)
+		entry = self.cache.get(key)
+		if entry is not None and entry.age() < self.cache.ttl_for(self.module):
+			self._record_hit(url, "fresh")
+			return entry.content
+
+		content = func(*args, **kwargs)
+		self.cache.put(key, url, content)
+		return content
+
+	def call(self, url: str, func, *args, **kwargs):
+		"""
+		Call a function sending a request to the url, for requests that are not sent with ``get`` (e.g. Bio.Entrez).
+
+		The function can either return a response with a ``status_code`` or raise ``urllib.error.HTTPError``.
+		"""
+		return self._call(url, func, args, kwargs)
+
+	def _call(self, url, func, args, kwargs, reserved=False):
+		"""
+		Send a request, retrying it if it is throttled. If ``reserved``, the slot of the adaptive controller and the
+		token of the rate limiter of its first attempt were already taken (hedged requests).
+		"""
+		attempt = 0
+		while True:
+			waits = (0, 0) if reserved and not attempt else (self.controller.acquire(url), self.limiter.acquire(url))
+
+			span = self._start_span(url, attempt)
+			start = time.monotonic()
+			try:
+				result = func(*args, **kwargs)
+				status, headers = getattr(result, "status_code", 200), getattr(result, "headers", {})
+			except HTTPError as e:
+				result = e
+				status, headers = e.code, e.headers or {}
+			except BaseException as e:
+				self.controller.release(url)
+				if self.metrics is not None:
+					self.metrics.inc("biodumpy_requests_total", status="error", **self._labels(url))
+				if span is not None:
+					span.fail(str(e) or type(e).__name__)
+					self.tracer.finish(span)
+				raise
+
+			if span is not None:
+				span.set("http.response.status_code", status)
+				if status >= 400:
+					span.fail(f"HTTP {status}")
+				self.tracer.finish(span)
+
+			latency = time.monotonic() - start
+			self._local.request_time = self.request_time() + latency
+
+			throttled = status in THROTTLE_STATUS
+			self.controller.release(url, latency=latency, throttled=throttled, retry_after=parse_retry_after(headers.get("Retry-After")))
+
+			if self.metrics is not None:
+				self._record(url, result, status, latency, waits)
+
+			if throttled and attempt < self.max_retries:
+				attempt += 1
+				if self.metrics is not None:
+					self.metrics.inc("biodumpy_retries_total", reason="throttled", **self._labels(url))
+				continue
+
+			if isinstance(result, HTTPError):
+				raise result
+
+			return result
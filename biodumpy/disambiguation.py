@@ -0,0 +1,156 @@
+import json
+import threading
+import time
+
+# Taxonomic ranks, from the highest to the lowest
+RANKS = ["domain", "kingdom", "phylum", "class", "order", "family", "genus", "species", "subspecies", "variety", "form", "subpopulation"]
+
+POLICIES = ("prompt", "first", "highest_rank", "exact", "accepted", "defer")
+
+
+class Disambiguation:
+	"""
+	Policy resolving a query matching several taxa (e.g. homonyms in the GBIF backbone or in COL), so that
+	unattended runs never wait for a human at a terminal.
+
+	The policy is a sequence of steps applied to the candidates until a single one is left:
+
+	- "exact": keep the candidates whose canonical name is the query (ignoring case and extra spaces).
+	- "accepted": keep the accepted candidates.
+	- "first": choose the first candidate, in the order returned by the service.
+	- "highest_rank": choose the candidate with the highest taxonomic rank (e.g. a genus over a species).
+	- "defer": skip the query and append the candidates to ``deferred_file`` for a later review.
+	- "prompt": ask the user to choose a candidate. The worker processes of ``Biodumpy`` (``processes`` greater than
+	  1) have no terminal, so they defer the query instead, as does the command line unless asked to prompt.
+
+	Filtering steps ("exact", "accepted") that would remove all the candidates are ignored. If several
+	candidates are left after the last step, the query is deferred.
+
+	Parameters
+	----------
+	policy : str or list, optional
+		Step, or list of steps, of the policy.
+		Default is "prompt".
+	deferred_file : str, optional
+		JSON Lines file where the deferred queries and their candidates are appended.
+		Default is "deferred.jsonl".
+
+	Example
+	-------
+	>>> from biodumpy import Biodumpy
+	>>> from biodumpy.disambiguation import Disambiguation
+	>>> from biodumpy.inputs import GBIF
+	>>> policy = Disambiguation(["exact", "accepted", "defer"], deferred_file="downloads/deferred.jsonl")
+	>>> bdp = Biodumpy([GBIF(disambiguation=policy)])
+	"""
+
+	def __init__(self, policy="prompt", deferred_file: str = "deferred.jsonl"):
+		self.steps = [policy] if isinstance(policy, str) else list(policy)
+		self.deferred_file = deferred_file
+		self._lock = threading.Lock()
+
+		if not self.steps or any(step not in POLICIES for step in self.steps):
+			raise ValueError(f"Invalid policy. Expected one or more of {', '.join(POLICIES)}.")
+
+	def __getstate__(self):
+		state = self.__dict__.copy()
+		state["_lock"] = None
+		return state
+
+	def __setstate__(self, state):
+		self.__dict__.update(state)
+		self._lock = threading.Lock()
+
+	def non_interactive(self):
+		"""
+		Return the policy with its "prompt" steps replaced by "defer", or the policy itself if it has none.
+		"""
+		if "prompt" not in self.steps:
+			return self
+
+		return Disambiguation(["defer" if step == "prompt" else step for step in self.steps], deferred_file=self.deferred_file)
+
+	@staticmethod
+	def of(value):
+		"""
+		Return the Disambiguation of a module parameter: an instance, or the policy of a new one.
+		"""
+		return value if isinstance(value, Disambiguation) else Disambiguation(value)
+
+	def resolve(self, module: str, query: str, candidates: list) -> int:
+		"""
+		Choose one of the candidates of a query.
+
+		Parameters
+		----------
+		module : str
+			Name of the input module.
+		query : str
+			The ambiguous query.
+		candidates : list
+			Dictionaries describing the candidates, with the 'id', 'name', 'rank' and 'accepted' keys.
+
+		Returns
+		-------
+		int
+			The index of the chosen candidate, or None if the query is skipped or deferred.
+		"""
+		indexes = list(range(len(candidates)))
+		for step in self.steps:
+			if len(indexes) == 1:
+				break
+
+			if step == "exact":
+				indexes = [i for i in indexes if _normalize(candidates[i].get("name")) == _normalize(query)] or indexes
+			elif step == "accepted":
+				indexes = [i for i in indexes if candidates[i].get("accepted")] or indexes
+			elif step == "first":
+				indexes = indexes[:1]
+			elif step == "highest_rank":
+				indexes = [min(indexes, key=lambda i: _rank(candidates[i].get("rank")))]
+			elif step == "prompt":
+				return self._prompt(query, candidates, indexes)
+			elif step == "defer":
+				break
+
+		if len(indexes) == 1:
+			return indexes[0]
+
+		self.defer(module, query, [candidates[i] for i in indexes])
+		return None
+
+	def defer(self, module: str, query: str, candidates: list):
+		"""
+		Append a query and its candidates to the deferred file.
+		"""
+		record = {"module": module, "query": query, "candidates": candidates, "time": time.strftime("%Y-%m-%d %H:%M:%S")}
+		with self._lock, open(self.deferred_file, "a", encoding="utf-8") as f:
+			f.write(json.dumps(record, default=str) + "\n")
+
+	@staticmethod
+	def _prompt(query, candidates, indexes):
+		print(f"\nOptions for {query}:\n")
+		for i in indexes:
+			candidate = candidates[i]
+			print(f"{i}. {candidate.get('name')} ({candidate.get('rank')}, ID: {candidate.get('id')}, accepted: {candidate.get('accepted')})")
+		print("Skip")
+
+		while True:
+			choice = input("Please enter the index or the ID of the correct taxon, or 'Skip': ").strip()
+			if choice == "Skip":
+				return None
+
+			for i in indexes:
+				if choice == str(i) or choice == str(candidates[i].get("id")):
+					return i
+
+			print("Invalid input, please enter one of the indexes or IDs.")
+
+
+def _normalize(name):
+	return " ".join(str(name).split()).lower() if name else None
+
+
+def _rank(rank):
+	rank = str(rank).lower() if rank else None
+	return RANKS.index(rank) if rank in RANKS else len(RANKS)
@@ -0,0 +1,88 @@
+import contextvars
+import threading
+
+from .metrics import Histogram
+
+
+class Hedger:
+	"""
+	Hedged GET requests: a request not answered after the usual latency of its endpoint is sent a second time, and
+	the first response is used. This cuts the long tail of the latencies (e.g. a slow server or a stalled connection)
+	at the cost of a few duplicate requests.
+
+	The latencies are observed by module and endpoint (see ``biodumpy.metrics.endpoint``). A request is only hedged
+	once ``min_samples`` latencies of its endpoint are known, and only if the adaptive concurrency limit of its host
+	has a free slot and its rate limit a token available right away, so hedges never exceed either budget.
+
+	Parameters
+	----------
+	percentile : float, optional
+		Percentile of the observed latencies after which a request is hedged.
+		Default is 95.
+	min_samples : int, optional
+		Number of latencies of an endpoint observed before its requests are hedged.
+		Default is 20.
+	max_workers : int, optional
+		Maximum number of threads sending the hedged requests and the requests they duplicate.
+		Default is 32.
+
+	Example
+	-------
+	>>> from biodumpy import Biodumpy
+	>>> from biodumpy.client import HttpClient
+	>>> from biodumpy.hedging import Hedger
+	>>> from biodumpy.inputs import GBIF, WORMS
+	>>> bdp = Biodumpy([GBIF(), WORMS()], client=HttpClient(hedger=Hedger(percentile=95)))
+	"""
+
+	def __init__(self, percentile: float = 95, min_samples: int = 20, max_workers: int = 32):
+		if not 0 < percentile < 100:
+			raise ValueError("Invalid percentile. Expected a number between 0 and 100.")
+
+		self.percentile = percentile
+		self.min_samples = min_samples
+		self.max_workers = max_workers
+		self._latencies = {}
+		self._executor = None
+		self._lock = threading.Lock()
+
+	def __getstate__(self):
+		# Worker processes observe their own latencies and start their own threads
+		state = self.__dict__.copy()
+		state["_latencies"] = {}
+		state["_executor"] = None
+		state["_lock"] = None
+		return state
+
+	def __setstate__(self, state):
+		self.__dict__.update(state)
+		self._lock = threading.Lock()
+
+	def delay(self, key) -> float:
+		"""
+		Time, in seconds, after which a request to the endpoint is hedged, or None if too few latencies are known.
+		"""
+		with self._lock:
+			histogram = self._latencies.get(key)
+			if histogram is None or histogram.count < self.min_samples:
+				return None
+
+			return histogram.percentile(self.percentile)
+
+	def observe(self, key, latency: float):
+		with self._lock:
+			self._latencies.setdefault(key, Histogram()).observe(latency)
+
+	def submit(self, func, *args, **kwargs):
+		"""
+		Run a function in a thread of the hedger, with the context variables (query and span) of the caller.
+		"""
+		from concurrent.futures import ThreadPoolExecutor
+
+		with self._lock:
+			if self._executor is None:
+				self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="biodumpy-hedge")
+			executor = self._executor
+
+		# A context can only be entered by one thread at a time
+		return executor.submit(contextvars.copy_context().run, func, *args, **kwargs)
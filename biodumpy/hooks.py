@@ -0,0 +1,60 @@
+# Lifecycle events of Biodumpy (see Hooks)
+EVENTS = ("on_request", "on_response", "on_payload", "on_dump", "on_error")
+
+
+class Hooks:
+	"""
+	Callbacks fired by Biodumpy at each stage of the download of an element, to time or profile the stages (e.g.
+	with cProfile or tracemalloc) without patching the library.
+
+	Callbacks receive the context of the event as keyword arguments, always including the input module (``inp``)
+	and the element (``element``, a dictionary with a 'query' key):
+
+	- on_request: before the download of the element.
+	- on_response: after the download of the element, with its duration in seconds (``elapsed``).
+	- on_payload: after the download of the element, with the downloaded ``payload``, before it is saved.
+	- on_dump: after the payload is saved, with the ``file_name`` and the duration of the dump (``elapsed``).
+	- on_error: when the download fails, with the ``error`` and the duration of the download (``elapsed``).
+
+	Callbacks should accept extra keyword arguments (``**kwargs``), as the context can grow in future versions.
+
+	Callbacks run in the thread (or worker process, when ``processes`` is greater than 1) that processes the
+	element, so they must be thread-safe and, with worker processes, picklable.
+
+	Parameters
+	----------
+	on_request, on_response, on_payload, on_dump, on_error : callable or list of callables, optional
+		Callbacks of each event.
+
+	Example
+	-------
+	>>> from biodumpy import Biodumpy
+	>>> from biodumpy.hooks import Hooks
+	>>> from biodumpy.inputs import GBIF
+	>>> def slow(inp, element, elapsed, **kwargs):
+	...     if elapsed > 10:
+	...         print(f"{type(inp).__name__} took {elapsed:.1f} s for {element['query']}")
+	>>> bdp = Biodumpy([GBIF()], hooks=Hooks(on_response=slow))
+	"""
+
+	def __init__(self, **callbacks):
+		self.callbacks = {event: [] for event in EVENTS}
+		for event, callback in callbacks.items():
+			for func in callback if isinstance(callback, (list, tuple)) else [callback]:
+				self.register(event, func)
+
+	def register(self, event: str, callback):
+		"""
+		Add a callback to an event.
+		"""
+		if event not in EVENTS:
+			raise ValueError(f"Invalid event. Expected one of {', '.join(EVENTS)}.")
+
+		if not callable(callback):
+			raise ValueError(f"Invalid callback for {event}. Expected a callable.")
+
+		self.callbacks[event].append(callback)
+
+	def fire(self, event: str, **context):
+		for callback in self.callbacks[event]:
+			callback(**context)
@@ -1,3 +1,13 @@
+from __future__ import annotations
+
+import importlib.util
+from typing import ClassVar
+
+from .client import HttpClient
+from .ratelimit import RateLimiter
+from .utils import COMPRESSIONS
+
+
 class Input:
 	"""
 	Base class for handling input operations with customizable parameters.
@@ -8,19 +18,56 @@ class Input:
 	    Time in seconds to wait between consecutive API requests.
 	    Default is 0.1 seconds.
 	output_format : str, optional
-	    The format of the output file. Available option is 'json'.
+	    The format of the output file. Available options are 'json' and 'jsonl' (JSON Lines, one record per line),
+	    and 'fasta' for the modules downloading sequences.
 	    Default is 'json'.
 	bulk : bool, optional
 	    If True, enables bulk processing and creates a bulk output file.
 	    For more details, refer to the documentation of the biodumpy package.
 	    Default is False.
+	compression : str, optional
+	    'gzip' or 'zstd' (requires the zstandard package) to compress the output files while they are written, adding
+	    the '.gz' or '.zst' extension (e.g. 'bulk.json.gz'). Not available for the 'parquet' format, which is already
+	    compressed.
+	    Default is None.
+
+	Notes
+	-----
+	The HTTP requests of the module are sent through ``self.client``. When the module is used with ``Biodumpy``,
+	the client is shared by all the modules, so the per-host rate limits apply to the whole run.
+
+	Subclasses declare the (rate, burst) limits of their remote hosts in the ``rate_limits`` class attribute. They
+	apply to the whole run unless overridden by the ``rate_limits`` parameter of ``Biodumpy``.
 	"""
 
-	def __init__(self, sleep: float = 3, output_format: str = "json", bulk: bool = False):
+	rate_limits: ClassVar[dict] = {}
+
+	def __init__(self, sleep: float = 3, output_format: str = "json", bulk: bool = False, compression: str | None = None):
 		super().__init__()
 		self.sleep = sleep
 		self.output_format = output_format
 		self.bulk = bulk
+		self.compression = compression
+
+		if compression is not None:
+			if compression not in COMPRESSIONS:
+				raise ValueError('Invalid compression. Expected "gzip" or "zstd".')
+
+			if compression == "zstd" and importlib.util.find_spec("zstandard") is None:
+				raise ValueError("Invalid compression. 'zstd' requires zstandard (pip install biodumpy[zstd]).")
+
+			if output_format == "parquet":
+				raise ValueError("Invalid parameters: 'output_format' is 'parquet', so 'compression' must be None.")
+		self.client = HttpClient(RateLimiter(self.rate_limits)).for_module(type(self).__name__)
 
 	def _download(self, **kwargs) -> list:
 		raise NotImplementedError()
+
+	async def _adownload(self, **kwargs) -> list:
+		"""
+		Coroutine used by ``Biodumpy.astart``. Modules can override it with a native asynchronous implementation;
+		by default ``_download`` runs in an executor thread.
+		"""
+		import asyncio
+
+		return await asyncio.to_thread(self._download, **kwargs)
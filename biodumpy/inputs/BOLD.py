@@ -1,5 +1,3 @@
-import requests
-
 from biodumpy import Input, BiodumpyException
 
 
@@ -49,16 +47,16 @@ class BOLD(Input):
 		# if self.fasta and output_format != "fasta":
 		# 	raise ValueError("Invalid output_format. Expected fasta.")
 
-		if self.output_format not in {"json", "fasta"}:
-			raise ValueError('Invalid output_format. Expected "json" or "fasta".')
+		if self.output_format not in {"json", "jsonl", "fasta"}:
+			raise ValueError('Invalid output_format. Expected "json", "jsonl" or "fasta".')
 
 	def _download(self, query, **kwargs) -> list:
 		# if self.fasta:
 		if self.output_format == "fasta":
-			response = requests.get(f"http://v4.boldsystems.org/index.php/API_Public/sequence?taxon={query}")
+			response = self.client.get(f"http://v4.boldsystems.org/index.php/API_Public/sequence?taxon={query}")
 
 			if response.status_code != 200:
-				raise BiodumpyException(f"Fasta sequence request. Error {response.status_code}")
+				raise BiodumpyException(f"Fasta sequence request. Error {response.status_code}", status=response.status_code)
 
 			if response.content:
 				response = response.content
@@ -69,12 +67,12 @@ class BOLD(Input):
 
 				return fasta_entries
 		else:
-			response = requests.get(f"http://v4.boldsystems.org/index.php/API_Public/combined?taxon={query}&format=json")
+			response = self.client.get(f"http://v4.boldsystems.org/index.php/API_Public/combined?taxon={query}&format=json")
 
 			payload = []
 
 			if response.status_code != 200:
-				raise BiodumpyException(f"Combined data request. Error {response.status_code}")
+				raise BiodumpyException(f"Combined data request. Error {response.status_code}", status=response.status_code)
 
 			if response.content:
 				results = response.json()
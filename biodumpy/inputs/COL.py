@@ -1,6 +1,5 @@
-import requests
-
 from biodumpy import Input, BiodumpyException
+from biodumpy.disambiguation import Disambiguation
 
 
 class COL(Input):
@@ -18,6 +17,10 @@ class COL(Input):
 	    If True, the function returns only the accepted nomenclature of a taxon.
 	    See Detail section for further information.
 	    Default is False.
+	disambiguation : str, list or Disambiguation, optional
+	    Policy choosing the taxon when the name matches several IDs (see ``biodumpy.disambiguation.Disambiguation``),
+	    e.g. "first", "exact", ["exact", "accepted", "defer"]. Skipped and deferred taxa get an empty record.
+	    Default is "prompt", which asks the user.
 
 	Details
 	-------
@@ -39,22 +42,23 @@ class COL(Input):
 
 	ACCEPTED_TERMS = ["accepted", "provisionally accepted"]
 
-	def __init__(self, check_syn: bool = False, dataset_key: int = 9923, **kwargs):
+	def __init__(self, check_syn: bool = False, dataset_key: int = 9923, disambiguation="prompt", **kwargs):
 		super().__init__(**kwargs)
 		self.check_syn = check_syn
 		self.dataset_key = dataset_key
+		self.disambiguation = Disambiguation.of(disambiguation)
 
-		if self.output_format != "json":
-			raise ValueError("Invalid output_format. Expected 'json'.")
+		if self.output_format not in {"json", "jsonl"}:
+			raise ValueError("Invalid output_format. Expected 'json' or 'jsonl'.")
 
 	def _download(self, query, **kwargs) -> list:
-		response = requests.get(
+		response = self.client.get(
 			f"https://api.checklistbank.org/dataset/{self.dataset_key}/nameusage/search?",
 			params={"q": query, "content": "SCIENTIFIC_NAME", "type": "EXACT", "offset": 0, "limit": 10},
 		)
 
 		if response.status_code != 200:
-			raise BiodumpyException(f"Taxonomy request. Error {response.status_code}")
+			raise BiodumpyException(f"Taxonomy request. Error {response.status_code}", status=response.status_code)
 
 		payload = response.json()
 
@@ -65,14 +69,17 @@ class COL(Input):
 
 			# Multiple IDs
 			if len(result) > 1:
-				ids = [item.get("id") for item in result if "id" in item]
-				ids = ", ".join(ids)
-				id_input = input(f"Please enter the correct taxon ID of {query} \n ID: {ids}; Skip \nInsert the ID:")
-
-				if id_input == "Skip":
+				candidates = []
+				for item in result:
+					usage = item.get("usage") or {}
+					name = usage.get("name") or {}
+					candidates.append({"id": item.get("id"), "name": name.get("scientificName"), "rank": name.get("rank"), "accepted": usage.get("status") in COL.ACCEPTED_TERMS})
+				choice = self.disambiguation.resolve(type(self).__name__, query, candidates)
+
+				if choice is None:
 					result = [{"id": None, "usage": None, "status": None, "classification": None}]
 				else:
-					result = [item for item in result if item["id"] == id_input]
+					result = [result[choice]]
 
 			id = result[0].get("id")
 			usage = result[0].get("usage")
@@ -1,4 +1,4 @@
-import requests
+from typing import ClassVar
 
 from biodumpy.utils import remove_tags
 from biodumpy import Input, BiodumpyException
@@ -41,20 +41,22 @@ class Crossref(Input):
 	>>> bdp.start(dois, output_path='./downloads/{date}/{module}/{name}')
 	"""
 
+	rate_limits: ClassVar[dict] = {"api.crossref.org": (5, 5)}
+
 	def __init__(self, summary: bool = False, **kwargs):
 		super().__init__(**kwargs)
 		self.summary = summary
 
-		if self.output_format != "json":
-			raise ValueError("Invalid output_format. Expected 'json'.")
+		if self.output_format not in {"json", "jsonl"}:
+			raise ValueError("Invalid output_format. Expected 'json' or 'jsonl'.")
 
 	def _download(self, query, **kwargs) -> list:
 		payload = []
 
-		response = requests.get(f"https://api.crossref.org/works/{query}")
+		response = self.client.get(f"https://api.crossref.org/works/{query}")
 
 		if response.status_code != 200:
-			raise BiodumpyException(f"Reference request. Error {response.status_code}")
+			raise BiodumpyException(f"Reference request. Error {response.status_code}", status=response.status_code)
 
 		if response.content:
 			message = response.json().get("message", {})
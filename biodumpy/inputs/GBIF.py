@@ -1,6 +1,6 @@
-import requests
-
 from biodumpy import Input, BiodumpyException
+from biodumpy.parquet import pyarrow_available
+from biodumpy.disambiguation import Disambiguation
 
 
 class GBIF(Input):
@@ -25,6 +25,10 @@ class GBIF(Input):
 	geometry : str, optional
 	    A spatial polygon to filter occurrences within a specified area.
 	    Default is an empty string.
+	disambiguation : str, list or Disambiguation, optional
+	    Policy choosing the taxon when the name matches several taxa of the backbone (see
+	    ``biodumpy.disambiguation.Disambiguation``), e.g. "first", "exact", ["exact", "accepted", "defer"].
+	    Default is "prompt", which asks the user.
 
 	Details
 	-------
@@ -45,56 +49,58 @@ class GBIF(Input):
 	>>> bdp.start(taxa, output_path='./downloads/{date}/{module}/{name}')
 	"""
 
-	def __init__(self, dataset_key: str = "d7dddbf4-2cf0-4f39-9b2a-bb099caae36c", limit: int = 20, accepted_only: bool = True, occ: bool = False, geometry: str = None, **kwargs):
+	def __init__(
+		self,
+		dataset_key: str = "d7dddbf4-2cf0-4f39-9b2a-bb099caae36c",
+		limit: int = 20,
+		accepted_only: bool = True,
+		occ: bool = False,
+		geometry: str = None,
+		disambiguation="prompt",
+		**kwargs,
+	):
 		super().__init__(**kwargs)
 		self.dataset_key = dataset_key
 		self.limit = limit  # Limit to find name in taxonomy backbone
 		self.accepted = accepted_only
 		self.occ = occ
 		self.geometry = geometry
+		self.disambiguation = Disambiguation.of(disambiguation)
+
+		if self.output_format not in {"json", "jsonl", "parquet"}:
+			raise ValueError('Invalid output_format. Expected "json", "jsonl" or "parquet".')
 
-		if self.output_format != "json":
-			raise ValueError('Invalid output_format. Expected "json".')
+		if self.output_format == "parquet" and not pyarrow_available():
+			raise ValueError('Invalid output_format. "parquet" requires pyarrow (pip install biodumpy[parquet]).')
 
 	def _download(self, query, **kwargs) -> list:
 		payload = []
 
 		# Search taxonomy
-		response = requests.get(f"https://api.gbif.org/v1/species?", params={"datasetKey": self.dataset_key, "name": query, "limit": self.limit, "offset": 0})
+		response = self.client.get(f"https://api.gbif.org/v1/species?", params={"datasetKey": self.dataset_key, "name": query, "limit": self.limit, "offset": 0})
 
 		if response.status_code != 200:
-			raise BiodumpyException(f"Taxonomy request. Error {response.status_code}")
+			raise BiodumpyException(f"Taxonomy request. Error {response.status_code}", status=response.status_code)
 
 		if response.content:
 			payload = response.json()["results"]
 			if len(payload) > 1:
-				# raise BiodumpyException(f"Multiple equal matches for {query}")
-				keys = [entry["key"] for entry in payload]
-
-				# Display the list of taxon ID options
-				options = [{"index": i, "taxon_id": keys} for i, keys in enumerate(keys)]
-				print(f"\nOptions for {query}:\n")
-				for option in options:
-					print(f"Taxon ID: {option['taxon_id']} - Index: {option['index']}.")
-				print(f"{len(keys) + 1}. Skip")
-
-				# Get user selection
-				choice = input("Please enter the index corresponding to the correct taxon GBIF ID or choose 'Skip': ")
-
-				# Process selection
-				try:
-					choice = int(choice)
-					if 0 <= choice < len(keys):
-						payload = [payload[choice]]
-					else:
-						print("Skipped selection.")
-				except ValueError:
-					print("Invalid input, please enter a number.")
+				candidates = [
+					{"id": entry.get("key"), "name": entry.get("canonicalName"), "rank": entry.get("rank"), "accepted": entry.get("taxonomicStatus") == "ACCEPTED"}
+					for entry in payload
+				]
+				choice = self.disambiguation.resolve(type(self).__name__, query, candidates)
+
+				# Skipped or deferred
+				if choice is None:
+					return []
+
+				payload = [payload[choice]]
 
 			if self.accepted:
 				if payload[0].get("taxonomicStatus") != "ACCEPTED":
 					acceptedKey = payload[0].get("acceptedKey")
-					response_accepted = requests.get(f"https://api.gbif.org/v1/species/{acceptedKey}")
+					response_accepted = self.client.get(f"https://api.gbif.org/v1/species/{acceptedKey}")
 					payload = response_accepted.json()
 				else:
 					acceptedKey = payload[0].get("key")
@@ -113,13 +119,13 @@ class GBIF(Input):
 		return payload
 
 	def _download_gbif_occ(self, taxon_key: int = None, accepted_taxon_key: int = None, geometry: str = None):
-		response_occ = requests.get(
+		response_occ = self.client.get(
 			f"https://api.gbif.org/v1/occurrence/search",
 			params={"taxonKey": taxon_key, "acceptedTaxonKey": accepted_taxon_key, "occurrenceStatus": "PRESENT", "geometry": geometry, "limit": 300},
 		)
 
 		if response_occ.status_code != 200:
-			raise BiodumpyException(f"Occurrence request. Error {response_occ.status_code}")
+			raise BiodumpyException(f"Occurrence request. Error {response_occ.status_code}", status=response_occ.status_code)
 
 		# if response_occ.status_code == 0:
 		# 	raise BiodumpyException(f"Occurrence not found.")
@@ -137,7 +143,7 @@ class GBIF(Input):
 
 				# Loop to download data
 				while offset < total_records:
-					response_occ = requests.get(
+					response_occ = self.client.get(
 						f"https://api.gbif.org/v1/occurrence/search",
 						params={"taxonKey": taxon_key, "acceptedTaxonKey": accepted_taxon_key, "occurrenceStatus": "PRESENT", "geometry": geometry, "limit": 300, "offset": offset},
 					)
@@ -1,5 +1,5 @@
-import requests
 import sys
+from typing import ClassVar
 
 from biodumpy import Input, BiodumpyException
 
@@ -44,19 +44,21 @@ class INaturalist(Input):
 	>>> bdp.start(taxa, output_path='./downloads/{date}/{module}/{name}')
 	"""
 
+	rate_limits: ClassVar[dict] = {"api.inaturalist.org": (1, 1)}
+
 	def __init__(self, info: bool = False, **kwargs):
 		super().__init__(**kwargs)
 		self.info = info
 
-		if self.output_format != "json":
-			raise ValueError('Invalid output_format. Expected "json".')
+		if self.output_format not in {"json", "jsonl"}:
+			raise ValueError('Invalid output_format. Expected "json" or "jsonl".')
 
 	def _download(self, query, **kwargs) -> list:
 		# API request
-		response = requests.get(f"https://api.inaturalist.org/v1/taxa?q={query}&order=desc&order_by=observations_count")
+		response = self.client.get(f"https://api.inaturalist.org/v1/taxa?q={query}&order=desc&order_by=observations_count")
 
 		if response.status_code != 200:
-			raise BiodumpyException(f"Observation request. Error {response.status_code}")
+			raise BiodumpyException(f"Observation request. Error {response.status_code}", status=response.status_code)
 
 		# Dictionary for empty records
 		photo_details_empty = {"taxon": query, "image_id": None, "license_code": None, "attribution": None}
@@ -90,7 +92,7 @@ class INaturalist(Input):
 
 					# Search the photo into the occurrences
 					if photo_info is None:
-						response_id = requests.get(f"https://api.inaturalist.org/v1/taxa/{taxon_id}")
+						response_id = self.client.get(f"https://api.inaturalist.org/v1/taxa/{taxon_id}")
 
 						if response_id.status_code == 200:
 							results_id = response_id.json()["results"]
@@ -1,7 +1,6 @@
-import requests
-
 from biodumpy import Input, BiodumpyException
 from biodumpy.utils import rm_dup
+from biodumpy.disambiguation import Disambiguation
 
 
 class IUCN(Input):
@@ -25,6 +24,11 @@ class IUCN(Input):
 	scope : list, optional
 		List of IUCN assessment scopes to filter the results (e.g., ['Global', 'Europe']).
 		Defaults to ['Global'].
+	disambiguation : str, list or Disambiguation, optional
+		Policy deciding whether the third word of a name is a subspecies or a subpopulation (see
+		``biodumpy.disambiguation.Disambiguation``). With "first" or "highest_rank", it is a subspecies. Skipped and
+		deferred taxa are not downloaded.
+		Defaults to "prompt", which asks the user.
 
 	Examples
 	--------
@@ -37,11 +41,12 @@ class IUCN(Input):
 	>>> bdp.start(taxa, output_path='./downloads/{date}/{module}/{name}')
 	"""
 
-	def __init__(self, authorization: str = None, assess_details: bool = False, latest: bool = False, scope: list = None, **kwargs):
+	def __init__(self, authorization: str = None, assess_details: bool = False, latest: bool = False, scope: list = None, disambiguation="prompt", **kwargs):
 		super().__init__(**kwargs)
 		self.authorization = authorization
 		self.assess_details = assess_details
 		self.latest = latest
+		self.disambiguation = Disambiguation.of(disambiguation)
 		if scope is None:
 			self.scope = ["Global"]
 		else:
@@ -64,8 +69,8 @@ class IUCN(Input):
 			"Arabian Sea",
 		]
 
-		if self.output_format != "json":
-			raise ValueError("Invalid output_format. Expected 'json'.")
+		if self.output_format not in {"json", "jsonl"}:
+			raise ValueError("Invalid output_format. Expected 'json' or 'jsonl'.")
 
 		for scope in self.scope:
 			if scope not in iucn_scope:
@@ -82,15 +87,15 @@ class IUCN(Input):
 		subpopulation_name = None
 
 		if len(taxon) > 2:
-			while True:
-				infra_check = input(f"Is the taxon '{taxon}' a subspecies? Enter 1 (yes) or 0 (no): ")
-				if infra_check in ("1", "0"):
-					if infra_check == "1":
-						infra_name = taxon[2]
-					else:
-						subpopulation_name = taxon[2]
-					break
-				print("Please enter only 1 or 0.")
+			candidates = [{"id": "infra_name", "name": query, "rank": "subspecies"}, {"id": "subpopulation_name", "name": query, "rank": "subpopulation"}]
+			choice = self.disambiguation.resolve(type(self).__name__, query, candidates)
+
+			if choice is None:
+				return []
+			if choice == 0:
+				infra_name = taxon[2]
+			else:
+				subpopulation_name = taxon[2]
 
 		# General query to obtain the taxon ID
 		taxon_info = None
@@ -142,10 +147,10 @@ class IUCN(Input):
 		return payload
 
 	def _icun_request(self, query_path):
-		response = requests.get(query_path, headers={"Authorization": self.authorization})
+		response = self.client.get(query_path, headers={"Authorization": self.authorization})
 
 		if response.status_code != 200:
-			raise BiodumpyException(f"Error {response.status_code}")
+			raise BiodumpyException(f"Error {response.status_code}", status=response.status_code)
 
 		if response.content:
 			response = response.json()
@@ -1,11 +1,13 @@
+import io
 import json
 import time
+from typing import ClassVar
 
 from biodumpy import Input
 from biodumpy.utils import split_to_batches, CustomEncoder
 
 from tqdm import tqdm
-from Bio import Entrez, SeqIO
+from Bio import Entrez
 from http.client import IncompleteRead
 
 
@@ -77,6 +79,10 @@ class NCBI(Input):
 	>>> bdp.start(taxa, output_path='./downloads/{date}/{module}/{name}')
 	"""
 
+	rate_limits: ClassVar[dict] = {"eutils.ncbi.nlm.nih.gov": (3, 1)}  # 10 requests per second with an NCBI API key
+
+	EUTILS_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/"
+
 	def __init__(
 		self,
 		mail: str = None,
@@ -110,8 +116,8 @@ class NCBI(Input):
 		if self.output_format == "fasta" and self.rettype != "fasta":
 			raise ValueError("Invalid output_format or rettype. Expected fasta.")
 
-		if self.output_format not in {"json", "fasta"}:
-			raise ValueError('Invalid output_format. Expected "json" or "fasta".')
+		if self.output_format not in {"json", "jsonl", "fasta"}:
+			raise ValueError('Invalid output_format. Expected "json", "jsonl" or "fasta".')
 
 		if self.by_id and self.query_type is not None:
 			raise ValueError("Invalid parameters: 'by_id' is True, so 'query_type' must be None.")
@@ -125,6 +131,11 @@ class NCBI(Input):
 		if self.taxonomy_only and (self.output_format == "fasta" or self.rettype == "fasta"):
 			raise ValueError("Invalid parameters: 'taxonomy_only' is True, so 'output_format' cannot be 'fasta'.")
 
+	def __setstate__(self, state):
+		# Entrez.email is global: set it again when the module is unpickled in a worker process
+		self.__dict__.update(state)
+		Entrez.email = self.mail
+
 	def _download(self, query, **kwargs) -> list:
 		payload = []
 
@@ -160,6 +171,26 @@ class NCBI(Input):
 
 		return payload
 
+	def _entrez(self, func, **kwargs):
+		"""
+		Call an Entrez function through the HTTP client, so that it shares the rate limits of the NCBI E-utilities host.
+		"""
+		return self.client.call(NCBI.EUTILS_URL, func, **kwargs)
+
+	def _entrez_cached(self, func, **kwargs):
+		"""
+		Call an Entrez function returning XML through the response cache of the client. Returns a binary handle.
+		"""
+
+		def load():
+			handle = self._entrez(func, **kwargs)
+			try:
+				return handle.read()
+			finally:
+				handle.close()
+
+		return io.BytesIO(self.client.cached(f"{NCBI.EUTILS_URL}{func.__name__}.fcgi", kwargs, load))
+
 	def _download_ids(self, term, step_id):
 		"""
 		Downloads NCBI IDs based on a search term and counts the total base pairs (bp) for the retrieved sequences.
@@ -179,7 +210,7 @@ class NCBI(Input):
 		print(id_bp_list)
 		"""
 
-		handle = Entrez.esearch(db=self.db, term=term, retmax=0)
+		handle = self._entrez(Entrez.esearch, db=self.db, term=term, retmax=0)
 		record = Entrez.read(handle)
 		handle.close()
 
@@ -188,13 +219,13 @@ class NCBI(Input):
 		with tqdm(total=total_ids, desc="NCBI IDs retrieve", unit=" IDs") as pbar:
 			for start in range(0, total_ids, step_id):
 				try:
-					handle = Entrez.esearch(db=self.db, retstart=start, retmax=step_id, term=term)
+					handle = self._entrez(Entrez.esearch, db=self.db, retstart=start, retmax=step_id, term=term)
 					record = Entrez.read(handle)
 					handle.close()
 
 					if self.max_bp:
 						# Retrieve summaries and calculate total bp
-						summary_handle = Entrez.esummary(db=self.db, id=",".join(record["IdList"]))
+						summary_handle = self._entrez(Entrez.esummary, db=self.db, id=",".join(record["IdList"]))
 						summaries = Entrez.read(summary_handle)
 						summary_handle.close()
 
@@ -216,7 +247,7 @@ class NCBI(Input):
 		keys_to_keep = ["Id", "Caption", "Title", "Length"]
 		summary_list = list()
 		try:
-			summary_handle = Entrez.esummary(db=self.db, id=seq_id)
+			summary_handle = self._entrez(Entrez.esummary, db=self.db, id=seq_id)
 			summaries = Entrez.read(summary_handle)
 			summary_handle.close()
 			for summary in summaries:
@@ -245,11 +276,14 @@ class NCBI(Input):
 		attempt = 0
 		while attempt < retries:
 			try:
-				handle = Entrez.efetch(db=db, id=seq_id, rettype=rettype, retmode=retmode, usehistory=history, WebEnv=webenv, query_key=query_key)
+				handle = self._entrez(Entrez.efetch, db=db, id=seq_id, rettype=rettype, retmode=retmode, usehistory=history, WebEnv=webenv, query_key=query_key)
 
 				if self.rettype == "fasta":
 					return handle.read().split("\n\n")[:-1]
 				else:
+					# Bio.SeqIO is slow to import and only needed to parse full records
+					from Bio import SeqIO
+
 					parsed_records = SeqIO.parse(handle, rettype)
 					return SeqIO.to_dict(parsed_records).values()
 			except IncompleteRead as e:
@@ -283,14 +317,14 @@ class NCBI(Input):
 		"""
 
 		# Retrieve taxonomy ID by taxon name
-		handle = Entrez.esearch(db="Taxonomy", term=f"{taxon}[All Names]", retmode="xml")
+		handle = self._entrez_cached(Entrez.esearch, db="Taxonomy", term=f"{taxon}[All Names]", retmode="xml")
 		taxon_id = Entrez.read(handle)  # retrieve taxon ID
 		handle.close()
 		lin = None
 
 		if int(taxon_id["Count"]) > 0:
 			# Retrieve taxonomy by taxon ID
-			handle = Entrez.efetch(db="Taxonomy", id=taxon_id["IdList"], retmode="xml")
+			handle = self._entrez_cached(Entrez.efetch, db="Taxonomy", id=",".join(taxon_id["IdList"]), retmode="xml")
 			records = Entrez.read(handle)
 			handle.close()
 
@@ -1,7 +1,6 @@
-import requests
-
 from tqdm import tqdm
 from biodumpy import Input, BiodumpyException
+from biodumpy.parquet import pyarrow_available
 
 
 class OBIS(Input):
@@ -36,8 +35,11 @@ class OBIS(Input):
 		self.geometry = geometry
 		self.areaid = areaid
 
-		if self.output_format != "json":
-			raise ValueError('Invalid output_format. Expected "json".')
+		if self.output_format not in {"json", "jsonl", "parquet"}:
+			raise ValueError('Invalid output_format. Expected "json", "jsonl" or "parquet".')
+
+		if self.output_format == "parquet" and not pyarrow_available():
+			raise ValueError('Invalid output_format. "parquet" requires pyarrow (pip install biodumpy[parquet]).')
 
 		# if occ is False, areaid and pylogon cannot both be True
 		if not self.occ and (self.areaid is not None or self.geometry):
@@ -45,10 +47,10 @@ class OBIS(Input):
 
 	def _download(self, query, **kwargs) -> list:
 		payload = []
-		response = requests.get(f"https://api.obis.org/v3/taxon/{query}")
+		response = self.client.get(f"https://api.obis.org/v3/taxon/{query}")
 
 		if response.status_code != 200:
-			raise BiodumpyException(f"Taxonomy request. Error {response.status_code}")
+			raise BiodumpyException(f"Taxonomy request. Error {response.status_code}", status=response.status_code)
 
 		if response.content:
 			payload = response.json()["results"]
@@ -73,10 +75,10 @@ class OBIS(Input):
 
 		try:
 			while True:
-				response = requests.get("https://api.obis.org/v3/occurrence", params=params)
+				response = self.client.get("https://api.obis.org/v3/occurrence", params=params)
 
 				if response.status_code != 200:
-					raise BiodumpyException(f"Occurrences request. Error {response.status_code}")
+					raise BiodumpyException(f"Occurrences request. Error {response.status_code}", status=response.status_code)
 
 				response_json = response.json()
 				data = response_json["results"]
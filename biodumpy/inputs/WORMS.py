@@ -1,5 +1,3 @@
-import requests
-
 from biodumpy import Input, BiodumpyException
 
 
@@ -35,8 +33,8 @@ class WORMS(Input):
 		self.marine_only = marine_only
 		self.distribution = distribution
 
-		if self.output_format != "json":
-			raise ValueError("Invalid output_format. Expected 'json'.")
+		if self.output_format not in {"json", "jsonl"}:
+			raise ValueError("Invalid output_format. Expected 'json' or 'jsonl'.")
 
 	def _download(self, query, **kwargs) -> list:
 		payload = []
@@ -57,8 +55,8 @@ class WORMS(Input):
 		return payload
 
 	def _worms_request(self, url) -> list:
-		response = requests.get(url)
+		response = self.client.get(url)
 		if response.status_code != 200:
-			raise BiodumpyException(f"Occurrences request. Error {response.status_code}")
+			raise BiodumpyException(f"Occurrences request. Error {response.status_code}", status=response.status_code)
 
 		return response.json()
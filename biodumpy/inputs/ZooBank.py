@@ -1,6 +1,3 @@
-import requests
-
-from bs4 import BeautifulSoup
 from tqdm import tqdm
 from biodumpy import Input, BiodumpyException
 
@@ -44,36 +41,38 @@ class ZooBank(Input):
 		if self.dataset_size not in ["small", "large"]:
 			raise ValueError("Invalid dataset_size. Expected 'small' or 'large'.")
 
-		if self.output_format != "json":
-			raise ValueError("Invalid output_format. Expected 'json'.")
+		if self.output_format not in {"json", "jsonl"}:
+			raise ValueError("Invalid output_format. Expected 'json' or 'jsonl'.")
 
 	def _download(self, query, **kwargs) -> list:
 		payload = []
 
 		if self.dataset_size == "small":
-			response = requests.get(f"https://zoobank.org/References.json?search_term={query}")
+			response = self.client.get(f"https://zoobank.org/References.json?search_term={query}")
 
 			if response.status_code != 200:
-				raise BiodumpyException(f"Reference request. Error {response.status_code}")
+				raise BiodumpyException(f"Reference request. Error {response.status_code}", status=response.status_code)
 
 			payload = response.json()
 			referenceuuid = [item["referenceuuid"] for item in payload]
 
 		else:
 			print("Searching in ZooBank...")
-			response_pub = requests.get(f"https://zoobank.org/Search?search_term={query}")
+			response_pub = self.client.get(f"https://zoobank.org/Search?search_term={query}")
 
 			if response_pub.status_code != 200:
-				raise BiodumpyException(f"Term search request. Error {response_pub.status_code}")
+				raise BiodumpyException(f"Term search request. Error {response_pub.status_code}", status=response_pub.status_code)
 
 			html_content = response_pub.text
 
-			# Parsing the HTML content with BeautifulSoup
+			# Parsing the HTML content with BeautifulSoup, only needed by this search
+			from bs4 import BeautifulSoup
+
 			soup = BeautifulSoup(html_content, "html.parser")
 			referenceuuid = [entry["href"].replace("/References/", "") for entry in soup.find_all(class_="biblio-entry") if "href" in entry.attrs]
 
 			for ref in tqdm(referenceuuid, desc="Fetching paper info"):
-				response_pub = requests.get(f"https://zoobank.org/References.json/{ref}")
+				response_pub = self.client.get(f"https://zoobank.org/References.json/{ref}")
 				if response_pub.status_code == 200:  # Check if the request was successful
 					try:
 						json_content = response_pub.json()[0]
@@ -87,11 +86,12 @@ class ZooBank(Input):
 			for refuid in referenceuuid:
 				index = next((i for i, entry in enumerate(payload) if entry.get("referenceuuid") == refuid), None)
 
-				response_id = requests.get(f"https://zoobank.org/Identifiers.json/{refuid}")
+				response_id = self.client.get(f"https://zoobank.org/Identifiers.json/{refuid}")
 				try:
 					response_id_json = response_id.json()
 					payload[index]["info"] = response_id_json
-				except requests.exceptions.JSONDecodeError as e:
+				# requests.exceptions.JSONDecodeError, without importing requests with the module
+				except ValueError as e:
 					print(f"Failed to parse JSON with reference uid{refuid}:", e)
 
 		return payload
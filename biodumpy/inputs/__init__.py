@@ -1,11 +1,19 @@
-from .COL import COL
-from .NCBI import NCBI
-from .BOLD import BOLD
-from .INaturalist import INaturalist
-from .COL import COL
-from .ZooBank import ZooBank
-from .IUCN import IUCN
-from .GBIF import GBIF
-from .OBIS import OBIS
-from .Crossref import Crossref
-from .WORMS import WORMS
+import importlib
+
+# Input classes, imported from their modules on first access so that a job only pays for the sources it uses
+# (e.g. NCBI imports Biopython and ZooBank imports BeautifulSoup).
+__all__ = ["BOLD", "COL", "GBIF", "IUCN", "NCBI", "OBIS", "WORMS", "Crossref", "INaturalist", "ZooBank"]
+
+
+def __getattr__(name):
+	if name in __all__:
+		cls = getattr(importlib.import_module(f"{__name__}.{name}"), name)
+		# Cache the class, so that the next accesses skip this function
+		globals()[name] = cls
+		return cls
+
+	raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+	return sorted(set(globals()) | set(__all__))
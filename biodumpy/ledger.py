@@ -0,0 +1,113 @@
+import json
+import os
+import threading
+import time
+
+
+def error_status(error: BaseException) -> int:
+	"""
+	HTTP status code of the failed request that raised an error, if any.
+	"""
+	status = getattr(error, "status", None)
+	if status is None:
+		# requests.HTTPError
+		status = getattr(getattr(error, "response", None), "status_code", None)
+	if status is None:
+		# urllib.error.HTTPError, raised by Bio.Entrez
+		status = getattr(error, "code", None)
+
+	return status if isinstance(status, int) else None
+
+
+class FailureLedger:
+	"""
+	JSON Lines file recording each failed (query, module) pair with the error class, the error message, the HTTP
+	status code and the number of attempts. Records are appended as soon as a download fails, by any thread or
+	worker process, so the ledger is complete even if the run is interrupted.
+
+	Parameters
+	----------
+	file_name : str
+		Path of the ledger.
+
+	Example
+	-------
+	>>> for record in FailureLedger.read("downloads/failures_2024-10-10.jsonl"):
+	...     print(record["module"], record["query"], record["status"])
+	"""
+
+	def __init__(self, file_name: str):
+		self.file_name = file_name
+		# Records of the failures of this process
+		self.records = []
+		self._lock = threading.Lock()
+
+	def __getstate__(self):
+		state = self.__dict__.copy()
+		state["records"] = []
+		state["_lock"] = None
+		return state
+
+	def __setstate__(self, state):
+		self.__dict__.update(state)
+		self._lock = threading.Lock()
+
+	def record(self, module: str, element: dict, error: BaseException, attempts: int = 1) -> dict:
+		"""
+		Append a failure to the ledger.
+		"""
+		record = {
+			"query": element["query"],
+			"module": module,
+			"error": type(error).__name__,
+			"message": str(error),
+			"status": error_status(error),
+			"attempts": attempts,
+			"element": element,
+			"time": time.strftime("%Y-%m-%d %H:%M:%S"),
+		}
+		with self._lock:
+			self.records.append(record)
+			os.makedirs(os.path.dirname(self.file_name) or ".", exist_ok=True)
+			with open(self.file_name, "a", encoding="utf-8") as f:
+				f.write(json.dumps(record, default=str) + "\n")
+
+		return record
+
+	def resume(self):
+		"""
+		Keep the records of an interrupted run, terminating its last line if the run died while writing it.
+		"""
+		with self._lock:
+			if os.path.exists(self.file_name) and os.path.getsize(self.file_name) > 0:
+				with open(self.file_name, "rb+") as f:
+					f.seek(-1, os.SEEK_END)
+					if f.read(1) != b"\n":
+						f.write(b"\n")
+
+	def reset(self, records: list = ()):
+		"""
+		Replace the content of the ledger with the given records.
+		"""
+		with self._lock:
+			self.records = list(records)
+			if self.records:
+				with open(self.file_name, "w", encoding="utf-8") as f:
+					f.writelines(json.dumps(record, default=str) + "\n" for record in self.records)
+			elif os.path.exists(self.file_name):
+				os.remove(self.file_name)
+
+	@staticmethod
+	def read(file_name: str) -> list:
+		"""
+		Read the records of a ledger. Truncated lines, left by an interrupted run, are skipped.
+		"""
+		records = []
+		with open(file_name, "r", encoding="utf-8") as f:
+			for line in f:
+				try:
+					records.append(json.loads(line))
+				except json.JSONDecodeError:
+					continue
+
+		return records
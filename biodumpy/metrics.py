@@ -0,0 +1,283 @@
+from __future__ import annotations
+
+import json
+import random
+import re
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+from urllib.parse import quote, unquote, urlparse
+
+# Upper bounds of the histogram buckets, in seconds.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, float("inf"))
+
+# Help text of the metrics collected by Biodumpy and HttpClient.
+DESCRIPTIONS = {
+	"biodumpy_requests_total": "HTTP requests sent, by status code.",
+	"biodumpy_request_seconds": "Latency of the HTTP requests.",
+	"biodumpy_response_bytes_total": "Bytes received in the HTTP responses.",
+	"biodumpy_retries_total": "Retried HTTP requests, by reason.",
+	"biodumpy_hedges_total": "Hedged HTTP requests, by the request that answered first.",
+	"biodumpy_cache_hits_total": "Responses served by the response cache.",
+	"biodumpy_rate_limit_wait_seconds_total": "Time spent waiting for the rate limiter.",
+	"biodumpy_concurrency_wait_seconds_total": "Time spent waiting for the adaptive concurrency controller.",
+	"biodumpy_sleep_seconds_total": "Time spent in the sleep between the elements of a module.",
+	"biodumpy_write_wait_seconds_total": "Time spent waiting for room in the queue of the background writer.",
+	"biodumpy_elements_total": "Elements processed, by outcome.",
+	"biodumpy_download_seconds": "Duration of the download of an element.",
+	"biodumpy_processing_seconds": "Duration of the download of an element excluding the HTTP requests (parsing and processing).",
+	"biodumpy_dump_seconds": "Duration of the dump of an element.",
+}
+
+# Path segments kept in the endpoint labels: words and API versions (e.g. v1)
+_STATIC_SEGMENT = re.compile(r"[A-Za-z][A-Za-z_.\-]*|v\d+(\.\d+)*")
+
+# Element being downloaded, replaced by a placeholder in the endpoint labels
+current_query = ContextVar("current_query", default=None)
+
+
+def endpoint(url: str, query: str | None = None) -> str:
+	"""
+	Label of the endpoint of a url: the host and the path, with the queried element and the identifiers
+	(segments that are neither words nor API versions) replaced by placeholders.
+
+	Example
+	-------
+	>>> endpoint("https://api.obis.org/v3/taxon/Pinna%20nobilis", query="Pinna nobilis")
+	'api.obis.org/v3/taxon/{query}'
+	>>> endpoint("https://api.gbif.org/v1/species/2426609")
+	'api.gbif.org/v1/species/{id}'
+	"""
+	parsed = urlparse(url)
+	segments = []
+	for segment in parsed.path.split("/"):
+		if not segment:
+			continue
+		if query and unquote(segment) in (query, quote(query)):
+			segments.append("{query}")
+		elif not _STATIC_SEGMENT.fullmatch(segment):
+			segments.append("{id}")
+		else:
+			segments.append(segment)
+
+	return "/".join([parsed.hostname or "", *segments])
+
+
+def _escape(value) -> str:
+	return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+	"""
+	Histogram with fixed buckets, for the Prometheus output, and a reservoir sample, for the percentiles.
+	"""
+
+	RESERVOIR_SIZE = 1024
+
+	def __init__(self):
+		self.buckets = [0] * len(BUCKETS)
+		self.count = 0
+		self.sum = 0.0
+		self.min = None
+		self.max = None
+		self.samples = []
+
+	def observe(self, value: float):
+		self.buckets[bisect_left(BUCKETS, value)] += 1
+		self.count += 1
+		self.sum += value
+		self.min = value if self.min is None else min(self.min, value)
+		self.max = value if self.max is None else max(self.max, value)
+
+		if len(self.samples) < Histogram.RESERVOIR_SIZE:
+			self.samples.append(value)
+		else:
+			index = random.randrange(self.count)
+			if index < Histogram.RESERVOIR_SIZE:
+				self.samples[index] = value
+
+	def merge(self, other: Histogram):
+		self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+		self.count += other.count
+		self.sum += other.sum
+		self.min = other.min if self.min is None else min(self.min, other.min if other.min is not None else self.min)
+		self.max = other.max if self.max is None else max(self.max, other.max if other.max is not None else self.max)
+
+		samples = self.samples + other.samples
+		self.samples = random.sample(samples, Histogram.RESERVOIR_SIZE) if len(samples) > Histogram.RESERVOIR_SIZE else samples
+
+	def percentile(self, q: float) -> float:
+		if not self.samples:
+			return None
+
+		samples = sorted(self.samples)
+		return samples[min(len(samples) - 1, int(q / 100 * len(samples)))]
+
+	def to_dict(self) -> dict:
+		return {
+			"count": self.count,
+			"sum": self.sum,
+			"min": self.min,
+			"max": self.max,
+			"mean": self.sum / self.count if self.count else None,
+			"p50": self.percentile(50),
+			"p90": self.percentile(90),
+			"p95": self.percentile(95),
+			"p99": self.percentile(99),
+		}
+
+
+class Metrics:
+	"""
+	Thread-safe collection of counters and histograms, labelled by module, endpoint, etc.
+
+	Example
+	-------
+	>>> metrics = Metrics()
+	>>> metrics.inc("biodumpy_requests_total", module="GBIF", endpoint="api.gbif.org/v1/species", status=200)
+	>>> metrics.observe("biodumpy_request_seconds", 0.2, module="GBIF", endpoint="api.gbif.org/v1/species")
+	>>> metrics.to_json("metrics.json")
+	"""
+
+	def __init__(self):
+		self.counters = {}
+		self.histograms = {}
+		self._lock = threading.Lock()
+
+	def __getstate__(self):
+		state = self.__dict__.copy()
+		state["_lock"] = None
+		return state
+
+	def __setstate__(self, state):
+		self.__dict__.update(state)
+		self._lock = threading.Lock()
+
+	@staticmethod
+	def _key(name, labels):
+		return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+	def inc(self, name: str, value: float = 1, **labels):
+		key = Metrics._key(name, labels)
+		with self._lock:
+			self.counters[key] = self.counters.get(key, 0) + value
+
+	def observe(self, name: str, value: float, **labels):
+		key = Metrics._key(name, labels)
+		with self._lock:
+			if key not in self.histograms:
+				self.histograms[key] = Histogram()
+			self.histograms[key].observe(value)
+
+	def value(self, name: str, **labels) -> float:
+		"""
+		Sum of the counters with the given name whose labels include the given ones.
+		"""
+		labels = {key: str(value) for key, value in labels.items()}
+		with self._lock:
+			return sum(value for (counter, items), value in self.counters.items() if counter == name and labels.items() <= dict(items).items())
+
+	def reset(self):
+		with self._lock:
+			self.counters = {}
+			self.histograms = {}
+
+	def merge(self, other: Metrics):
+		"""
+		Add the metrics collected by another instance, e.g. in a worker process.
+		"""
+		with self._lock:
+			for key, value in other.counters.items():
+				self.counters[key] = self.counters.get(key, 0) + value
+			for key, histogram in other.histograms.items():
+				if key not in self.histograms:
+					self.histograms[key] = Histogram()
+				self.histograms[key].merge(histogram)
+
+	def to_dict(self) -> dict:
+		with self._lock:
+			return {
+				"counters": [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in sorted(self.counters.items())],
+				"histograms": [{"name": name, "labels": dict(labels), **histogram.to_dict()} for (name, labels), histogram in sorted(self.histograms.items())],
+			}
+
+	def to_json(self, file_name: str):
+		with open(file_name, "w") as f:
+			json.dump(self.to_dict(), f, indent=4)
+
+	def to_prometheus(self) -> str:
+		"""
+		Metrics in the Prometheus text exposition format.
+		"""
+
+		def labels_text(labels, extra=()):
+			items = [*labels, *extra]
+			if not items:
+				return ""
+			return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in items) + "}"
+
+		lines = []
+		with self._lock:
+			names = sorted({name for name, _ in self.counters} | {name for name, _ in self.histograms})
+			for name in names:
+				if name in DESCRIPTIONS:
+					lines.append(f"# HELP {name} {DESCRIPTIONS[name]}")
+
+				counters = sorted((labels, value) for (counter, labels), value in self.counters.items() if counter == name)
+				if counters:
+					lines.append(f"# TYPE {name} counter")
+					lines.extend(f"{name}{labels_text(labels)} {value}" for labels, value in counters)
+
+				histograms = sorted((labels, histogram) for (histogram_name, labels), histogram in self.histograms.items() if histogram_name == name)
+				if histograms:
+					lines.append(f"# TYPE {name} histogram")
+					for labels, histogram in histograms:
+						cumulative = 0
+						for bound, count in zip(BUCKETS, histogram.buckets):
+							cumulative += count
+							lines.append(f"{name}_bucket{labels_text(labels, [('le', '+Inf' if bound == float('inf') else bound)])} {cumulative}")
+						lines.append(f"{name}_sum{labels_text(labels)} {histogram.sum}")
+						lines.append(f"{name}_count{labels_text(labels)} {histogram.count}")
+
+		return "\n".join(lines) + "\n"
+
+	def to_prometheus_file(self, file_name: str):
+		with open(file_name, "w") as f:
+			f.write(self.to_prometheus())
+
+	def summary(self) -> str:
+		"""
+		Human-readable summary of the run by module: elements (rejected when the circuit of the module is open), requests, bytes received and request latency.
+		"""
+		with self._lock:
+			counters = dict(self.counters)
+			histograms = dict(self.histograms)
+
+		modules = sorted({dict(labels)["module"] for _, labels in [*counters, *histograms] if dict(labels).get("module")})
+
+		def total(name, **labels):
+			return sum(value for (counter, items), value in counters.items() if counter == name and labels.items() <= dict(items).items())
+
+		lines = [f"{'Module':<16}{'Downloaded':>12}{'Failed':>8}{'Skipped':>9}{'Rejected':>10}{'Requests':>10}{'Errors':>8}{'MB':>10}{'Mean (s)':>10}{'p95 (s)':>9}"]
+		for module in modules:
+			latency = Histogram()
+			for (name, items), histogram in histograms.items():
+				if name == "biodumpy_request_seconds" and dict(items).get("module") == module:
+					latency.merge(histogram)
+
+			requests = total("biodumpy_requests_total", module=module)
+			errors = sum(
+				value
+				for (counter, items), value in counters.items()
+				if counter == "biodumpy_requests_total" and dict(items).get("module") == module and not dict(items).get("status", "").startswith(("2", "3"))
+			)
+			mean = f"{latency.sum / latency.count:.3f}" if latency.count else "-"
+			p95 = f"{latency.percentile(95):.3f}" if latency.count else "-"
+			lines.append(
+				f"{module:<16}{total('biodumpy_elements_total', module=module, outcome='downloaded'):>12.0f}{total('biodumpy_elements_total', module=module, outcome='failed'):>8.0f}"
+				f"{total('biodumpy_elements_total', module=module, outcome='skipped'):>9.0f}"
+				f"{total('biodumpy_elements_total', module=module, outcome='rejected'):>10.0f}{requests:>10.0f}{errors:>8.0f}"
+				f"{total('biodumpy_response_bytes_total', module=module) / 2**20:>10.2f}{mean:>10}{p95:>9}"
+			)
+
+		return "\n".join(lines)
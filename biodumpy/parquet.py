@@ -0,0 +1,262 @@
+import importlib.util
+import json
+import threading
+from datetime import datetime, timezone
+
+from .utils import CustomEncoder, create_directory
+
+# Columns of the GBIF and OBIS occurrences with a fixed type, whatever the values of the sample
+KEY_COLUMNS = {
+	"key",
+	"gbifID",
+	"taxonKey",
+	"acceptedTaxonKey",
+	"kingdomKey",
+	"phylumKey",
+	"classKey",
+	"orderKey",
+	"familyKey",
+	"genusKey",
+	"subgenusKey",
+	"speciesKey",
+	"nubKey",
+	"parentKey",
+	"aphiaID",
+	"year",
+	"month",
+	"day",
+	"date_year",
+}
+COORDINATE_COLUMNS = {
+	"decimalLatitude",
+	"decimalLongitude",
+	"coordinateUncertaintyInMeters",
+	"coordinatePrecision",
+	"elevation",
+	"depth",
+	"minimumDepthInMeters",
+	"maximumDepthInMeters",
+	"minimumElevationInMeters",
+	"maximumElevationInMeters",
+}
+# ISO 8601 strings (GBIF) or milliseconds since the epoch (OBIS). eventDate is left as text, as it can be an interval.
+DATE_COLUMNS = {"modified", "lastInterpreted", "lastParsed", "lastCrawled", "dateIdentified", "date_start", "date_mid", "date_end"}
+
+# Column with the values that do not fit the schema inferred from the sample, as a JSON object
+EXTRA_COLUMN = "_extra"
+
+
+def pyarrow_available() -> bool:
+	return importlib.util.find_spec("pyarrow") is not None
+
+
+def _kind(value):
+	if isinstance(value, bool):
+		return "bool"
+	if isinstance(value, int):
+		return "int"
+	if isinstance(value, float):
+		return "float"
+	if isinstance(value, str):
+		return "str"
+	if isinstance(value, list) and all(isinstance(item, str) for item in value):
+		return "list"
+	return "json"
+
+
+def _to_int(value):
+	if isinstance(value, bool):
+		raise TypeError()
+	if isinstance(value, float) and not value.is_integer():
+		raise ValueError()
+	return int(value)
+
+
+def _to_float(value):
+	if isinstance(value, bool):
+		raise TypeError()
+	return float(value)
+
+
+def _to_timestamp(value):
+	if isinstance(value, (int, float)) and not isinstance(value, bool):
+		return datetime.fromtimestamp(value / 1000, tz=timezone.utc)
+
+	# fromisoformat only accepts the Z suffix since Python 3.11
+	date = datetime.fromisoformat(value[:-1] + "+00:00" if value.endswith("Z") else value)
+	return date if date.tzinfo is not None else date.replace(tzinfo=timezone.utc)
+
+
+def _to_type(python_type):
+	def convert(value):
+		if not isinstance(value, python_type) or isinstance(value, bool) != (python_type is bool):
+			raise TypeError()
+		return value
+
+	return convert
+
+
+def _to_list(value):
+	if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+		raise TypeError()
+	return value
+
+
+def _to_json(value):
+	return value if isinstance(value, str) else json.dumps(value, cls=CustomEncoder, ensure_ascii=False)
+
+
+class ParquetWriter:
+	"""
+	Stream records (e.g. GBIF or OBIS occurrences) to a Parquet file, in row groups of ``row_group_size`` records.
+
+	The schema is inferred from the first ``sample_size`` records. The keys, coordinates and dates of the
+	occurrences have a fixed type (int64, float64 and UTC timestamp); the other columns are booleans, integers,
+	floats, strings or lists of strings according to the values of the sample, and nested values are stored as JSON
+	text. Values that do not fit the schema (e.g. a field missing from the sample) are kept in the ``_extra`` column
+	as a JSON object, so no data is lost. Requires pyarrow (``pip install biodumpy[parquet]``).
+
+	The file is created when the first row group is written, so no file is written without records.
+
+	Parameters
+	----------
+	file_name : str
+		Base name of the output file, without extension.
+	row_group_size : int, optional
+		Number of records of each row group.
+		Default is 10000.
+	sample_size : int, optional
+		Number of records used to infer the schema.
+		Default is 1000.
+
+	Example
+	-------
+	>>> import pandas as pd
+	>>> occurrences = pd.read_parquet("downloads/2024-10-10/GBIF/bulk.parquet", columns=["species", "decimalLatitude", "decimalLongitude"])
+	"""
+
+	def __init__(self, file_name: str, row_group_size: int = 10000, sample_size: int = 1000):
+		if row_group_size < 1 or sample_size < 1:
+			raise ValueError("Invalid row_group_size or sample_size. Expected a positive integer.")
+
+		self.file_name = file_name
+		self.row_group_size = row_group_size
+		self.sample_size = sample_size
+		self.schema = None
+		self._converters = None
+		self._writer = None
+		self._buffer = []
+		self._lock = threading.Lock()
+
+	def _path(self):
+		return f"{self.file_name}.parquet"
+
+	def infer_schema(self, records: list):
+		"""
+		Infer the schema of the output from a sample of records.
+		"""
+		import pyarrow as pa
+
+		kinds = {}
+		for record in records:
+			for name, value in record.items():
+				kinds.setdefault(name, set())
+				if value is not None:
+					kinds[name].add(_kind(value))
+
+		fields, converters = [], {}
+		for name, kind in kinds.items():
+			if name == EXTRA_COLUMN:
+				continue
+			if name in KEY_COLUMNS:
+				field, converter = pa.int64(), _to_int
+			elif name in COORDINATE_COLUMNS:
+				field, converter = pa.float64(), _to_float
+			elif name in DATE_COLUMNS:
+				field, converter = pa.timestamp("ms", tz="UTC"), _to_timestamp
+			elif kind == {"bool"}:
+				field, converter = pa.bool_(), _to_type(bool)
+			elif kind == {"int"}:
+				field, converter = pa.int64(), _to_int
+			elif kind and kind <= {"int", "float"}:
+				field, converter = pa.float64(), _to_float
+			elif kind == {"str"} or not kind:
+				field, converter = pa.string(), _to_type(str)
+			elif kind == {"list"}:
+				field, converter = pa.list_(pa.string()), _to_list
+			else:
+				field, converter = pa.string(), _to_json
+			fields.append(pa.field(name, field))
+			converters[name] = converter
+
+		fields.append(pa.field(EXTRA_COLUMN, pa.string()))
+		self.schema = pa.schema(fields)
+		self._converters = converters
+
+	def _columns(self, records):
+		"""
+		Convert the records to columns of the schema.
+		"""
+		columns = {name: [] for name in self._converters}
+		extras = []
+		for record in records:
+			extra = {}
+			for name, converter in self._converters.items():
+				value = record.get(name)
+				if value is not None:
+					try:
+						value = converter(value)
+					except (TypeError, ValueError, OverflowError):
+						extra[name] = value
+						value = None
+				columns[name].append(value)
+
+			for name, value in record.items():
+				if name not in self._converters and value is not None:
+					extra[name] = value
+			extras.append(json.dumps(extra, cls=CustomEncoder, ensure_ascii=False) if extra else None)
+
+		columns[EXTRA_COLUMN] = extras
+		return columns
+
+	def _flush(self):
+		if not self._buffer:
+			return
+
+		import pyarrow as pa
+		import pyarrow.parquet as pq
+
+		if self.schema is None:
+			self.infer_schema(self._buffer[: self.sample_size])
+
+		if self._writer is None:
+			create_directory(self._path())
+			self._writer = pq.ParquetWriter(self._path(), self.schema, compression="zstd")
+
+		table = pa.Table.from_pydict(self._columns(self._buffer), schema=self.schema)
+		self._writer.write_table(table, row_group_size=len(self._buffer))
+		self._buffer = []
+
+	def write(self, payload):
+		"""
+		Append the records of a payload to the output, writing a row group each time ``row_group_size`` records are
+		buffered.
+		"""
+		if isinstance(payload, dict):
+			payload = [payload]
+
+		with self._lock:
+			for record in payload:
+				if not isinstance(record, dict):
+					raise ValueError("Invalid payload. The Parquet output expects records (dictionaries).")
+
+				self._buffer.append(record)
+				if len(self._buffer) >= self.row_group_size:
+					self._flush()
+
+	def close(self):
+		with self._lock:
+			self._flush()
+			if self._writer is not None:
+				self._writer.close()
+				self._writer = None
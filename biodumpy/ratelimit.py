@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import threading
+import time
+from urllib.parse import urlparse
+
+
+class TokenBucket:
+	"""
+	Thread-safe token bucket.
+
+	Parameters
+	----------
+	rate : float
+		Sustained rate, in tokens per second.
+	burst : int, optional
+		Maximum number of tokens that can be spent at once after an idle period.
+		Default is 1.
+	"""
+
+	def __init__(self, rate: float, burst: int = 1):
+		if rate <= 0:
+			raise ValueError("Invalid rate. Expected a positive number.")
+
+		if burst < 1:
+			raise ValueError("Invalid burst. Expected a positive integer.")
+
+		self.rate = rate
+		self.burst = burst
+		self._tokens = burst
+		self._last = time.monotonic()
+		self._lock = threading.Lock()
+
+	def _reserve(self, tokens: int = 1) -> float:
+		"""
+		Take the tokens from the bucket and return the time to wait before using them.
+		"""
+		with self._lock:
+			self._refill()
+			self._tokens -= tokens
+
+			return -self._tokens / self.rate if self._tokens < 0 else 0
+
+	def _refill(self):
+		now = time.monotonic()
+		self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+		self._last = now
+
+	def try_acquire(self, tokens: int = 1) -> bool:
+		"""
+		Take the tokens only if they are available right away. Returns True if they were taken.
+		"""
+		with self._lock:
+			self._refill()
+			if self._tokens < tokens:
+				return False
+
+			self._tokens -= tokens
+			return True
+
+	def acquire(self, tokens: int = 1) -> float:
+		"""
+		Block until the tokens are available. Returns the time spent waiting, in seconds.
+		"""
+		wait = self._reserve(tokens)
+		if wait > 0:
+			time.sleep(wait)
+
+		return wait
+
+
+class RateLimiter:
+	"""
+	Token buckets keyed by remote host. Hosts without a configured limit are not throttled.
+
+	Parameters
+	----------
+	limits : dict, optional
+		Dictionary mapping a host (e.g. 'api.gbif.org') to a (rate, burst) tuple.
+		Default is None.
+
+	Example
+	-------
+	>>> limiter = RateLimiter({"eutils.ncbi.nlm.nih.gov": (10, 1), "api.gbif.org": (20, 5)})
+	>>> limiter.acquire("https://api.gbif.org/v1/species")
+	"""
+
+	def __init__(self, limits: dict | None = None):
+		self.limits = dict(limits or {})
+		self._buckets = {}
+		self._lock = threading.Lock()
+
+	def __reduce__(self):
+		# Locks cannot be pickled: worker processes get a fresh limiter with the same limits
+		return RateLimiter, (self.limits,)
+
+	def bucket(self, url: str):
+		"""
+		Return the token bucket of the host of the url, or None if the host is not throttled.
+		"""
+		host = urlparse(url).hostname or url
+
+		with self._lock:
+			if host not in self._buckets:
+				limit = self.limits.get(host)
+				self._buckets[host] = TokenBucket(*limit) if limit else None
+
+			return self._buckets[host]
+
+	def acquire(self, url: str) -> float:
+		bucket = self.bucket(url)
+		return bucket.acquire() if bucket else 0
+
+	def try_acquire(self, url: str) -> bool:
+		bucket = self.bucket(url)
+		return bucket.try_acquire() if bucket else True
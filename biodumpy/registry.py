@@ -0,0 +1,114 @@
+import importlib
+
+from .input import Input
+
+# Entry point group of the input modules provided by other packages
+ENTRY_POINT_GROUP = "biodumpy.inputs"
+
+
+class Registry:
+	"""
+	Registry of the input modules, referenced by name. Besides the built-in inputs, it discovers the inputs
+	declared by the installed packages in the ``biodumpy.inputs`` entry point group, e.g. in setup.cfg:
+
+	.. code-block:: ini
+
+		[options.entry_points]
+		biodumpy.inputs =
+			Mirror = mypackage.mirror:Mirror
+
+	Modules are only imported when an input is referenced, so unused inputs cost nothing.
+
+	Parameters
+	----------
+	group : str, optional
+		Entry point group of the inputs.
+		Default is "biodumpy.inputs".
+
+	Example
+	-------
+	>>> from biodumpy.registry import registry
+	>>> registry.names()
+	['BOLD', 'COL', 'Crossref', 'GBIF', 'INaturalist', 'IUCN', 'NCBI', 'OBIS', 'WORMS', 'ZooBank']
+	>>> gbif = registry.create("GBIF", occ=True)
+	>>> registry.capabilities("NCBI")
+	{'rate_limits': {'eutils.ncbi.nlm.nih.gov': (3, 1)}}
+	"""
+
+	def __init__(self, group: str = ENTRY_POINT_GROUP):
+		from .inputs import __all__ as builtins
+
+		self.group = group
+		# Name -> input class or "module:attribute" reference, loaded on first use
+		self._inputs = {name: f"biodumpy.inputs.{name}:{name}" for name in builtins}
+		self._discovered = False
+
+	def _discover(self):
+		if self._discovered:
+			return
+
+		from importlib.metadata import entry_points
+
+		try:
+			found = entry_points(group=self.group)
+		except TypeError:
+			# Python < 3.10
+			found = entry_points().get(self.group, [])
+
+		for entry_point in found:
+			self._inputs.setdefault(entry_point.name, entry_point)
+		self._discovered = True
+
+	def register(self, name: str, cls):
+		"""
+		Register an input class, or a "module:attribute" reference to it, under a name.
+		"""
+		self._inputs[name] = cls
+
+	def names(self) -> list:
+		"""
+		Names of the registered inputs, without importing them.
+		"""
+		self._discover()
+		return sorted(self._inputs)
+
+	def get(self, name: str) -> type:
+		"""
+		Return the input class registered under a name, importing its module if needed.
+		"""
+		if name not in self._inputs:
+			self._discover()
+
+		if name not in self._inputs:
+			raise ValueError(f"Invalid input {name!r}. Expected one of {', '.join(self.names())}.")
+
+		cls = self._inputs[name]
+		if isinstance(cls, str):
+			module, _, attribute = cls.partition(":")
+			cls = getattr(importlib.import_module(module), attribute)
+		elif not isinstance(cls, type):
+			# Entry point
+			cls = cls.load()
+
+		if not (isinstance(cls, type) and issubclass(cls, Input)):
+			raise ValueError(f"Invalid input {name!r}. Expected a subclass of Input.")
+
+		self._inputs[name] = cls
+		return cls
+
+	def create(self, name: str, **kwargs) -> Input:
+		"""
+		Create an instance of the input registered under a name.
+		"""
+		return self.get(name)(**kwargs)
+
+	def capabilities(self, name: str) -> dict:
+		"""
+		Capabilities declared by the input registered under a name (see ``Input``).
+		"""
+		cls = self.get(name)
+		return {"rate_limits": dict(cls.rate_limits)}
+
+
+# Default registry, used by Biodumpy to resolve the inputs given by name
+registry = Registry()
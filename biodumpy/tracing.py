@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Span enclosing the code running in the current context, parent of the spans started in it
+current_span = ContextVar("current_span", default=None)
+
+# Status codes of the OpenTelemetry spans
+STATUS_UNSET = 0
+STATUS_ERROR = 2
+
+
+class Span:
+	"""
+	Timed operation of a trace, e.g. the download of an element or a request.
+	"""
+
+	def __init__(self, name: str, trace_id: str, parent_id: str | None = None, attributes: dict | None = None):
+		self.name = name
+		self.trace_id = trace_id
+		self.span_id = os.urandom(8).hex()
+		self.parent_id = parent_id
+		self.attributes = dict(attributes or {})
+		self.start = time.time_ns()
+		self.end = None
+		self.status = STATUS_UNSET
+		self.message = None
+
+	def set(self, key: str, value):
+		self.attributes[key] = value
+
+	def fail(self, message: str):
+		self.status = STATUS_ERROR
+		self.message = message
+
+	@property
+	def duration(self) -> float:
+		"""
+		Duration of the span in seconds (None while the span is open).
+		"""
+		return None if self.end is None else (self.end - self.start) / 1e9
+
+	def to_otlp(self) -> dict:
+		span = {
+			"traceId": self.trace_id,
+			"spanId": self.span_id,
+			"name": self.name,
+			# SPAN_KIND_INTERNAL, or SPAN_KIND_CLIENT for the requests
+			"kind": 3 if "url.full" in self.attributes else 1,
+			"startTimeUnixNano": str(self.start),
+			"endTimeUnixNano": str(self.end),
+			"attributes": [{"key": key, "value": _otlp_value(value)} for key, value in self.attributes.items()],
+			"status": {"code": self.status},
+		}
+		if self.parent_id:
+			span["parentSpanId"] = self.parent_id
+		if self.message:
+			span["status"]["message"] = self.message
+
+		return span
+
+
+def _otlp_value(value) -> dict:
+	if isinstance(value, bool):
+		return {"boolValue": value}
+	if isinstance(value, int):
+		return {"intValue": str(value)}
+	if isinstance(value, float):
+		return {"doubleValue": value}
+	return {"stringValue": str(value)}
+
+
+class Tracer:
+	"""
+	Lightweight tracer recording nested spans (module, element, request) with their durations, exported to a
+	local JSON file in the OpenTelemetry (OTLP) format.
+
+	Parameters
+	----------
+	service_name : str, optional
+		Name of the service in the exported resource.
+		Default is "biodumpy".
+
+	Example
+	-------
+	>>> tracer = Tracer()
+	>>> with tracer.span("GBIF"):
+	...     with tracer.span("Pinna nobilis", {"biodumpy.query": "Pinna nobilis"}):
+	...         pass
+	>>> tracer.to_json("trace.json")
+	"""
+
+	def __init__(self, service_name: str = "biodumpy"):
+		self.service_name = service_name
+		self.trace_id = os.urandom(16).hex()
+		self.spans = []
+		# Open spans of the input modules, parents of the element spans
+		self.modules = {}
+		self._lock = threading.Lock()
+
+	def __getstate__(self):
+		state = self.__dict__.copy()
+		state["_lock"] = None
+		return state
+
+	def __setstate__(self, state):
+		self.__dict__.update(state)
+		self._lock = threading.Lock()
+
+	def reset(self):
+		"""
+		Start a new trace.
+		"""
+		with self._lock:
+			self.trace_id = os.urandom(16).hex()
+			self.spans = []
+			self.modules = {}
+
+	def fork(self):
+		"""
+		Return a tracer continuing the trace with no finished spans, e.g. in a worker process.
+		"""
+		tracer = Tracer(self.service_name)
+		tracer.trace_id = self.trace_id
+		tracer.modules = dict(self.modules)
+		return tracer
+
+	def merge(self, other: Tracer):
+		"""
+		Add the finished spans of a forked tracer.
+		"""
+		with self._lock:
+			self.spans.extend(other.spans)
+
+	def start_span(self, name: str, attributes: dict | None = None, parent: Span = None) -> Span:
+		"""
+		Open a span, child of ``parent`` or, if None, of the current span.
+		"""
+		parent = parent if parent is not None else current_span.get()
+		return Span(name, self.trace_id, parent.span_id if parent is not None else None, attributes)
+
+	def finish(self, span: Span):
+		span.end = time.time_ns()
+		with self._lock:
+			self.spans.append(span)
+
+	@contextmanager
+	def span(self, name: str, attributes: dict | None = None, parent: Span = None):
+		"""
+		Context manager opening a span, which is the current span of the enclosed code.
+		"""
+		span = self.start_span(name, attributes, parent)
+		token = current_span.set(span)
+		try:
+			yield span
+		except BaseException as e:
+			span.fail(str(e) or type(e).__name__)
+			raise
+		finally:
+			current_span.reset(token)
+			self.finish(span)
+
+	def module_span(self, module: str) -> Span:
+		"""
+		Return the span of an input module, root of the trace of its elements, opening it at the first call.
+		"""
+		with self._lock:
+			if module not in self.modules:
+				self.modules[module] = Span(module, self.trace_id, attributes={"biodumpy.module": module})
+			return self.modules[module]
+
+	def finish_modules(self):
+		"""
+		Close the spans of the input modules.
+		"""
+		for span in self.modules.values():
+			self.finish(span)
+		self.modules = {}
+
+	def to_otlp(self) -> dict:
+		with self._lock:
+			spans = [span.to_otlp() for span in self.spans]
+
+		return {
+			"resourceSpans": [
+				{
+					"resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+					"scopeSpans": [{"scope": {"name": "biodumpy"}, "spans": spans}],
+				}
+			]
+		}
+
+	def to_json(self, file_name: str):
+		with open(file_name, "w") as f:
+			json.dump(self.to_otlp(), f, indent=4)
@@ -1,8 +1,15 @@
+from __future__ import annotations
+
 import csv
+import io
 import json
 import os
 import re
+import uuid
+import zipfile
+from contextlib import contextmanager
 from copy import deepcopy
+from xml.etree import ElementTree
 
 
 class CustomEncoder(json.JSONEncoder):
@@ -21,26 +28,287 @@ class CustomEncoder(json.JSONEncoder):
 			return super().default(obj)
 
 
-def dump(file_name, obj_list, output_format="json"):
+class JsonSerializer:
+	"""
+	JSON serializer of the payloads, used by ``dump`` and by the bulk writers. Objects that are not JSON types are
+	converted as by ``CustomEncoder``.
+
+	Parameters
+	----------
+	indent : int, optional
+		Indentation of the output. If None, the output is compact: no indentation and no spaces, which is about a third
+		smaller than the indented output. JSON Lines outputs are always compact.
+		Default is 4.
+	backend : str, optional
+		'json' (the standard library), 'orjson' (much faster, requires the orjson package, and only supports an
+		indent of 2 or None) or 'auto' (orjson when it is installed and supports the indent, json otherwise).
+		Default is 'auto'.
+
+	Example
+	-------
+	>>> from biodumpy import Biodumpy
+	>>> from biodumpy.utils import JsonSerializer
+	>>> bdp = Biodumpy([GBIF(bulk=True, occ=True)], serializer=JsonSerializer(indent=None))
+	"""
+
+	BACKENDS = ("auto", "json", "orjson")
+
+	def __init__(self, indent: int = 4, backend: str = "auto"):
+		if backend not in JsonSerializer.BACKENDS:
+			raise ValueError(f"Invalid backend. Expected one of {', '.join(JsonSerializer.BACKENDS)}.")
+
+		if backend != "json" and indent in (None, 2):
+			try:
+				import orjson
+			except ImportError:
+				if backend == "orjson":
+					raise ValueError("Invalid backend. orjson is not installed (pip install orjson).")
+				orjson = None
+		elif backend == "orjson":
+			raise ValueError("Invalid indent. The orjson backend only supports an indent of 2 or None.")
+		else:
+			orjson = None
+
+		self.indent = indent
+		self.backend = "orjson" if orjson is not None else "json"
+		self._orjson = orjson
+		self._options = 0
+		if orjson is not None:
+			# Keys that are not strings are converted as by json (e.g. integers)
+			self._options = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+
+	def __reduce__(self):
+		# Modules cannot be pickled: worker processes import orjson again
+		return JsonSerializer, (self.indent, self.backend)
+
+	def dumps(self, obj) -> str:
+		if self._orjson is not None:
+			try:
+				return self._orjson.dumps(obj, default=CustomEncoder().default, option=self._options).decode("utf-8")
+			except self._orjson.JSONEncodeError:
+				# e.g. integers larger than 64 bits, supported by json
+				pass
+
+		if self.indent is None:
+			return json.dumps(obj, cls=CustomEncoder, separators=(",", ":"), ensure_ascii=False)
+
+		return json.dumps(obj, cls=CustomEncoder, indent=self.indent)
+
+	def dumps_line(self, obj) -> str:
+		"""
+		Compact JSON text of an object on a single line, for the JSON Lines output, whatever the indent.
+		"""
+		if self._orjson is not None:
+			try:
+				return self._orjson.dumps(obj, default=CustomEncoder().default, option=self._orjson.OPT_NON_STR_KEYS).decode("utf-8")
+			except self._orjson.JSONEncodeError:
+				pass
+
+		return json.dumps(obj, cls=CustomEncoder, separators=(",", ":"), ensure_ascii=False)
+
+	def array_item(self, obj, first: bool) -> str:
+		"""
+		Text of an element of a JSON array written one element at a time, with the same layout as ``dumps`` of the
+		whole array.
+		"""
+		if self.indent is None:
+			return ("" if first else ",") + self.dumps(obj)
+
+		pad = " " * self.indent
+		return ("" if first else ",") + "\n" + pad + self.dumps(obj).replace("\n", "\n" + pad)
+
+	def array_end(self, empty: bool) -> str:
+		return "]" if empty or self.indent is None else "\n]"
+
+
+# Extension of the compressed files, by compression
+COMPRESSIONS = {"gzip": ".gz", "zstd": ".zst"}
+
+
+def compression_of(file_path: str) -> str:
+	"""
+	Compression of a file according to its extension (e.g. 'bulk.json.gz'), or None if it is not compressed.
+	"""
+	for compression, extension in COMPRESSIONS.items():
+		if file_path.endswith(extension):
+			return compression
+
+	return None
+
+
+def open_text(file_path: str, mode: str = "r", compression: str | None = None, newline: str | None = None):
+	"""
+	Open a UTF-8 text file, streaming its content through gzip or zstd.
+
+	Parameters
+	----------
+	file_path : str
+		Path of the file.
+	mode : str, optional
+		'r', 'w' or 'a'. Appending to a compressed file adds a new gzip member or zstd frame.
+		Default is 'r'.
+	compression : str, optional
+		'gzip' or 'zstd' (requires the zstandard package). If None, the compression is guessed from the extension of
+		the file ('.gz' or '.zst').
+		Default is None.
+	newline : str, optional
+		See ``open``.
+		Default is None.
+	"""
+	compression = compression or compression_of(file_path)
+	if compression is None:
+		return open(file_path, mode, encoding="utf-8", newline=newline)
+
+	return io.TextIOWrapper(open_binary(file_path, mode, compression), encoding="utf-8", newline=newline)
+
+
+def open_binary(file_path: str, mode: str = "r", compression: str | None = None):
+	"""
+	Open a binary file, streaming its content through gzip or zstd. See ``open_text``.
+	"""
+	compression = compression or compression_of(file_path)
+	if compression is None:
+		return open(file_path, mode + "b")
+
+	if compression == "gzip":
+		import gzip
+
+		# Level 6, as zlib: level 9 (the gzip default) is several times slower for a few percent
+		return gzip.open(file_path, mode + "b", compresslevel=6)
+
+	if compression == "zstd":
+		try:
+			import zstandard
+		except ImportError:
+			raise ValueError("Invalid compression. 'zstd' requires zstandard (pip install biodumpy[zstd]).")
+
+		raw = open(file_path, mode + "b")
+		if mode == "r":
+			# Files appended to are made of several frames
+			return zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=True)
+		return zstandard.ZstdCompressor().stream_writer(raw, closefd=True)
+
+	raise ValueError(f"Invalid compression. Expected one of {', '.join(COMPRESSIONS)}.")
+
+
+def decompress(file_path: str, compression: str | None = None, offset: int = 0):
+	"""
+	Yield the decompressed content of a gzip or zstd file, in chunks, checking that its last gzip member or zstd
+	frame is complete (``open_binary`` silently stops at the end of a truncated zstd frame). If ``offset`` is set,
+	the file is read from that byte, which must start a gzip member or a zstd frame.
+
+	Raises
+	------
+	EOFError
+		If the file is truncated or corrupted, after the chunks decompressed before the damage.
+	"""
+	compression = compression or compression_of(file_path)
+	if compression == "gzip":
+		import zlib
+
+		# 16 + MAX_WBITS: gzip header and trailer
+		new, errors = lambda: zlib.decompressobj(16 + zlib.MAX_WBITS), zlib.error
+	elif compression == "zstd":
+		import zstandard
+
+		new, errors = zstandard.ZstdDecompressor().decompressobj, zstandard.ZstdError
+	else:
+		raise ValueError(f"Invalid compression. Expected one of {', '.join(COMPRESSIONS)}.")
+
+	decompressor = None
+	with open(file_path, "rb") as f:
+		f.seek(offset)
+		while chunk := f.read(65536):
+			# A chunk can end a member (frame) and start the next one
+			while chunk:
+				if decompressor is None:
+					decompressor = new()
+				try:
+					yield decompressor.decompress(chunk)
+				except errors as e:
+					raise EOFError(f"Corrupted compressed file {file_path}: {e}")
+				if decompressor.eof:
+					chunk, decompressor = decompressor.unused_data, None
+				else:
+					chunk = b""
+
+	if decompressor is not None:
+		raise EOFError(f"Truncated compressed file {file_path}.")
+
+
+def dump(file_name, obj_list, output_format="json", serializer: JsonSerializer = None, compression: str | None = None):
 	"""
 	Dump a list of objects to JSON files. Optionally split into multiple files for bulk processing.
 
 	Parameters:
 	    file_name (str): Base name of the output JSON file.
 	    obj_list (list): List of objects to be written to JSON.
-	    output_format: output format. Default is "json". Other formats can be "fasta", "pdf".
+	    output_format: output format. Default is "json". Other formats can be "jsonl" (one object per line), "parquet"
+	        (see biodumpy.parquet.ParquetWriter), "fasta", "pdf".
+	    serializer (JsonSerializer): serializer of the JSON output. Default is None, an indented output.
+	    compression (str): "gzip" or "zstd" to compress the text outputs while they are written, adding the ".gz" or
+	        ".zst" extension. Default is None.
 	"""
 
 	create_directory(file_name)
 
-	with open(f"{file_name}.{output_format}", "wb+" if output_format == "pdf" else "w+") as output_file:
+	if output_format == "parquet":
+		from .parquet import ParquetWriter
+
+		with atomic_path(f"{file_name}.parquet") as temp_path:
+			writer = ParquetWriter(temp_path[: -len(".parquet")])
+			writer.write(obj_list)
+			writer.close()
+		return
+
+	if output_format == "pdf":
+		with atomic_path(f"{file_name}.{output_format}") as temp_path, open(temp_path, "wb+") as output_file:
+			output_file.write(obj_list)
+		return
+
+	with atomic_path(f"{file_name}.{output_format}{COMPRESSIONS.get(compression, '')}") as temp_path, open_text(temp_path, "w", compression=compression) as output_file:
 		if output_format == "fasta":
 			for line in obj_list:
 				output_file.write(f"{line}\n")
-		elif output_format == "pdf":
-			output_file.write(obj_list)
+		elif output_format == "jsonl":
+			serializer = serializer or DEFAULT_SERIALIZER
+			for obj in obj_list:
+				output_file.write(serializer.dumps_line(obj) + "\n")
 		else:
-			json.dump(obj_list, output_file, indent=4)
+			output_file.write((serializer or DEFAULT_SERIALIZER).dumps(obj_list))
+
+
+@contextmanager
+def atomic_path(file_path: str):
+	"""
+	Yield a temporary path in the folder of ``file_path``, renamed to ``file_path`` once the block completes, so that
+	an interrupted write never leaves a truncated file. If the block fails, the temporary file is removed.
+
+	Parameters:
+	    file_path (str): Path of the file to write.
+
+	Example:
+	    with atomic_path('downloads/taxa.json') as temp_path, open(temp_path, 'w') as f:
+	        f.write('[]')
+	"""
+
+	directory, name = os.path.split(file_path)
+	# Hidden, so that it is not taken for an output (e.g. by glob), and with the extension of the file
+	temp_path = os.path.join(directory, f".{uuid.uuid4().hex[:8]}.{name}")
+	try:
+		yield temp_path
+	except BaseException:
+		if os.path.exists(temp_path):
+			os.remove(temp_path)
+		raise
+
+	# Nothing is written e.g. for a Parquet file without records
+	if os.path.exists(temp_path):
+		os.replace(temp_path, file_path)
+
+
+# Same output as json.dump(obj_list, output_file, indent=4)
+DEFAULT_SERIALIZER = JsonSerializer(indent=4, backend="json")
 
 
 def create_directory(file_name):
@@ -187,15 +455,17 @@ def read_fasta(file_path: str) -> list:
 	----------
 
 	file_path: str
-	    Path of the fasta file.
+	    Path of the fasta file, optionally compressed with gzip ('.gz') or zstd ('.zst').
 	"""
 
 	# Check if the file is .fasta.
-	if not file_path.endswith((".fasta", ".fas", ".fa", ".fna", ".ffn", ".faa", ".mpfa", ".frn")):
+	compression = compression_of(file_path)
+	name = file_path[: -len(COMPRESSIONS[compression])] if compression else file_path
+	if not name.endswith((".fasta", ".fas", ".fa", ".fna", ".ffn", ".faa", ".mpfa", ".frn")):
 		raise ValueError(f"Invalid file: '{file_path}'. Please provide a file with a correct extension.")
 
 	sequences = []
-	with open(file_path, "r") as file:
+	with open_text(file_path, "r") as file:
 		sequence_id = None
 		sequence_data = []
 
@@ -215,6 +485,156 @@ def read_fasta(file_path: str) -> list:
 	return sequences
 
 
+def read_taxa_text(file_path: str):
+	"""
+	Lazily read a text file with one taxon per line. Empty lines and lines starting with '#' are skipped.
+
+	Parameters
+	----------
+
+	file_path: str
+	    Path of the text file, optionally compressed with gzip ('.gz') or zstd ('.zst').
+
+	Returns
+	-------
+	A generator of dictionaries with a 'query' key, which can be passed to ``Biodumpy.start``.
+
+	Example
+	-------
+	>>> bdp.start(read_taxa_text("taxa.txt"), output_path="./downloads/{date}/{module}/{name}")
+	"""
+
+	with open_text(file_path, "r") as file:
+		yield from _read_taxa_lines(file)
+
+
+def read_taxa_csv(file_path: str, column: str = "scientificName", delimiter: str = ","):
+	"""
+	Lazily read the taxa from a column of a CSV file with a header.
+
+	Parameters
+	----------
+
+	file_path: str
+	    Path of the CSV file, optionally compressed with gzip ('.gz') or zstd ('.zst').
+	column: str
+	    Name of the column containing the taxa.
+	    Default is 'scientificName'.
+	delimiter: str
+	    Field delimiter, e.g. '\\t' for tab-separated files.
+	    Default is ','.
+
+	Returns
+	-------
+	A generator of dictionaries with a 'query' key, which can be passed to ``Biodumpy.start``.
+	"""
+
+	with open_text(file_path, "r", newline="") as file:
+		yield from _read_taxa_rows(csv.reader(file, delimiter=delimiter), column=column)
+
+
+def read_taxa_dwca(path: str, term: str = "scientificName"):
+	"""
+	Lazily read the taxa from the core file of a Darwin Core Archive checklist.
+
+	Parameters
+	----------
+
+	path: str
+	    Path of the archive: a .zip file, a folder with a meta.xml descriptor, or the core file itself
+	    (e.g. taxon.txt, tab-separated with a header).
+	term: str
+	    Darwin Core term containing the taxa, e.g. 'scientificName' or 'canonicalName'.
+	    Default is 'scientificName'.
+
+	Returns
+	-------
+	A generator of dictionaries with a 'query' key, which can be passed to ``Biodumpy.start``.
+	"""
+
+	if zipfile.is_zipfile(path):
+		with zipfile.ZipFile(path) as archive:
+			core = _dwca_core(archive.read("meta.xml") if "meta.xml" in archive.namelist() else None, term)
+			with archive.open(core.pop("file")) as binary, io.TextIOWrapper(binary, encoding=core.pop("encoding"), newline="") as file:
+				yield from _read_dwca_core(file, **core)
+	else:
+		meta_path = os.path.join(path, "meta.xml") if os.path.isdir(path) else None
+		if meta_path and os.path.exists(meta_path):
+			with open(meta_path, "rb") as meta:
+				core = _dwca_core(meta.read(), term)
+		else:
+			core = _dwca_core(None, term)
+
+		core_file = core.pop("file")
+		file_path = os.path.join(path, core_file) if os.path.isdir(path) else path
+		with open(file_path, "r", encoding=core.pop("encoding"), newline="") as file:
+			yield from _read_dwca_core(file, **core)
+
+
+def _dwca_core(meta: bytes, term: str) -> dict:
+	"""
+	Read the description of the core file of a Darwin Core Archive from its meta.xml.
+	Without a meta.xml, the core is a tab-separated taxon.txt file with a header.
+	"""
+
+	core = {"file": "taxon.txt", "encoding": "utf-8", "delimiter": "\t", "skip": 1, "index": None, "term": term}
+	if meta is None:
+		return core
+
+	namespace = {"dwc": "http://rs.tdwg.org/text/"}
+	root = ElementTree.fromstring(meta)
+	node = root.find("dwc:core", namespace)
+	if node is None:
+		raise ValueError("Invalid Darwin Core Archive. The meta.xml has no core file.")
+
+	core["file"] = node.find("dwc:files/dwc:location", namespace).text
+	core["encoding"] = node.get("encoding", "utf-8")
+	core["delimiter"] = node.get("fieldsTerminatedBy", "\\t").encode().decode("unicode_escape")
+	core["skip"] = int(node.get("ignoreHeaderLines", 0))
+
+	for field in node.findall("dwc:field", namespace):
+		if field.get("term", "").rsplit("/", 1)[-1] == term:
+			core["index"] = int(field.get("index"))
+			break
+	else:
+		raise ValueError(f"Invalid Darwin Core Archive. The core file has no '{term}' field.")
+
+	return core
+
+
+def _read_dwca_core(file, delimiter, skip, index, term):
+	reader = csv.reader(file, delimiter=delimiter, quoting=csv.QUOTE_NONE)
+	if index is None:
+		yield from _read_taxa_rows(reader, column=term)
+	else:
+		for _ in range(skip):
+			next(reader, None)
+		for row in reader:
+			if len(row) > index and row[index].strip():
+				yield {"query": row[index].strip()}
+
+
+def _read_taxa_lines(lines):
+	for line in lines:
+		line = line.strip()
+		if line and not line.startswith("#"):
+			yield {"query": line}
+
+
+def _read_taxa_rows(reader, column: str):
+	header = next(reader, None)
+	if header is None:
+		return
+
+	if column not in header:
+		raise ValueError(f"Invalid column. '{column}' is not in the header: {header}.")
+
+	index = header.index(column)
+	for row in reader:
+		if len(row) > index and row[index].strip():
+			yield {"query": row[index].strip()}
+
+
 def save_fasta(file_path: str, sequences: list):
 	"""
 	Save a list of sequences to a FASTA file.
@@ -223,13 +643,13 @@ def save_fasta(file_path: str, sequences: list):
 	----------
 
 	file_path:
-	    Path to the output FASTA file.
+	    Path to the output FASTA file. If it ends with '.gz' or '.zst', the file is compressed with gzip or zstd.
 
 	sequences:
 	    List of dictionaries with 'id' and 'sequence' data.
 	"""
 
-	with open(file_path, "w") as file:
+	with open_text(file_path, "w") as file:
 		for seq in sequences:
 			# Write the header line (e.g., '>id')
 			file.write(f">{seq['id']}\n" if isinstance(seq, dict) else f">{seq[0]}\n")
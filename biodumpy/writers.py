@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import contextvars
+import os
+import re
+import shutil
+import threading
+from queue import Queue
+
+from .utils import COMPRESSIONS, DEFAULT_SERIALIZER, JsonSerializer, create_directory, decompress, open_binary, open_text
+
+# Suffix of the marker kept next to a compressed output while it is written. It holds the offset of the gzip member
+# or zstd frame started by the writer, i.e. the only part of the file an interrupted run can leave incomplete.
+MARKER_SUFFIX = ".writing"
+
+
+class BulkWriter:
+	"""
+	Stream the payloads of a bulk module to disk as they arrive, instead of keeping them in memory.
+
+	JSON output is written incrementally as a single array, with the same layout as ``dump``. JSON Lines and FASTA
+	output are written line by line. The file is created on the first write.
+
+	Parameters
+	----------
+	file_name : str
+		Base name of the output file, without extension.
+	output_format : str, optional
+		Output format, 'json', 'jsonl' or 'fasta'.
+		Default is 'json'.
+	max_size : int, optional
+		Maximum size of each file, in bytes (before compression). When a file exceeds it, the writer rolls over to a
+		new file. The files are numbered from 1 (e.g. bulk_1.json, bulk_2.json). If None, a single file is written.
+		Default is None.
+	serializer : JsonSerializer, optional
+		Serializer of the JSON output (see ``biodumpy.utils.JsonSerializer``). If None, the output is indented.
+		Default is None.
+	append : bool, optional
+		If True, JSON Lines records are appended to the existing file (the last file when ``max_size`` is set), e.g.
+		to accumulate the outputs of several runs. A last line left incomplete by an interrupted run is removed. For
+		compressed files, the gzip member or zstd frame written by an interrupted run (see ``MARKER_SUFFIX``) is
+		rewritten up to its last complete line, without reading the rest of the file. The other formats are always
+		rewritten. Otherwise, the numbered files of a previous run are removed when the first
+		file is created, so that none of its records is mixed with the new ones.
+		Default is False.
+	compression : str, optional
+		'gzip' or 'zstd' to compress the output while it is written (see ``biodumpy.utils.open_text``), adding the
+		'.gz' or '.zst' extension. If None, the output is not compressed.
+		Default is None.
+	"""
+
+	def __init__(
+		self, file_name: str, output_format: str = "json", max_size: int | None = None, serializer: JsonSerializer = None, append: bool = False, compression: str | None = None
+	):
+		self.file_name = file_name
+		self.output_format = output_format
+		self.max_size = max_size
+		self.serializer = serializer or DEFAULT_SERIALIZER
+		self.append = append and output_format == "jsonl"
+		self.compression = compression
+		self.shard = 0
+		self._file = None
+		self._marker = None
+		self._size = 0
+		self._count = 0
+		self._lock = threading.Lock()
+
+	def _path(self):
+		extension = f"{self.output_format}{COMPRESSIONS.get(self.compression, '')}"
+		if self.max_size is None:
+			return f"{self.file_name}.{extension}"
+
+		return f"{self.file_name}_{self.shard}.{extension}"
+
+	def _remove_shards(self):
+		"""
+		Remove the numbered files written by a previous run.
+		"""
+		directory, name = os.path.split(self.file_name)
+		extension = f"{self.output_format}{COMPRESSIONS.get(self.compression, '')}"
+		pattern = re.compile(rf"{re.escape(name)}_\d+\.{re.escape(extension)}({re.escape(MARKER_SUFFIX)})?")
+		if os.path.isdir(directory or "."):
+			for entry in os.listdir(directory or "."):
+				if pattern.fullmatch(entry):
+					os.remove(os.path.join(directory, entry))
+
+	def _open(self):
+		self.shard += 1
+		path = self._path()
+		self._size = 0
+		if not self.append and self.max_size is not None and self.shard == 1:
+			self._remove_shards()
+		if self.append and os.path.exists(path):
+			# Skip the files already full
+			if self.max_size is not None and os.path.getsize(path) >= self.max_size:
+				return self._open()
+			if self.compression is None:
+				_truncate_partial_line(path)
+			elif os.path.exists(path + MARKER_SUFFIX):
+				_repair_compressed(path, self.compression, _read_marker(path + MARKER_SUFFIX))
+			self._size = os.path.getsize(path)
+
+		create_directory(path)
+		if self.compression is not None:
+			self._marker = path + MARKER_SUFFIX
+			with open(self._marker, "w") as f:
+				f.write(str(self._size))
+		self._file = open_text(path, "a" if self.append else "w", compression=self.compression)
+		self._count = 0
+
+		if self.output_format == "json":
+			self._write("[")
+
+	def _write(self, text):
+		self._file.write(text)
+		# Files are written in UTF-8, and max_size is in bytes
+		self._size += len(text) if text.isascii() else len(text.encode("utf-8"))
+
+	def _close_file(self):
+		if self.output_format == "json":
+			self._write(self.serializer.array_end(not self._count))
+
+		self._file.close()
+		self._file = None
+		if self._marker is not None:
+			# Closed cleanly: the next run can append without checking the file
+			os.remove(self._marker)
+			self._marker = None
+
+	def write(self, payload: list):
+		"""
+		Append the records of a payload to the output.
+		"""
+		with self._lock:
+			for record in payload:
+				if self._file is None:
+					self._open()
+
+				if self.output_format == "fasta":
+					self._write(f"{record}\n")
+				elif self.output_format == "jsonl":
+					self._write(self.serializer.dumps_line(record) + "\n")
+				else:
+					# Same layout as the serializer of the whole list
+					self._write(self.serializer.array_item(record, first=not self._count))
+				self._count += 1
+
+				if self.max_size is not None and self._size >= self.max_size:
+					self._close_file()
+
+	def close(self):
+		with self._lock:
+			if self._file is not None:
+				self._close_file()
+
+
+class BackgroundWriter:
+	"""
+	Run the writes of the payloads in a dedicated thread, so that the downloads do not wait for the disk.
+
+	The writes run one at a time, in the order they are submitted, so the bulk files keep the order of the elements.
+	When ``max_pending`` writes are waiting, ``submit`` blocks until one of them is done, which bounds the memory held
+	by the payloads. ``close`` waits for all the queued writes. The first error raised by a write is raised again by
+	every following ``submit`` and by ``close``, and the writes queued after it are discarded.
+
+	Parameters
+	----------
+	max_pending : int, optional
+		Maximum number of writes waiting in the queue.
+		Default is 64.
+	"""
+
+	def __init__(self, max_pending: int = 64):
+		if max_pending < 1:
+			raise ValueError("Invalid max_pending. Expected a positive integer.")
+
+		self._queue = Queue(maxsize=max_pending)
+		self._error = None
+		# Daemon, so that an unclosed writer never keeps the interpreter alive
+		self._thread = threading.Thread(target=self._drain, name="biodumpy-writer", daemon=True)
+		self._thread.start()
+
+	def _drain(self):
+		while (task := self._queue.get()) is not None:
+			# After a failure keep draining the queue, so the producer never blocks on a dead writer.
+			if self._error is None:
+				context, func, args = task
+				try:
+					context.run(func, *args)
+				except BaseException as e:
+					self._error = e
+
+	def _raise(self):
+		# Sticky until close: a failed writer accepts no more writes
+		if self._error is not None:
+			raise self._error
+
+	def submit(self, func, *args):
+		"""
+		Queue a call of ``func`` with ``args``, run in the context (e.g. the current span) of the caller.
+		"""
+		self._raise()
+		self._queue.put((contextvars.copy_context(), func, args))
+
+	def close(self):
+		"""
+		Wait for the queued writes and stop the thread.
+		"""
+		if self._thread.is_alive():
+			self._queue.put(None)
+			self._thread.join()
+
+		error, self._error = self._error, None
+		if error is not None:
+			raise error
+
+
+def _read_marker(path):
+	"""
+	Offset recorded in the marker of a compressed output, 0 if the marker was cut by an interrupted run.
+	"""
+	with open(path) as f:
+		offset = f.read().strip()
+
+	return int(offset) if offset.isdigit() else 0
+
+
+def _repair_compressed(path, compression, offset):
+	"""
+	Rewrite the gzip member or zstd frame started at ``offset`` by an interrupted run up to its last complete line.
+	Nothing can be appended after a truncated member or frame without making the rest of the file unreadable.
+	"""
+	temp_path = f"{path}.repair"
+	complete = True
+	with open_binary(temp_path, "w", compression) as f:
+		pending = b""
+		try:
+			for chunk in decompress(path, compression, offset):
+				pending += chunk
+				end = pending.rfind(b"\n") + 1
+				f.write(pending[:end])
+				pending = pending[end:]
+		except EOFError:
+			complete = False
+
+	# The run was interrupted after closing the file
+	if complete and not pending:
+		os.remove(temp_path)
+		return
+
+	with open(path, "rb+") as f, open(temp_path, "rb") as repaired:
+		f.truncate(offset)
+		f.seek(offset)
+		shutil.copyfileobj(repaired, f)
+	os.remove(temp_path)
+
+
+def _truncate_partial_line(path):
+	"""
+	Remove the end of a file after its last newline, i.e. a line whose writing was interrupted.
+	"""
+	with open(path, "rb+") as f:
+		end = f.seek(0, os.SEEK_END)
+		position = end
+		while position > 0:
+			start = max(0, position - 65536)
+			f.seek(start)
+			index = f.read(position - start).rfind(b"\n")
+			if index != -1:
+				position = start + index + 1
+				break
+			position = start
+
+		if position != end:
+			f.truncate(position)
@@ -50,7 +50,7 @@ def test_bold_initialization():
 
 	# Objective: Verify that the class raises a ValueError when an invalid value is provided for the
 	# output_format parameter.
-	with pytest.raises(ValueError, match='Invalid output_format. Expected "json" or "fasta".'):
+	with pytest.raises(ValueError, match='Invalid output_format. Expected "json", "jsonl" or "fasta".'):
 		BOLD(output_format="xml")
 
 
@@ -0,0 +1,472 @@
+from __future__ import annotations
+
+from tests import *
+import asyncio
+import gzip
+import io
+import json
+import os
+import tempfile
+import time
+from contextlib import redirect_stdout
+from datetime import datetime
+
+import pytest
+
+from biodumpy import Biodumpy, BiodumpyException, Input
+from biodumpy.breaker import CircuitBreaker
+from biodumpy.hooks import Hooks
+from biodumpy.ledger import FailureLedger
+from biodumpy.registry import registry
+
+# set a trap and redirect stdout. Remove the print of the function. In this wat the test output is cleanest.
+trap = io.StringIO()
+
+
+class Echo(Input):
+	"""
+	Offline input that returns the query after a fixed delay.
+	"""
+
+	def __init__(self, delay: float = 0, **kwargs):
+		super().__init__(**kwargs)
+		self.delay = delay
+
+	def _download(self, query, **kwargs) -> list:
+		time.sleep(self.delay)
+		return [{"query": query, "module": type(self).__name__}]
+
+
+class Echo2(Echo):
+	pass
+
+
+class AsyncEcho(Echo):
+	"""
+	Offline input with a native coroutine hook.
+	"""
+
+	async def _adownload(self, query, **kwargs) -> list:
+		await asyncio.sleep(self.delay)
+		return [{"query": query, "module": type(self).__name__}]
+
+
+def date_dir(path):
+	return next(name for name in os.listdir(f"{path}/downloads/") if not name.startswith(".") and os.path.isdir(f"{path}/downloads/{name}"))
+
+
+def read_bulk(path, module):
+	dir_date = date_dir(path)
+	with open(f"{path}/downloads/{dir_date}/{module}/bulk.json", "r") as f:
+		return json.load(f)
+
+
+def test_parallel_lanes():
+	taxa = ["Alytes muletensis", "Bufotes viridis", "Hyla meridionalis"]
+
+	with tempfile.TemporaryDirectory() as temp_dir, redirect_stdout(trap):
+		bdp = Biodumpy([Echo(delay=0.1, sleep=0, bulk=True), Echo2(delay=0.1, sleep=0, bulk=True)], loading_bar=False, parallel=True)
+
+		start = time.time()
+		bdp.start(taxa, output_path=f"{temp_dir}/downloads/{{date}}/{{module}}/{{name}}")
+		elapsed = time.time() - start
+
+		# Both lanes run at the same time, so the run takes about as long as a single module
+		assert elapsed < 0.1 * len(taxa) * 2
+
+		# Each lane keeps the order of the elements
+		assert [item["query"] for item in read_bulk(temp_dir, "Echo")] == taxa
+		assert [item["query"] for item in read_bulk(temp_dir, "Echo2")] == taxa
+
+
+def test_astart():
+	taxa = [f"Taxon {i}" for i in range(20)]
+
+	with tempfile.TemporaryDirectory() as temp_dir, redirect_stdout(trap):
+		# Echo has no coroutine hook and runs in an executor, AsyncEcho is awaited directly
+		bdp = Biodumpy([Echo(delay=0.05, sleep=0, bulk=True), AsyncEcho(delay=0.05, sleep=0, bulk=True)], loading_bar=False)
+
+		start = time.time()
+		asyncio.run(bdp.astart(taxa, output_path=f"{temp_dir}/downloads/{{date}}/{{module}}/{{name}}", concurrency=10))
+		elapsed = time.time() - start
+
+		assert elapsed < 0.05 * len(taxa)
+		assert sorted(item["query"] for item in read_bulk(temp_dir, "Echo")) == sorted(taxa)
+		assert sorted(item["query"] for item in read_bulk(temp_dir, "AsyncEcho")) == sorted(taxa)
+
+		# The synchronous downloads are not capped by the default executor of the event loop (at most 32 threads)
+		taxa = [f"Taxon {i}" for i in range(80)]
+		start = time.time()
+		asyncio.run(Biodumpy([Echo(delay=0.2, sleep=0)], loading_bar=False).astart(taxa, output_path=f"{temp_dir}/downloads/{{date}}/{{module}}/{{name}}", concurrency=80))
+		assert time.time() - start < 0.2 * 2.5
+
+
+class Failing(Input):
+	def _download(self, query, **kwargs) -> list:
+		raise ValueError(f"{query} not found")
+
+
+def test_processes():
+	taxa = [f"Taxon {i}" for i in range(25)]
+
+	with tempfile.TemporaryDirectory() as temp_dir, redirect_stdout(trap):
+		bdp = Biodumpy([Echo(sleep=0, bulk=True), Echo2(sleep=0), Failing(sleep=0)], loading_bar=False, processes=3, rate_limits={"api.gbif.org": (9, 3)})
+		bdp.SHARD_SIZE = 4
+		bdp.start(taxa, output_path=f"{temp_dir}/downloads/{{date}}/{{module}}/{{name}}")
+
+		# Bulk outputs are merged in the order of the elements
+		assert [item["query"] for item in read_bulk(temp_dir, "Echo")] == taxa
+
+		# Non bulk outputs are written by the workers
+		dir_date = date_dir(temp_dir)
+		assert len(os.listdir(f"{temp_dir}/downloads/{dir_date}/Echo2")) == len(taxa)
+
+		# The errors of all the workers are in a single dump file
+		with open(f"{temp_dir}/downloads/dump_{dir_date}.log", "r") as f:
+			assert len([line for line in f if line.startswith("ERROR")]) == len(taxa)
+
+
+class Clock(Input):
+	def _download(self, query, **kwargs) -> list:
+		return [{"query": query, "time": time.time()}]
+
+
+def test_processes_sleep():
+	taxa = [f"Taxon {i}" for i in range(12)]
+
+	with tempfile.TemporaryDirectory() as temp_dir, redirect_stdout(trap):
+		bdp = Biodumpy([Clock(sleep=0.1, bulk=True)], loading_bar=False, processes=3)
+		bdp.SHARD_SIZE = 2
+		bdp.start(taxa, output_path=f"{temp_dir}/downloads/{{date}}/{{module}}/{{name}}")
+
+		# The workers share the sleep of the module, also between shards: a worker gets at least 4 elements, 0.3 seconds apart
+		times = sorted(item["time"] for item in read_bulk(temp_dir, "Clock"))
+		assert times[-1] - times[0] >= 0.3 * 3 * 0.9
+		assert bdp.inputs[0].sleep == 0.1
+
+
+class Crash(BaseException):
+	pass
+
+
+class Counter(Echo):
+	"""
+	Offline input counting its downloads, which can simulate a crash of the run.
+	"""
+
+	def __init__(self, crash_on: str | None = None, **kwargs):
+		super().__init__(**kwargs)
+		self.crash_on = crash_on
+		self.calls = 0
+
+	def _download(self, query, **kwargs) -> list:
+		if query == self.crash_on:
+			raise Crash()
+		self.calls += 1
+		return super()._download(query, **kwargs)
+
+
+def test_resume():
+	taxa = [f"Taxon {i}" for i in range(10)]
+
+	with tempfile.TemporaryDirectory() as temp_dir, redirect_stdout(trap):
+		output_path = f"{temp_dir}/downloads/{{date}}/{{module}}/{{name}}"
+
+		ledger = f"{temp_dir}/downloads/failures_{datetime.now().strftime('%Y-%m-%d')}.jsonl"
+
+		# The first run dies at the sixth element, while writing a failure
+		counter = Counter(crash_on="Taxon 5", sleep=0, bulk=True)
+		with pytest.raises(Crash):
+			Biodumpy([counter, Failing(sleep=0)], loading_bar=False, checkpoint=True).start(taxa, output_path=output_path)
+		assert counter.calls == 5
+		with open(ledger, "a") as f:
+			f.write('{"query": "Taxon 5"')
+
+		# The resumed run only downloads the remaining elements and rebuilds the whole bulk output
+		counter = Counter(sleep=0, bulk=True)
+		Biodumpy([counter], loading_bar=False).start(taxa, output_path=output_path, resume=True)
+		assert counter.calls == 5
+		assert [item["query"] for item in read_bulk(temp_dir, "Counter")] == taxa
+
+		# and keeps the failures of the interrupted run, followed by its own
+		Biodumpy([counter, Failing(sleep=0)], loading_bar=False).start(taxa[5:], output_path=output_path, resume=True)
+		assert [record["query"] for record in FailureLedger.read(ledger)] == taxa
+
+		# A new run without resume starts over
+		counter = Counter(sleep=0, bulk=True)
+		Biodumpy([counter], loading_bar=False, checkpoint=True).start(taxa, output_path=output_path)
+		assert counter.calls == 10
+		assert not os.path.exists(ledger)
+
+		# Each shard of the worker processes only gets the completed pairs of its elements
+		bdp = Biodumpy([Counter(sleep=0, bulk=True)], loading_bar=False, metrics=True, processes=2)
+		bdp.SHARD_SIZE = 3
+		bdp.start(taxa, output_path=output_path, resume=True)
+		assert bdp.metrics.value("biodumpy_elements_total", module="Counter", outcome="skipped") == 10
+		assert [item["query"] for item in read_bulk(temp_dir, "Counter")] == taxa
+		assert bdp._checkpoint.subset(["Counter", "Echo"], taxa[:3]).completed == {("Counter", taxon): None for taxon in taxa[:3]}
+
+
+def test_bulk_max_size_rerun():
+	with tempfile.TemporaryDirectory() as temp_dir, redirect_stdout(trap):
+		output_path = f"{temp_dir}/downloads/{{date}}/{{module}}/{{name}}"
+		bdp = Biodumpy([Echo(sleep=0, bulk=True)], loading_bar=False, bulk_max_size=100)
+
+		bdp.start([f"Taxon {i}" for i in range(20)], output_path=output_path)
+		module_dir = f"{temp_dir}/downloads/{date_dir(temp_dir)}/Echo"
+		assert len(os.listdir(module_dir)) > 3
+
+		# A rerun with fewer taxa leaves no file of the first run
+		bdp.start(["Taxon 0", "Taxon 1", "Taxon 2"], output_path=output_path)
+		queries = []
+		for name in os.listdir(module_dir):
+			with open(f"{module_dir}/{name}") as f:
+				queries.extend(item["query"] for item in json.load(f))
+		assert sorted(queries) == ["Taxon 0", "Taxon 1", "Taxon 2"]
+
+
+def test_lazy_elements():
+	taxa = [f"Taxon {i}" for i in range(10)]
+
+	with tempfile.TemporaryDirectory() as temp_dir, redirect_stdout(trap):
+		output_path = f"{temp_dir}/downloads/{{date}}/{{module}}/{{name}}"
+
+		with pytest.raises(ValueError, match="Invalid query."):
+			Biodumpy([Echo(sleep=0)], loading_bar=False).start("Alytes muletensis", output_path=output_path)
+
+		# Generators are accepted in every execution mode
+		Biodumpy([Echo(sleep=0, bulk=True)], loading_bar=False).start((taxon for taxon in taxa), output_path=output_path)
+		assert [item["query"] for item in read_bulk(temp_dir, "Echo")] == taxa
+
+		Biodumpy([Echo(sleep=0, bulk=True)], loading_bar=False, parallel=True).start(({"query": taxon} for taxon in taxa), output_path=output_path)
+		assert [item["query"] for item in read_bulk(temp_dir, "Echo")] == taxa
+
+		Biodumpy([Echo(sleep=0, bulk=True)], loading_bar=False, processes=2).start(iter(taxa), output_path=output_path)
+		assert [item["query"] for item in read_bulk(temp_dir, "Echo")] == taxa
+
+
+def test_hooks():
+	taxa = ["Alytes muletensis", "Bufotes viridis"]
+	events = []
+
+	def record(event):
+		def callback(inp, element, **kwargs):
+			events.append((event, type(inp).__name__, element["query"], sorted(kwargs)))
+
+		return callback
+
+	hooks = Hooks(**{event: record(event) for event in ["on_request", "on_response", "on_payload", "on_dump", "on_error"]})
+
+	with pytest.raises(ValueError, match="Invalid event."):
+		hooks.register("on_start", print)
+
+	with tempfile.TemporaryDirectory() as temp_dir, redirect_stdout(trap):
+		bdp = Biodumpy([Echo(sleep=0), Failing(sleep=0)], loading_bar=False, hooks=hooks)
+		bdp.start(taxa, output_path=f"{temp_dir}/downloads/{{date}}/{{module}}/{{name}}")
+
+	assert events[:6] == [
+		("on_request", "Echo", taxa[0], []),
+		("on_response", "Echo", taxa[0], ["elapsed"]),
+		("on_payload", "Echo", taxa[0], ["payload"]),
+		("on_dump", "Echo", taxa[0], ["elapsed", "file_name"]),
+		("on_request", "Failing", taxa[0], []),
+		("on_error", "Failing", taxa[0], ["elapsed", "error"]),
+	]
+	assert len(events) == 12
+
+
+class Flaky(Echo):
+	"""
+	Offline input failing the first downloads of each element with an HTTP 503.
+	"""
+
+	def __init__(self, failures: int = 1, **kwargs):
+		super().__init__(**kwargs)
+		self.failures = failures
+		self.calls = {}
+
+	def _download(self, query, **kwargs) -> list:
+		self.calls[query] = self.calls.get(query, 0) + 1
+		if self.calls[query] <= self.failures:
+			raise BiodumpyException("Service unavailable. Error 503", status=503)
+		return super()._download(query, **kwargs)
+
+
+def test_retry_failed():
+	taxa = ["Alytes muletensis", "Bufotes viridis"]
+
+	with tempfile.TemporaryDirectory() as temp_dir, redirect_stdout(trap):
+		output_path = f"{temp_dir}/downloads/{{date}}/{{module}}/{{name}}"
+		flaky = Flaky(failures=2, sleep=0)
+		bdp = Biodumpy([flaky, Failing(sleep=0)], loading_bar=False)
+		bdp.start(taxa, output_path=output_path)
+
+		ledger = f"{temp_dir}/downloads/failures_{datetime.now().strftime('%Y-%m-%d')}.jsonl"
+		records = FailureLedger.read(ledger)
+		assert [(record["module"], record["query"], record["error"], record["status"], record["attempts"]) for record in records] == [
+			("Flaky", taxa[0], "BiodumpyException", 503, 1),
+			("Failing", taxa[0], "ValueError", None, 1),
+			("Flaky", taxa[1], "BiodumpyException", 503, 1),
+			("Failing", taxa[1], "ValueError", None, 1),
+		]
+
+		# Flaky succeeds at the next round, Failing never does
+		remaining = bdp.retry_failed(ledger, output_path=output_path, attempts=2, backoff=0)
+		assert flaky.calls == {taxon: 3 for taxon in taxa}
+		assert [(record["module"], record["attempts"]) for record in remaining] == [("Failing", 3), ("Failing", 3)]
+		assert FailureLedger.read(ledger) == remaining
+		assert sorted(os.listdir(f"{temp_dir}/downloads/{date_dir(temp_dir)}/Flaky")) == [f"{taxon}.json" for taxon in taxa]
+
+
+class Down(Echo):
+	"""
+	Offline input whose service cannot be reached.
+	"""
+
+	def __init__(self, **kwargs):
+		super().__init__(**kwargs)
+		self.calls = 0
+
+	def _download(self, query, **kwargs) -> list:
+		self.calls += 1
+		raise ConnectionError("Connection refused")
+
+
+def test_circuit_breaker():
+	taxa = ["Alytes muletensis", "Bufotes viridis", "Hyla meridionalis", "Pelophylax perezi", "Discoglossus pictus"]
+
+	with tempfile.TemporaryDirectory() as temp_dir, redirect_stdout(trap):
+		down = Down(sleep=0)
+		bdp = Biodumpy([down, Echo(sleep=0), Failing(sleep=0)], loading_bar=False, metrics=True, circuit_breaker=2)
+		bdp.start(taxa, output_path=f"{temp_dir}/downloads/{{date}}/{{module}}/{{name}}")
+
+		# After two outages the remaining taxa go straight to the ledger; Echo and Failing (not an outage) are unaffected
+		assert down.calls == 2
+		assert bdp.metrics.value("biodumpy_elements_total", module="Down", outcome="rejected") == 3
+		assert bdp.metrics.value("biodumpy_elements_total", module="Echo", outcome="downloaded") == 5
+		assert bdp.metrics.value("biodumpy_elements_total", module="Failing", outcome="failed") == 5
+
+		records = FailureLedger.read(f"{temp_dir}/downloads/failures_{datetime.now().strftime('%Y-%m-%d')}.jsonl")
+		assert [(record["query"], record["error"], record["attempts"]) for record in records if record["module"] == "Down"] == [
+			(taxa[0], "ConnectionError", 1),
+			(taxa[1], "ConnectionError", 1),
+			*[(taxon, "CircuitOpenError", 0) for taxon in taxa[2:]],
+		]
+
+	# The circuits of the worker processes stay open from one shard to the next
+	with tempfile.TemporaryDirectory() as temp_dir, redirect_stdout(trap):
+		bdp = Biodumpy([Down(sleep=0)], loading_bar=False, metrics=True, circuit_breaker=2, processes=2)
+		bdp.SHARD_SIZE = 2
+		bdp.start([f"Taxon {i}" for i in range(20)], output_path=f"{temp_dir}/downloads/{{date}}/{{module}}/{{name}}")
+		assert bdp.metrics.value("biodumpy_elements_total", module="Down", outcome="failed") <= 4
+		assert bdp.metrics.value("biodumpy_elements_total", module="Down", outcome="rejected") >= 16
+
+	with pytest.raises(ValueError, match="Invalid circuit_breaker"):
+		Biodumpy([Echo()], circuit_breaker=0)
+
+
+def test_circuit_breaker_probe():
+	breaker = CircuitBreaker(threshold=1, cooldown=0.05)
+	assert not breaker.failure(ValueError("Taxon not found"))
+	assert breaker.failure(BiodumpyException("Service unavailable. Error 503", status=503))
+	assert not breaker.allow()
+
+	# After the cooldown a single probe goes through, and a failed probe opens the circuit again
+	time.sleep(0.05)
+	assert breaker.allow() and not breaker.allow()
+	breaker.failure(TimeoutError())
+	assert breaker.state == "open" and not breaker.allow()
+
+	time.sleep(0.05)
+	assert breaker.allow()
+	breaker.success()
+	assert breaker.state == "closed" and breaker.allow() and breaker.allow()
+
+	# Requests that reached the service do not count as outages
+	assert not CircuitBreaker.is_outage(BiodumpyException("Not found. Error 404", status=404))
+
+
+def test_jsonl_output():
+	taxa = ["Alytes muletensis", "Bufotes viridis"]
+
+	with tempfile.TemporaryDirectory() as temp_dir, redirect_stdout(trap):
+		output_path = f"{temp_dir}/downloads/{{date}}/{{module}}/{{name}}"
+		bdp = Biodumpy([Echo(sleep=0, bulk=True, output_format="jsonl"), Echo2(sleep=0, output_format="jsonl")], loading_bar=False)
+		bdp.start(taxa, output_path=output_path)
+		bdp.start(taxa[:1], output_path=output_path)
+
+		# The bulk file accumulates the runs, one record per line
+		with open(f"{temp_dir}/downloads/{date_dir(temp_dir)}/Echo/bulk.jsonl") as f:
+			assert [json.loads(line)["query"] for line in f] == [*taxa, taxa[0]]
+
+		assert sorted(os.listdir(f"{temp_dir}/downloads/{date_dir(temp_dir)}/Echo2")) == [f"{taxon}.jsonl" for taxon in taxa]
+
+	# All the built-in inputs accept the format
+	for name in registry.names():
+		assert registry.create(name, output_format="jsonl").output_format == "jsonl"
+
+
+def test_parquet_output():
+	pd = pytest.importorskip("pandas")
+	pytest.importorskip("pyarrow")
+	taxa = ["Alytes muletensis", "Bufotes viridis"]
+
+	with tempfile.TemporaryDirectory() as temp_dir, redirect_stdout(trap):
+		# One file per module (bulk) or, with the Hive-style path, one partition per module and taxon
+		Biodumpy([Echo(sleep=0, bulk=True, output_format="parquet")], loading_bar=False).start(taxa, output_path=f"{temp_dir}/bulk/{{module}}/{{name}}")
+		Biodumpy([Echo(sleep=0, output_format="parquet")], loading_bar=False).start(taxa, output_path=f"{temp_dir}/dataset/input={{module}}/taxon={{name}}/part")
+
+		assert pd.read_parquet(f"{temp_dir}/bulk/Echo/bulk.parquet")["query"].tolist() == taxa
+
+		dataset = pd.read_parquet(f"{temp_dir}/dataset")
+		assert sorted(zip(dataset["input"].astype(str), dataset["taxon"].astype(str))) == [("Echo", taxon) for taxon in taxa]
+
+
+def test_compressed_output():
+	taxa = ["Alytes muletensis", "Bufotes viridis"]
+
+	with tempfile.TemporaryDirectory() as temp_dir, redirect_stdout(trap):
+		output_path = f"{temp_dir}/downloads/{{date}}/{{module}}/{{name}}"
+		Biodumpy([Echo(sleep=0, bulk=True, compression="gzip"), Echo2(sleep=0, output_format="jsonl", compression="gzip")], loading_bar=False).start(taxa, output_path=output_path)
+
+		with gzip.open(f"{temp_dir}/downloads/{date_dir(temp_dir)}/Echo/bulk.json.gz", "rt") as f:
+			assert [item["query"] for item in json.load(f)] == taxa
+
+		assert sorted(os.listdir(f"{temp_dir}/downloads/{date_dir(temp_dir)}/Echo2")) == [f"{taxon}.jsonl.gz" for taxon in taxa]
+
+	with pytest.raises(ValueError, match="Invalid compression"):
+		Echo(compression="bz2")
+
+
+def test_background_writer():
+	taxa = [f"Taxon {i}" for i in range(10)]
+
+	# Slow disk: each write takes as long as a download
+	def slow_dump(inp, element, **kwargs):
+		time.sleep(0.05)
+
+	def full_disk(inp, element, **kwargs):
+		raise OSError("No space left on device")
+
+	with tempfile.TemporaryDirectory() as temp_dir, redirect_stdout(trap):
+		output_path = f"{temp_dir}/downloads/{{date}}/{{module}}/{{name}}"
+
+		bdp = Biodumpy([Echo(delay=0.05, sleep=0, bulk=True), Echo2(delay=0.05, sleep=0)], loading_bar=False, hooks=Hooks(on_dump=slow_dump), background_writer=True)
+		start = time.time()
+		bdp.start(taxa, output_path=output_path)
+		elapsed = time.time() - start
+
+		# The writes overlap the downloads instead of alternating with them
+		assert elapsed < 0.05 * len(taxa) * 2 * 1.5
+		assert [item["query"] for item in read_bulk(temp_dir, "Echo")] == taxa
+		assert sorted(os.listdir(f"{temp_dir}/downloads/{date_dir(temp_dir)}/Echo2")) == sorted(f"{taxon}.json" for taxon in taxa)
+
+		# The payloads queued before a crash are written
+		counter = Counter(crash_on="Taxon 5", sleep=0, bulk=True)
+		with pytest.raises(Crash):
+			Biodumpy([counter], loading_bar=False, hooks=Hooks(on_dump=slow_dump), background_writer=True).start(taxa, output_path=output_path)
+		assert [item["query"] for item in read_bulk(temp_dir, "Counter")] == taxa[:5]
+
+		# A failed write fails the run
+		with pytest.raises(OSError, match="No space left on device"):
+			Biodumpy([Echo(sleep=0)], loading_bar=False, hooks=Hooks(on_dump=full_disk), background_writer=True).start(taxa, output_path=output_path)
@@ -47,7 +47,7 @@ def test_crossref_initialization():
 
 	# Objective: Verify that class raises a ValueError when an invalid value is provided for the
 	# output_format parameter.
-	with pytest.raises(ValueError, match="Invalid output_format. Expected 'json'."):
+	with pytest.raises(ValueError, match="Invalid output_format. Expected 'json' or 'jsonl'."):
 		Crossref(output_format="xml")
 
 
@@ -8,6 +8,7 @@ from contextlib import redirect_stdout
 
 from biodumpy import Biodumpy
 from biodumpy.inputs import GBIF
+from biodumpy.parquet import pyarrow_available
 
 # set a trap and redirect stdout. Remove the print of the function. In this wat the test output is cleanest.
 trap = io.StringIO()
@@ -53,9 +54,16 @@ def test_gbif_initialization():
 
 	# Objective: Verify that the class raises a ValueError when an invalid value is provided for the
 	# output_format parameter.
-	with pytest.raises(ValueError, match='Invalid output_format. Expected "json".'):
+	with pytest.raises(ValueError, match='Invalid output_format. Expected "json", "jsonl" or "parquet".'):
 		GBIF(output_format="xml")
 
+	# Parquet output requires pyarrow
+	if pyarrow_available():
+		assert GBIF(output_format="parquet").output_format == "parquet"
+	else:
+		with pytest.raises(ValueError, match="requires pyarrow"):
+			GBIF(output_format="parquet")
+
 
 @pytest.mark.parametrize(
 	"query, accepted_only, occ, geometry",
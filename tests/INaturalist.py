@@ -45,7 +45,7 @@ def test_inat_initialization():
 
 	# Objective: Verify that the class raises a ValueError when an invalid value is provided for the
 	# output_format parameter.
-	with pytest.raises(ValueError, match='Invalid output_format. Expected "json".'):
+	with pytest.raises(ValueError, match='Invalid output_format. Expected "json" or "jsonl".'):
 		INaturalist(output_format="xml")
 
 
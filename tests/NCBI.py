@@ -90,7 +90,7 @@ def test_ncbi_initialization():
 	with pytest.raises(ValueError, match="Invalid parameters: 'taxonomy_only' is True, so 'output_format' cannot be 'fasta'."):
 		NCBI(taxonomy_only=True, output_format="fasta", rettype="fasta")  # Should raise the error
 
-	with pytest.raises(ValueError, match='Invalid output_format. Expected "json" or "fasta".'):
+	with pytest.raises(ValueError, match='Invalid output_format. Expected "json", "jsonl" or "fasta".'):
 		NCBI(output_format="xml")  # Should raise the error
 
 
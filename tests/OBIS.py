@@ -49,7 +49,7 @@ def test_obis_initialization():
 
 	# Objective: Verify that the class raises a ValueError when an invalid value is provided for the
 	# output_format parameter.
-	with pytest.raises(ValueError, match='Invalid output_format. Expected "json".'):
+	with pytest.raises(ValueError, match='Invalid output_format. Expected "json", "jsonl" or "parquet".'):
 		OBIS(output_format="xml")
 
 	with pytest.raises(ValueError, match='"If "occ" is False, "areaid" and "geometry" cannot be set."'):
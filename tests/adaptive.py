@@ -0,0 +1,87 @@
+from tests import *
+import time
+from random import Random
+from types import SimpleNamespace
+
+import pytest
+
+from biodumpy.adaptive import AdaptiveController, parse_retry_after
+from biodumpy.client import HttpClient
+
+url = "https://api.gbif.org/v1/occurrence/search"
+
+
+def test_adaptive_initialization():
+	with pytest.raises(ValueError, match="Invalid limits."):
+		AdaptiveController(initial=4, max_limit=2)
+
+	with pytest.raises(ValueError, match="Invalid decrease."):
+		AdaptiveController(decrease=1)
+
+
+def test_parse_retry_after():
+	assert parse_retry_after("2") == 2
+	assert parse_retry_after(None) is None
+	assert parse_retry_after("not a date") is None
+	assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+
+
+def test_additive_increase_multiplicative_decrease():
+	controller = AdaptiveController(initial=1, max_limit=4)
+
+	# Flat latencies raise the limit by one after each window of successful requests
+	for _ in range(1 + 2 + 3):
+		controller.acquire(url)
+		controller.release(url, latency=0.1)
+	assert controller.limit(url) == 4
+
+	# A throttled request halves the limit and pauses the host
+	controller.acquire(url)
+	controller.release(url, latency=0.1, throttled=True, retry_after=0.2)
+	assert controller.limit(url) == 2
+
+	start = time.monotonic()
+	controller.acquire(url)
+	assert time.monotonic() - start >= 0.15
+	controller.release(url, latency=0.1)
+
+
+def test_latency_baseline():
+	controller = AdaptiveController(initial=1, max_limit=16)
+	random = Random(0)
+
+	# Noisy latencies that do not depend on the load: the limit grows up to the maximum
+	while controller.limit(url) < 16:
+		for _ in range(controller.limit(url)):
+			controller.acquire(url)
+		for _ in range(controller.limit(url)):
+			controller.release(url, latency=random.choice([0.01, 0.05, 0.2]))
+	assert controller.limit(url) == 16
+
+	# Latencies growing with the load stop the growth
+	controller = AdaptiveController(initial=1, max_limit=16)
+	for _ in range(200):
+		limit = controller.limit(url)
+		controller.acquire(url)
+		controller.release(url, latency=0.1 * 4**limit)
+	assert controller.limit(url) < 4
+
+	# Latencies proportional to the requests in flight (a host serving one request at a time) keep the limit low
+	controller = AdaptiveController(initial=1, max_limit=16)
+	for _ in range(200):
+		limit = controller.limit(url)
+		for _ in range(limit):
+			controller.acquire(url)
+		for _ in range(limit):
+			controller.release(url, latency=0.2 * limit)
+	assert controller.limit(url) <= 3
+
+
+def test_client_retries_throttled_requests():
+	responses = [SimpleNamespace(status_code=429, headers={"Retry-After": "0"}), SimpleNamespace(status_code=200, headers={})]
+
+	client = HttpClient()
+	response = client.call(url, lambda: responses.pop(0))
+
+	assert response.status_code == 200
+	assert not responses
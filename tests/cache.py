@@ -0,0 +1,92 @@
+from tests import *
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import ClassVar
+
+from biodumpy.cache import ResponseCache
+from biodumpy.client import HttpClient
+
+
+class Handler(BaseHTTPRequestHandler):
+	"""
+	Local server answering with an ETag and honouring If-None-Match.
+	"""
+
+	requests: ClassVar[list] = []
+
+	def do_GET(self):
+		Handler.requests.append((self.path, self.headers.get("If-None-Match")))
+		if self.headers.get("If-None-Match") == '"v1"':
+			self.send_response(304)
+			self.end_headers()
+			return
+
+		body = b'{"results": [{"name": "Alytes muletensis"}]}'
+		self.send_response(200)
+		self.send_header("Content-Type", "application/json")
+		self.send_header("ETag", '"v1"')
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def log_message(self, *args):
+		pass
+
+
+def serve():
+	server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+	threading.Thread(target=server.serve_forever, daemon=True).start()
+	return server
+
+
+def test_cache_key():
+	# Parameters are sorted and None values are dropped
+	assert (
+		ResponseCache.key("https://api.gbif.org/v1/species", {"name": "Alytes", "datasetKey": "d7dd", "limit": None})
+		== "https://api.gbif.org/v1/species?datasetKey=d7dd&name=Alytes"
+	)
+	assert ResponseCache.key("https://api.gbif.org/v1/species", {}) == "https://api.gbif.org/v1/species"
+
+
+def test_cache_ttl_and_revalidation():
+	server = serve()
+	url = f"http://127.0.0.1:{server.server_port}/v1/species"
+	Handler.requests = []
+
+	with tempfile.TemporaryDirectory() as temp_dir:
+		cache = ResponseCache(os.path.join(temp_dir, "cache.sqlite"), ttl=60, ttls={"COL": 0})
+
+		# Fresh entries are read from the cache
+		client = HttpClient(cache=cache).for_module("GBIF")
+		assert client.get(url, params={"name": "Alytes muletensis"}).json()["results"][0]["name"] == "Alytes muletensis"
+		assert client.get(url, params={"name": "Alytes muletensis"}).json()["results"][0]["name"] == "Alytes muletensis"
+		assert len(Handler.requests) == 1
+
+		# Expired entries are revalidated with their ETag
+		client = client.for_module("COL")
+		response = client.get(url, params={"name": "Alytes muletensis"})
+		assert response.status_code == 200
+		assert response.json()["results"][0]["name"] == "Alytes muletensis"
+		assert Handler.requests[-1][1] == '"v1"'
+
+	server.shutdown()
+
+
+def test_cache_eviction():
+	with tempfile.TemporaryDirectory() as temp_dir:
+		cache = ResponseCache(os.path.join(temp_dir, "cache.sqlite"), max_size=250)
+		for i in range(5):
+			cache.put(f"key{i}", f"url{i}", b"x" * 100)
+			time.sleep(0.01)
+
+		# Reading an entry makes it the most recently used
+		cache.get("key0")
+		cache.evict()
+
+		assert cache.size() <= 250
+		assert cache.get("key0") is not None
+		assert cache.get("key4") is not None
+		assert cache.get("key1") is None
@@ -0,0 +1,88 @@
+from tests import *
+import io
+import json
+import os
+import sys
+import tempfile
+from contextlib import redirect_stdout
+
+import pytest
+
+from biodumpy.cli import create_inputs, load_config, main
+from biodumpy.registry import registry
+from tests.Biodumpy import date_dir
+
+CONFIG = """
+output_path = "{root}/downloads/{{date}}/{{module}}/{{name}}"
+
+[rate_limits]
+"api.gbif.org" = [10, 5]
+
+[[inputs]]
+name = "Echo"
+sleep = 0
+bulk = true
+"""
+
+
+@pytest.fixture(autouse=True)
+def echo():
+	registry.register("Echo", "tests.Biodumpy:Echo")
+
+
+def test_cli_config(monkeypatch):
+	with tempfile.TemporaryDirectory() as temp_dir:
+		with open(f"{temp_dir}/taxa.txt", "w") as f:
+			f.write("# Balearic amphibians\nAlytes muletensis\n\nBufotes viridis\n")
+		with open(f"{temp_dir}/config.toml", "w") as f:
+			f.write(CONFIG.format(root=temp_dir))
+		with open(f"{temp_dir}/config.yaml", "w") as f:
+			f.write("inputs:\n  - name: Echo\n    sleep: 0\n")
+
+		assert load_config(f"{temp_dir}/config.toml")["rate_limits"] == {"api.gbif.org": [10, 5]}
+		assert load_config(f"{temp_dir}/config.yaml")["inputs"] == [{"name": "Echo", "sleep": 0}]
+
+		out = io.StringIO()
+		with redirect_stdout(out):
+			assert main([f"{temp_dir}/taxa.txt", "--config", f"{temp_dir}/config.toml", "--jobs", "2", "--no-progress"]) == 0
+
+		with open(f"{temp_dir}/downloads/{date_dir(temp_dir)}/Echo/bulk.json") as f:
+			assert sorted(item["query"] for item in json.load(f)) == ["Alytes muletensis", "Bufotes viridis"]
+
+		# Metrics summary
+		assert out.getvalue().splitlines()[-1].split()[:4] == ["Echo", "2", "0", "0"]
+
+		# A missing TOML parser is reported as an invalid config
+		monkeypatch.setitem(sys.modules, "tomllib", None)
+		monkeypatch.setitem(sys.modules, "tomli", None)
+		with pytest.raises(ValueError, match="Invalid config. TOML files require tomli"):
+			load_config(f"{temp_dir}/config.toml")
+
+
+def test_cli_stdin(monkeypatch):
+	with tempfile.TemporaryDirectory() as temp_dir:
+		monkeypatch.setattr("sys.stdin", io.StringIO("scientificName\nAlytes muletensis\nBufotes viridis\n"))
+		output_path = f"{temp_dir}/downloads/{{date}}/{{module}}/{{name}}"
+
+		with redirect_stdout(io.StringIO()):
+			assert main(["-", "--format", "csv", "--input", "Echo", "--output", output_path, "--checkpoint", "--no-progress"]) == 0
+		assert sorted(os.listdir(f"{temp_dir}/downloads/{date_dir(temp_dir)}/Echo")) == ["Alytes muletensis.json", "Bufotes viridis.json"]
+
+		with pytest.raises(SystemExit), redirect_stdout(io.StringIO()):
+			main(["-", "--output", output_path])
+
+		# A retry reads the taxa from the failure ledger, so there is nothing to resume
+		with pytest.raises(SystemExit), redirect_stdout(io.StringIO()):
+			main(["-", "--input", "Echo", "--resume", "--retry-failed", f"{temp_dir}/failures.jsonl"])
+
+
+def test_cli_disambiguation():
+	# Unattended by default, unless the specification of the module sets a policy
+	gbif, col, echo = create_inputs(["GBIF", {"name": "COL", "disambiguation": "first"}, "Echo"], disambiguation="defer")
+	assert gbif.disambiguation.steps == ["defer"]
+	assert col.disambiguation.steps == ["first"]
+	assert not hasattr(echo, "disambiguation")
+
+	# The answers cannot be read from stdin when it holds the taxa
+	with pytest.raises(SystemExit), redirect_stdout(io.StringIO()):
+		main(["-", "--input", "GBIF", "--prompt"])
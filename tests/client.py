@@ -0,0 +1,132 @@
+from tests import *
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import ClassVar
+
+import pytest
+
+from biodumpy import Biodumpy
+from biodumpy.adaptive import AdaptiveController
+from biodumpy.client import HttpClient
+from biodumpy.hedging import Hedger
+from biodumpy.inputs import GBIF
+from biodumpy.metrics import Metrics
+from biodumpy.ratelimit import RateLimiter
+
+
+class Handler(BaseHTTPRequestHandler):
+	"""
+	Local keep-alive server recording the client port of each request.
+	"""
+
+	protocol_version = "HTTP/1.1"
+	ports: ClassVar[list] = []
+	failures = 0
+	# Number of requests answered after a long pause
+	stalls = 0
+
+	def do_GET(self):
+		Handler.ports.append(self.client_address[1])
+		if Handler.stalls:
+			Handler.stalls -= 1
+			time.sleep(2)
+
+		if Handler.failures:
+			Handler.failures -= 1
+			self.send_response(502)
+			self.send_header("Content-Length", "0")
+			self.end_headers()
+			return
+
+		body = b"{}"
+		self.send_response(200)
+		self.send_header("Content-Type", "application/json")
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def log_message(self, *args):
+		pass
+
+
+@pytest.fixture
+def url():
+	server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+	threading.Thread(target=server.serve_forever, daemon=True).start()
+	Handler.ports = []
+	Handler.failures = 0
+	Handler.stalls = 0
+	yield f"http://127.0.0.1:{server.server_port}/v1/occurrence/search"
+	server.shutdown()
+
+
+def test_client_initialization():
+	client = HttpClient()
+	assert client.timeout == (10, 60)
+
+	# Module views share the session of the thread
+	assert client.for_module("GBIF").session() is client.for_module("OBIS").session()
+
+	with pytest.raises(ValueError, match="Invalid parameters: 'client' is set"):
+		Biodumpy([GBIF()], client=client, rate_limits={"api.gbif.org": (10, 1)})
+
+
+def test_keep_alive(url):
+	client = HttpClient()
+	for offset in range(5):
+		assert client.get(url, params={"offset": offset}).status_code == 200
+
+	# All the requests reuse the same connection
+	assert len(Handler.ports) == 5
+	assert len(set(Handler.ports)) == 1
+
+
+def test_retry_policy(url):
+	Handler.failures = 2
+
+	assert HttpClient(backoff_factor=0).get(url).status_code == 200
+	assert len(Handler.ports) == 3
+
+	# Without retries the error is returned to the module
+	Handler.failures = 1
+	assert HttpClient(retries=0).get(url).status_code == 502
+
+
+def test_hedged_requests(url):
+	client = HttpClient(hedger=Hedger(min_samples=3), metrics=Metrics())
+	for offset in range(3):
+		assert client.get(url, params={"offset": offset}).status_code == 200
+
+	# The stalled request is duplicated after the p95 latency, and the duplicate answers first
+	Handler.stalls = 1
+	start = time.monotonic()
+	assert client.get(url, params={"offset": 3}).status_code == 200
+	assert time.monotonic() - start < 1
+	assert len(Handler.ports) == 5
+	assert client.metrics.value("biodumpy_hedges_total", winner="hedge") == 1
+
+
+def test_hedged_requests_rate_budget(url):
+	host = url.split("/")[2].split(":")[0]
+	client = HttpClient(RateLimiter({host: (0.5, 4)}), hedger=Hedger(min_samples=3))
+	for offset in range(4):
+		client.get(url, params={"offset": offset})
+
+	# No token left for a duplicate: the request waits for its own answer
+	Handler.stalls = 1
+	assert client.get(url, params={"offset": 4}).status_code == 200
+	assert len(Handler.ports) == 5
+
+
+def test_hedged_requests_concurrency_limit(url):
+	host = url.split("/")[2].split(":")[0]
+	client = HttpClient(RateLimiter({host: (0.01, 5)}), controller=AdaptiveController(initial=1, max_limit=1), hedger=Hedger(min_samples=3))
+	for offset in range(3):
+		client.get(url, params={"offset": offset})
+
+	# The request holds the only slot of the host: no duplicate is sent, and no token is spent on it
+	Handler.stalls = 1
+	assert client.get(url, params={"offset": 3}).status_code == 200
+	assert len(Handler.ports) == 4
+	assert client.limiter.try_acquire(url)
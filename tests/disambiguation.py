@@ -0,0 +1,72 @@
+from tests import *
+import io
+import json
+import tempfile
+from contextlib import redirect_stdout
+
+import pytest
+
+from biodumpy.disambiguation import Disambiguation
+from biodumpy.inputs import COL, GBIF, IUCN
+
+# Homonyms of Pinna in the GBIF backbone
+CANDIDATES = [
+	{"id": 1, "name": "Pinna", "rank": "GENUS", "accepted": False},
+	{"id": 2, "name": "Pinna nobilis", "rank": "SPECIES", "accepted": True},
+	{"id": 3, "name": "Pinna", "rank": "GENUS", "accepted": True},
+]
+
+
+def test_policies():
+	assert Disambiguation("first").resolve("GBIF", "Pinna", CANDIDATES) == 0
+	assert Disambiguation("highest_rank").resolve("GBIF", "Pinna nobilis", CANDIDATES[1:]) == 1
+	assert Disambiguation(["exact", "accepted"]).resolve("GBIF", "pinna", CANDIDATES) == 2
+	assert Disambiguation("accepted").resolve("GBIF", "Pinna", CANDIDATES[:2]) == 1
+
+	# A filter removing every candidate is ignored
+	assert Disambiguation(["exact", "first"]).resolve("GBIF", "Pinna rudis", CANDIDATES) == 0
+
+	with pytest.raises(ValueError, match="Invalid policy."):
+		Disambiguation("random")
+
+
+def test_defer():
+	with tempfile.TemporaryDirectory() as temp_dir:
+		policy = Disambiguation(["exact", "defer"], deferred_file=f"{temp_dir}/deferred.jsonl")
+		assert policy.resolve("GBIF", "Pinna", CANDIDATES) is None
+		assert policy.resolve("GBIF", "Pinna nobilis", CANDIDATES) == 1
+
+		# Unresolved candidates are deferred as well
+		assert Disambiguation("accepted", deferred_file=policy.deferred_file).resolve("COL", "Pinna", CANDIDATES) is None
+
+		with open(policy.deferred_file) as f:
+			records = [json.loads(line) for line in f]
+		assert [(record["module"], record["query"]) for record in records] == [("GBIF", "Pinna"), ("COL", "Pinna")]
+		assert [candidate["id"] for candidate in records[0]["candidates"]] == [1, 3]
+
+
+def test_prompt(monkeypatch):
+	answers = iter(["7", "3", "Skip"])
+	monkeypatch.setattr("builtins.input", lambda prompt: next(answers))
+
+	policy = Disambiguation()
+	with redirect_stdout(io.StringIO()):
+		# Invalid answer, then an ID
+		assert policy.resolve("GBIF", "Pinna", CANDIDATES) == 2
+		assert policy.resolve("GBIF", "Pinna", CANDIDATES) is None
+
+
+def test_modules_policy():
+	policy = Disambiguation("first")
+	assert GBIF(disambiguation=policy).disambiguation is policy
+	assert COL(disambiguation=["exact", "defer"]).disambiguation.steps == ["exact", "defer"]
+	assert IUCN().disambiguation.steps == ["prompt"]
+
+
+def test_non_interactive():
+	policy = Disambiguation(["exact", "prompt"], deferred_file="downloads/deferred.jsonl")
+	assert policy.non_interactive().steps == ["exact", "defer"]
+	assert policy.non_interactive().deferred_file == policy.deferred_file
+
+	policy = Disambiguation("first")
+	assert policy.non_interactive() is policy
@@ -0,0 +1,41 @@
+from tests import *
+import subprocess
+import sys
+
+import pytest
+
+
+# Maximum time, in seconds, of ``import biodumpy`` and ``import biodumpy.inputs`` in a fresh interpreter
+IMPORT_BUDGET = 0.3
+
+# Dependencies that must only be imported when they are used
+HEAVY_MODULES = ["requests", "asyncio", "multiprocessing", "Bio", "bs4"]
+
+
+def run(code):
+	return subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout.split()
+
+
+def test_import_budget():
+	code = "import sys, time; start = time.perf_counter(); import biodumpy, biodumpy.inputs; print(time.perf_counter() - start); print(sys.modules.keys())"
+	elapsed = min(float(run(code)[0]) for _ in range(3))
+	assert elapsed < IMPORT_BUDGET
+
+	modules = run(f"import sys, biodumpy, biodumpy.inputs; print(' '.join(m for m in {HEAVY_MODULES} if m in sys.modules))")
+	assert modules == []
+
+
+def test_lazy_inputs():
+	# Only the module of the accessed input is imported
+	modules = run("import sys; from biodumpy.inputs import COL; print(' '.join(m for m in sys.modules if m.startswith(('biodumpy.inputs.', 'Bio'))))")
+	assert modules == ["biodumpy.inputs.COL"]
+
+	# requests is only imported with the first request
+	modules = run(f"import sys; from biodumpy.inputs import ZooBank; print(' '.join(m for m in {HEAVY_MODULES} if m in sys.modules))")
+	assert modules == []
+
+	import biodumpy.inputs
+
+	assert sorted(biodumpy.inputs.__all__) == sorted(name for name in dir(biodumpy.inputs) if name[0].isupper())
+	with pytest.raises(AttributeError):
+		_ = biodumpy.inputs.Unknown
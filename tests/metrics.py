@@ -0,0 +1,73 @@
+from tests import *
+import io
+import json
+import os
+import tempfile
+from contextlib import redirect_stdout
+
+from biodumpy import Biodumpy, Input
+from biodumpy.metrics import Metrics, endpoint
+
+trap = io.StringIO()
+
+
+class Local(Input):
+	"""
+	Input querying the local server.
+	"""
+
+	def __init__(self, url, **kwargs):
+		super().__init__(**kwargs)
+		self.url = url
+
+	def _download(self, query, **kwargs) -> list:
+		return [self.client.get(f"{self.url}/{query}").json()]
+
+
+def test_endpoint():
+	assert endpoint("https://api.obis.org/v3/taxon/Pinna%20nobilis", query="Pinna nobilis") == "api.obis.org/v3/taxon/{query}"
+	assert endpoint("https://api.obis.org/v3/taxon/Pinna", query="Pinna") == "api.obis.org/v3/taxon/{query}"
+	assert endpoint("https://api.gbif.org/v1/species/2426609") == "api.gbif.org/v1/species/{id}"
+	assert endpoint("https://api.gbif.org/v1/occurrence/search") == "api.gbif.org/v1/occurrence/search"
+
+
+def test_metrics_merge():
+	metrics = Metrics()
+	metrics.inc("biodumpy_requests_total", module="GBIF", status=200)
+	metrics.observe("biodumpy_request_seconds", 0.2, module="GBIF")
+
+	other = Metrics()
+	other.inc("biodumpy_requests_total", 2, module="GBIF", status=200)
+	other.inc("biodumpy_requests_total", module="GBIF", status=404)
+	other.observe("biodumpy_request_seconds", 0.4, module="GBIF")
+	metrics.merge(other)
+
+	assert metrics.value("biodumpy_requests_total") == 4
+	assert metrics.value("biodumpy_requests_total", status=200) == 3
+
+	histogram = metrics.to_dict()["histograms"][0]
+	assert histogram["count"] == 2 and histogram["max"] == 0.4
+
+	text = metrics.to_prometheus()
+	assert "# TYPE biodumpy_requests_total counter" in text
+	assert 'biodumpy_requests_total{module="GBIF",status="404"} 1' in text
+	assert 'biodumpy_request_seconds_bucket{module="GBIF",le="+Inf"} 2' in text
+
+
+def test_run_metrics(url):
+	taxa = ["Pinna nobilis", "Posidonia"]
+
+	with tempfile.TemporaryDirectory() as temp_dir, redirect_stdout(trap):
+		bdp = Biodumpy([Local(url, sleep=0)], loading_bar=False, metrics=True)
+		bdp.start(taxa, output_path=f"{temp_dir}/downloads/{{date}}/{{module}}/{{name}}")
+
+		assert bdp.metrics.value("biodumpy_requests_total", module="Local", endpoint="127.0.0.1/v1/species/{query}", status=200) == 2
+		assert bdp.metrics.value("biodumpy_response_bytes_total", module="Local") == 2 * len(b'{"results": []}')
+		assert bdp.metrics.value("biodumpy_elements_total", module="Local", outcome="downloaded") == 2
+
+		reports = sorted(name for name in os.listdir(f"{temp_dir}/downloads") if name.startswith("metrics_"))
+		assert [os.path.splitext(name)[1] for name in reports] == [".json", ".prom"]
+
+		with open(f"{temp_dir}/downloads/{reports[0]}") as f:
+			report = json.load(f)
+		assert {histogram["name"] for histogram in report["histograms"]} >= {"biodumpy_request_seconds", "biodumpy_download_seconds", "biodumpy_dump_seconds"}
@@ -0,0 +1,38 @@
+from tests import *
+import time
+
+import pytest
+
+from biodumpy.ratelimit import RateLimiter, TokenBucket
+
+
+def test_token_bucket_initialization():
+	with pytest.raises(ValueError, match="Invalid rate. Expected a positive number."):
+		TokenBucket(rate=0)
+
+	with pytest.raises(ValueError, match="Invalid burst. Expected a positive integer."):
+		TokenBucket(rate=1, burst=0)
+
+
+def test_token_bucket_rate():
+	bucket = TokenBucket(rate=20, burst=5)
+
+	start = time.monotonic()
+	for _ in range(15):
+		bucket.acquire()
+	elapsed = time.monotonic() - start
+
+	# The first 5 tokens are spent at once, the other 10 at 20 tokens per second
+	assert 0.45 <= elapsed < 0.75
+
+
+def test_rate_limiter_hosts():
+	limiter = RateLimiter({"api.gbif.org": (10, 2)})
+
+	# Buckets are keyed by host, whatever the path of the url
+	assert limiter.bucket("https://api.gbif.org/v1/species") is limiter.bucket("https://api.gbif.org/v1/occurrence/search")
+	assert limiter.bucket("https://api.gbif.org/v1/species").rate == 10
+
+	# Hosts without a limit are not throttled
+	assert limiter.bucket("https://api.obis.org/v3/taxon/Pinna nobilis") is None
+	assert limiter.acquire("https://api.obis.org/v3/taxon/Pinna nobilis") == 0
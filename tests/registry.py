@@ -0,0 +1,62 @@
+from tests import *
+import os
+import sys
+import tempfile
+
+import pytest
+
+from biodumpy import Biodumpy
+from biodumpy.inputs import NCBI
+from biodumpy.registry import Registry, registry
+
+
+@pytest.fixture
+def plugin():
+	"""
+	Installed distribution declaring the Echo test input in the biodumpy.inputs entry point group.
+	"""
+	with tempfile.TemporaryDirectory() as site:
+		dist_info = f"{site}/biodumpy_echo-0.1.dist-info"
+		os.mkdir(dist_info)
+		with open(f"{dist_info}/METADATA", "w") as f:
+			f.write("Metadata-Version: 2.1\nName: biodumpy-echo\nVersion: 0.1\n")
+		with open(f"{dist_info}/entry_points.txt", "w") as f:
+			f.write("[biodumpy.inputs]\nEcho = tests.Biodumpy:Echo\n")
+
+		sys.path.insert(0, site)
+		yield
+		sys.path.remove(site)
+
+
+def test_registry(plugin):
+	registry = Registry()
+	assert {"COL", "GBIF", "NCBI", "Echo"} <= set(registry.names())
+
+	assert registry.get("Echo").__name__ == "Echo"
+	assert registry.get("NCBI") is NCBI
+	assert registry.capabilities("NCBI") == {"rate_limits": {"eutils.ncbi.nlm.nih.gov": (3, 1)}}
+
+	with pytest.raises(ValueError, match="Invalid input 'Unknown'."):
+		registry.get("Unknown")
+
+	registry.register("Bad", "biodumpy.utils:dump")
+	with pytest.raises(ValueError, match="Expected a subclass of Input."):
+		registry.get("Bad")
+
+
+def test_inputs_by_name():
+	registry.register("Echo", "tests.Biodumpy:Echo")
+
+	bdp = Biodumpy(["Echo", "GBIF"], loading_bar=False)
+	assert [type(inp).__name__ for inp in bdp.inputs] == ["Echo", "GBIF"]
+
+	# The limits declared by the modules are applied unless overridden
+	bdp = Biodumpy(["Crossref", "INaturalist"], loading_bar=False, rate_limits={"api.crossref.org": (1, 1)})
+	assert bdp.client.limiter.limits["api.crossref.org"] == (1, 1)
+	assert bdp.client.limiter.limits["api.inaturalist.org"] == (1, 1)
+
+	# and also when a module is used on its own
+	assert registry.create("Crossref").client.limiter.limits == {"api.crossref.org": (5, 5)}
+
+	with pytest.raises(ValueError, match="Invalid input"):
+		Biodumpy(["Unknown"])
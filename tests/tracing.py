@@ -0,0 +1,50 @@
+from tests import *
+import io
+import json
+import os
+import tempfile
+from contextlib import redirect_stdout
+
+import pytest
+
+from biodumpy import Biodumpy
+from biodumpy.tracing import Tracer
+from tests.metrics import Local
+
+trap = io.StringIO()
+
+
+def test_tracer():
+	tracer = Tracer()
+	with tracer.span("GBIF") as module, pytest.raises(ValueError), tracer.span("Pinna nobilis", {"biodumpy.query": "Pinna nobilis"}):
+		raise ValueError("not found")
+
+	element, root = tracer.spans
+	assert element.parent_id == module.span_id and root.parent_id is None
+	assert element.duration <= root.duration
+
+	span = tracer.to_otlp()["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+	assert span["status"] == {"code": 2, "message": "not found"}
+	assert span["attributes"] == [{"key": "biodumpy.query", "value": {"stringValue": "Pinna nobilis"}}]
+	assert len(span["traceId"]) == 32 and len(span["spanId"]) == 16
+
+
+def test_run_trace(url):
+	taxa = ["Pinna nobilis", "Posidonia oceanica"]
+
+	with tempfile.TemporaryDirectory() as temp_dir, redirect_stdout(trap):
+		Biodumpy([Local(url, sleep=0)], loading_bar=False, trace=True).start(taxa, output_path=f"{temp_dir}/downloads/{{date}}/{{module}}/{{name}}")
+
+		file_name = next(name for name in os.listdir(f"{temp_dir}/downloads") if name.startswith("trace_"))
+		with open(f"{temp_dir}/downloads/{file_name}") as f:
+			spans = json.load(f)["resourceSpans"][0]["scopeSpans"][0]["spans"]
+
+	by_id = {span["spanId"]: span for span in spans}
+
+	def path(span):
+		return [span["name"]] + (path(by_id[span["parentSpanId"]]) if "parentSpanId" in span else [])
+
+	# module -> element -> request and dump
+	paths = sorted(path(span) for span in spans if span["name"] in ("127.0.0.1/v1/species/{query}", "dump"))
+	assert paths == sorted([["127.0.0.1/v1/species/{query}", taxon, "Local"] for taxon in taxa] + [["dump", taxon, "Local"] for taxon in taxa])
+	assert len(spans) == 1 + 3 * len(taxa)
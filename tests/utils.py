@@ -0,0 +1,115 @@
+from tests import *
+import json
+import os
+import tempfile
+import zipfile
+
+import pytest
+
+from biodumpy.utils import atomic_path, dump, open_text, read_fasta, read_taxa_csv, read_taxa_dwca, read_taxa_text, save_fasta
+
+meta = """<?xml version="1.0" encoding="UTF-8"?>
+<archive xmlns="http://rs.tdwg.org/text/">
+  <core encoding="UTF-8" fieldsTerminatedBy="\\t" linesTerminatedBy="\\n" ignoreHeaderLines="1" rowType="http://rs.tdwg.org/dwc/terms/Taxon">
+    <files><location>taxa.tsv</location></files>
+    <id index="0" />
+    <field index="1" term="http://rs.tdwg.org/dwc/terms/scientificName"/>
+    <field index="2" term="http://rs.tdwg.org/dwc/terms/taxonRank"/>
+  </core>
+</archive>
+"""
+
+core = "id\tname\trank\n1\tAlytes muletensis (Sanchíz & Adrover, 1979)\tspecies\n2\tBufotes viridis (Laurenti, 1768)\tspecies\n"
+
+taxa = ["Alytes muletensis (Sanchíz & Adrover, 1979)", "Bufotes viridis (Laurenti, 1768)"]
+
+
+def test_read_taxa_text():
+	with tempfile.TemporaryDirectory() as temp_dir:
+		with open(f"{temp_dir}/taxa.txt", "w", encoding="utf-8") as f:
+			f.write("# Balearic amphibians\n" + "\n".join(taxa) + "\n\n")
+
+		elements = read_taxa_text(f"{temp_dir}/taxa.txt")
+
+		# Nothing is read until the generator is consumed
+		assert not isinstance(elements, list)
+		assert list(elements) == [{"query": taxon} for taxon in taxa]
+
+
+def test_read_taxa_csv():
+	with tempfile.TemporaryDirectory() as temp_dir:
+		with open(f"{temp_dir}/taxa.csv", "w", encoding="utf-8") as f:
+			f.write("id,scientificName\n" + "\n".join(f'{i},"{taxon}"' for i, taxon in enumerate(taxa)) + "\n3,\n")
+
+		assert list(read_taxa_csv(f"{temp_dir}/taxa.csv")) == [{"query": taxon} for taxon in taxa]
+
+		with pytest.raises(ValueError, match="Invalid column."):
+			list(read_taxa_csv(f"{temp_dir}/taxa.csv", column="canonicalName"))
+
+
+def test_read_taxa_dwca():
+	with tempfile.TemporaryDirectory() as temp_dir:
+		# Zipped archive described by a meta.xml
+		with zipfile.ZipFile(f"{temp_dir}/checklist.zip", "w") as archive:
+			archive.writestr("meta.xml", meta)
+			archive.writestr("taxa.tsv", core)
+
+		assert list(read_taxa_dwca(f"{temp_dir}/checklist.zip")) == [{"query": taxon} for taxon in taxa]
+
+		with pytest.raises(ValueError, match="has no 'canonicalName' field"):
+			list(read_taxa_dwca(f"{temp_dir}/checklist.zip", term="canonicalName"))
+
+		# Core file without a meta.xml
+		with open(f"{temp_dir}/taxon.txt", "w", encoding="utf-8") as f:
+			f.write(core.replace("\tname\t", "\tscientificName\t"))
+
+		assert list(read_taxa_dwca(f"{temp_dir}/taxon.txt")) == [{"query": taxon} for taxon in taxa]
+
+		# Unzipped archive folder
+		os.makedirs(f"{temp_dir}/folder")
+		with open(f"{temp_dir}/folder/meta.xml", "w", encoding="utf-8") as f:
+			f.write(meta)
+		with open(f"{temp_dir}/folder/taxa.tsv", "w", encoding="utf-8") as f:
+			f.write(core)
+
+		assert list(read_taxa_dwca(f"{temp_dir}/folder")) == [{"query": taxon} for taxon in taxa]
+
+
+@pytest.mark.parametrize("extension", ["", ".gz", ".zst"])
+def test_compressed_files(extension):
+	if extension == ".zst":
+		pytest.importorskip("zstandard")
+	sequences = [{"id": "seq1", "sequence": "ACGT" * 50}, {"id": "seq2", "sequence": "TTGA"}]
+
+	with tempfile.TemporaryDirectory() as temp_dir:
+		save_fasta(f"{temp_dir}/sequences.fasta{extension}", sequences)
+		assert read_fasta(f"{temp_dir}/sequences.fasta{extension}") == sequences
+
+		# Appending adds a gzip member or a zstd frame, read as a single stream
+		for taxon in taxa:
+			with open_text(f"{temp_dir}/taxa.txt{extension}", "a") as f:
+				f.write(taxon + "\n")
+		assert list(read_taxa_text(f"{temp_dir}/taxa.txt{extension}")) == [{"query": taxon} for taxon in taxa]
+
+		with open(f"{temp_dir}/sequences.fasta{extension}", "rb") as f:
+			magic = f.read(4)
+		assert magic[:2] == b"\x1f\x8b" if extension == ".gz" else magic == b"\x28\xb5\x2f\xfd" if extension == ".zst" else magic == b">seq"
+
+	with pytest.raises(ValueError, match="Invalid file"):
+		read_fasta("sequences.txt.gz")
+
+
+def test_atomic_dump():
+	with tempfile.TemporaryDirectory() as temp_dir:
+		dump(f"{temp_dir}/taxa", [{"query": taxon} for taxon in taxa])
+
+		# An interrupted write leaves the previous file untouched and no temporary file
+		with pytest.raises(TypeError):
+			dump(f"{temp_dir}/taxa", [{"query": object()}])
+		with open(f"{temp_dir}/taxa.json") as f:
+			assert [item["query"] for item in json.load(f)] == taxa
+		assert os.listdir(temp_dir) == ["taxa.json"]
+
+		with atomic_path(f"{temp_dir}/empty.txt") as temp_path:
+			assert os.path.dirname(temp_path) == temp_dir and not os.path.exists(temp_path)
+		assert not os.path.exists(f"{temp_dir}/empty.txt")
@@ -0,0 +1,327 @@
+from tests import *
+import gzip
+import json
+import os
+import tempfile
+import threading
+import time
+
+import pytest
+
+from biodumpy.utils import COMPRESSIONS, JsonSerializer, dump, open_text
+from biodumpy.writers import BackgroundWriter, BulkWriter
+
+payloads = [[{"key": i, "name": f"Taxon {i}", "coordinates": [39.6, 2.9], "issues": []} for i in range(start, start + 3)] for start in range(0, 30, 3)]
+
+
+def test_bulk_writer_layout():
+	with tempfile.TemporaryDirectory() as temp_dir:
+		writer = BulkWriter(f"{temp_dir}/stream/bulk")
+		for payload in payloads:
+			writer.write(payload)
+		writer.close()
+
+		dump(f"{temp_dir}/dump/bulk", [record for payload in payloads for record in payload])
+
+		# The streamed file is identical to the file written at once by dump
+		with open(f"{temp_dir}/stream/bulk.json", "r") as stream, open(f"{temp_dir}/dump/bulk.json", "r") as full:
+			assert stream.read() == full.read()
+
+
+class Taxon:
+	"""
+	Object that is not a JSON type, converted as by CustomEncoder.
+	"""
+
+	def __init__(self, name):
+		self.name = name
+
+
+@pytest.mark.parametrize("indent, backend", [(4, "json"), (None, "json"), (None, "auto"), (2, "auto")])
+def test_json_serializer(indent, backend):
+	serializer = JsonSerializer(indent=indent, backend=backend)
+	records = [{**record, "taxon": Taxon(record["name"]), "vernacular": "Ferreret"} for payload in payloads for record in payload]
+	expected = json.loads(json.dumps(records, default=lambda obj: obj.__dict__))
+
+	with tempfile.TemporaryDirectory() as temp_dir:
+		writer = BulkWriter(f"{temp_dir}/stream/bulk", serializer=serializer)
+		writer.write(records)
+		writer.close()
+
+		dump(f"{temp_dir}/dump/bulk", records, serializer=serializer)
+
+		with open(f"{temp_dir}/stream/bulk.json", "r") as stream, open(f"{temp_dir}/dump/bulk.json", "r") as full:
+			text = full.read()
+			assert stream.read() == text
+
+	assert json.loads(text) == expected
+	if indent is None:
+		assert "\n" not in text and ", " not in text
+
+
+def test_json_serializer_backends():
+	# The default serializer keeps the output of json.dump(obj_list, output_file, indent=4)
+	assert JsonSerializer().dumps(payloads[0]) == json.dumps(payloads[0], indent=4)
+
+	with pytest.raises(ValueError, match="Invalid backend"):
+		JsonSerializer(backend="ujson")
+
+	with pytest.raises(ValueError, match="Invalid indent"):
+		JsonSerializer(indent=4, backend="orjson")
+
+	pytest.importorskip("orjson")
+	assert JsonSerializer(indent=None).backend == "orjson"
+	# Integers larger than 64 bits fall back to json
+	assert JsonSerializer(indent=None).dumps([2**70]) == f"[{2**70}]"
+
+
+def test_bulk_writer_rollover():
+	with tempfile.TemporaryDirectory() as temp_dir:
+		writer = BulkWriter(f"{temp_dir}/bulk", max_size=500)
+		for payload in payloads:
+			writer.write(payload)
+		writer.close()
+
+		files = sorted(os.listdir(temp_dir), key=lambda name: int(name[5:-5]))
+		assert len(files) > 1
+		assert files[0] == "bulk_1.json"
+
+		records = []
+		for file in files:
+			with open(f"{temp_dir}/{file}", "r") as f:
+				records.extend(json.load(f))
+		assert records == [record for payload in payloads for record in payload]
+
+		# A run writing fewer files removes the files of the previous run
+		writer = BulkWriter(f"{temp_dir}/bulk", max_size=500)
+		writer.write(payloads[0])
+		writer.close()
+		assert os.listdir(temp_dir) == ["bulk_1.json"]
+
+	# The size is counted in bytes: 3 records of 199 bytes (but 100 characters) per file
+	with tempfile.TemporaryDirectory() as temp_dir:
+		writer = BulkWriter(f"{temp_dir}/bulk", output_format="fasta", max_size=500)
+		writer.write(["ñ" * 99] * 6)
+		writer.close()
+
+		assert sorted(os.listdir(temp_dir)) == ["bulk_1.fasta", "bulk_2.fasta"]
+		assert os.path.getsize(f"{temp_dir}/bulk_1.fasta") == 597
+
+
+def test_bulk_writer_fasta():
+	with tempfile.TemporaryDirectory() as temp_dir:
+		writer = BulkWriter(f"{temp_dir}/bulk", output_format="fasta")
+		writer.write([">seq1\nACGT", ">seq2\nTTGA"])
+		writer.close()
+
+		with open(f"{temp_dir}/bulk.fasta", "r") as f:
+			assert f.read() == ">seq1\nACGT\n>seq2\nTTGA\n"
+
+
+def test_bulk_writer_jsonl():
+	records = [record for payload in payloads for record in payload]
+
+	with tempfile.TemporaryDirectory() as temp_dir:
+		writer = BulkWriter(f"{temp_dir}/stream/bulk", output_format="jsonl")
+		for payload in payloads:
+			writer.write(payload)
+		writer.close()
+
+		dump(f"{temp_dir}/dump/bulk", records, output_format="jsonl")
+
+		with open(f"{temp_dir}/stream/bulk.jsonl", "r") as stream, open(f"{temp_dir}/dump/bulk.jsonl", "r") as full:
+			text = full.read()
+			assert stream.read() == text
+		assert [json.loads(line) for line in text.splitlines()] == records
+
+		# A later run appends its records, after removing a line left incomplete by an interrupted run
+		with open(f"{temp_dir}/stream/bulk.jsonl", "a") as f:
+			f.write('{"key": 30, "na')
+		writer = BulkWriter(f"{temp_dir}/stream/bulk", output_format="jsonl", append=True)
+		writer.write(payloads[0])
+		writer.close()
+
+		with open(f"{temp_dir}/stream/bulk.jsonl", "r") as f:
+			assert [json.loads(line) for line in f] == records + payloads[0]
+
+
+def test_bulk_writer_jsonl_rollover():
+	with tempfile.TemporaryDirectory() as temp_dir:
+		for _ in range(2):
+			writer = BulkWriter(f"{temp_dir}/bulk", output_format="jsonl", max_size=500, append=True)
+			for payload in payloads:
+				writer.write(payload)
+			writer.close()
+
+		files = sorted(os.listdir(temp_dir), key=lambda name: int(name[5:-6]))
+		lines = []
+		for name in files:
+			with open(f"{temp_dir}/{name}", "r") as f:
+				lines.extend(json.loads(line) for line in f)
+
+		# Only the last file of the first run was completed by the second run
+		assert lines == [record for payload in payloads for record in payload] * 2
+		assert all(os.path.getsize(f"{temp_dir}/{name}") < 500 + 100 for name in files)
+
+
+def test_parquet_writer():
+	pq = pytest.importorskip("pyarrow.parquet")
+	from biodumpy.parquet import ParquetWriter
+
+	occurrences = [
+		{
+			"key": 4000000000 + i,
+			"gbifID": str(4000000000 + i),
+			"decimalLatitude": 39.6 if i % 2 else 40,
+			"decimalLongitude": 2.9,
+			"eventDate": "2023-05-01/2023-05-31",
+			"lastInterpreted": "2024-03-20T13:14:53.123+00:00",
+			"issues": ["COORDINATE_ROUNDED"],
+			"media": [{"type": "StillImage"}],
+			"individualCount": 1,
+		}
+		for i in range(25)
+	]
+	# Values that do not fit the schema inferred from the sample
+	occurrences[20]["individualCount"] = "several"
+	occurrences[21]["recordedBy"] = "T. Cancellario"
+
+	with tempfile.TemporaryDirectory() as temp_dir:
+		writer = ParquetWriter(f"{temp_dir}/GBIF/bulk", row_group_size=10, sample_size=5)
+		for start in range(0, 25, 5):
+			writer.write(occurrences[start : start + 5])
+		writer.close()
+
+		parquet = pq.ParquetFile(f"{temp_dir}/GBIF/bulk.parquet")
+		assert parquet.metadata.num_row_groups == 3
+		schema = parquet.schema_arrow
+		assert str(schema.field("key").type) == "int64" and str(schema.field("gbifID").type) == "int64"
+		assert str(schema.field("decimalLatitude").type) == "double"
+		assert str(schema.field("lastInterpreted").type) == "timestamp[ms, tz=UTC]"
+		assert str(schema.field("issues").type.value_type) == "string"
+
+		rows = parquet.read().to_pylist()
+		assert [row["key"] for row in rows] == [occurrence["key"] for occurrence in occurrences]
+		assert rows[0]["eventDate"] == "2023-05-01/2023-05-31" and json.loads(rows[0]["media"]) == [{"type": "StillImage"}]
+		assert rows[20]["individualCount"] is None and json.loads(rows[20]["_extra"]) == {"individualCount": "several"}
+		assert json.loads(rows[21]["_extra"]) == {"recordedBy": "T. Cancellario"}
+		assert rows[0]["_extra"] is None
+
+		# Nothing is written without records
+		ParquetWriter(f"{temp_dir}/OBIS/bulk").close()
+		assert not os.path.exists(f"{temp_dir}/OBIS")
+
+
+@pytest.mark.parametrize("output_format", ["json", "jsonl", "fasta"])
+def test_bulk_writer_compression(output_format):
+	records = [record for payload in payloads for record in payload] if output_format != "fasta" else [">seq1\nACGT", ">seq2\nTTGA"]
+
+	with tempfile.TemporaryDirectory() as temp_dir:
+		writer = BulkWriter(f"{temp_dir}/stream/bulk", output_format=output_format, compression="gzip")
+		writer.write(records)
+		writer.close()
+
+		dump(f"{temp_dir}/dump/bulk", records, output_format=output_format)
+
+		# Same content as the uncompressed file
+		with gzip.open(f"{temp_dir}/stream/bulk.{output_format}.gz", "rt") as stream, open(f"{temp_dir}/dump/bulk.{output_format}", "r") as full:
+			assert stream.read() == full.read()
+
+
+@pytest.mark.parametrize("compression", ["gzip", "zstd"])
+def test_bulk_writer_compressed_append(compression, monkeypatch):
+	if compression == "zstd":
+		pytest.importorskip("zstandard")
+	# Several zstd blocks, so that part of the frame can be decompressed
+	records = [{"key": i, "name": f"Taxon {i}"} for i in range(10000)]
+
+	with tempfile.TemporaryDirectory() as temp_dir:
+		path = f"{temp_dir}/bulk.jsonl{COMPRESSIONS[compression]}"
+		writer = BulkWriter(f"{temp_dir}/bulk", output_format="jsonl", compression=compression)
+		writer.write(records)
+		writer.close()
+		assert os.listdir(temp_dir) == [os.path.basename(path)]
+		with open(path, "rb") as f:
+			content = f.read()
+
+		# Crash of the next run: the marker is left and the end of its gzip member or zstd frame is missing
+		writer = BulkWriter(f"{temp_dir}/bulk", output_format="jsonl", append=True, compression=compression)
+		writer.write(records)
+		writer._file.close()
+		with open(path, "rb+") as f:
+			f.truncate(os.path.getsize(path) - 20)
+
+		writer = BulkWriter(f"{temp_dir}/bulk", output_format="jsonl", append=True, compression=compression)
+		writer.write(records[:3])
+		writer.close()
+
+		# The first run is kept as it is, followed by the complete lines written before the crash and the new records
+		with open(path, "rb") as f:
+			assert f.read(len(content)) == content
+		with open_text(path) as f:
+			lines = [json.loads(line) for line in f]
+		crashed = lines[len(records) : -3]
+		assert lines[: len(records)] == records and lines[-3:] == records[:3]
+		assert 0 < len(crashed) < len(records) and crashed == records[: len(crashed)]
+
+		# A file closed cleanly is appended to without being read
+		def unexpected(*args):
+			raise AssertionError("The file was read")
+
+		monkeypatch.setattr("biodumpy.writers.decompress", unexpected)
+		writer = BulkWriter(f"{temp_dir}/bulk", output_format="jsonl", append=True, compression=compression)
+		writer.write(records[3:6])
+		writer.close()
+		with open_text(path) as f:
+			assert [json.loads(line) for line in f][-6:] == records[:6]
+		assert os.listdir(temp_dir) == [os.path.basename(path)]
+
+
+def test_background_writer():
+	written = []
+	release = threading.Event()
+
+	def write(item):
+		release.wait()
+		written.append(item)
+
+	writer = BackgroundWriter(max_pending=2)
+	for item in range(3):
+		writer.submit(write, item)
+
+	# The writer holds the first item and the queue is full, so the next submit waits
+	thread = threading.Thread(target=writer.submit, args=(write, 3))
+	thread.start()
+	time.sleep(0.1)
+	assert thread.is_alive()
+
+	release.set()
+	thread.join()
+	writer.close()
+	assert written == [0, 1, 2, 3]
+
+	# The first error is raised on close, and the following writes are discarded
+	def fail(item):
+		raise OSError(f"Cannot write {item}")
+
+	writer = BackgroundWriter()
+	writer.submit(fail, 0)
+	writer.submit(write, 4)
+	with pytest.raises(OSError, match="Cannot write 0"):
+		writer.close()
+	assert written == [0, 1, 2, 3]
+
+	# Once a write failed, every submit raises its error until the writer is closed
+	writer = BackgroundWriter()
+	writer.submit(fail, 0)
+	time.sleep(0.1)
+	for item in (5, 6):
+		with pytest.raises(OSError, match="Cannot write 0"):
+			writer.submit(write, item)
+	with pytest.raises(OSError, match="Cannot write 0"):
+		writer.close()
+	writer.close()
+	assert written == [0, 1, 2, 3]
+
+	with pytest.raises(ValueError, match="Invalid max_pending"):
+		BackgroundWriter(max_pending=0)